@@ -0,0 +1,441 @@
+#!/usr/bin/env python
+#
+#                                                 CyberSKA CASA Metadata Project
+#
+#                                                   metaData.bench.runBench.py
+#                                                  metaData maintainers, 2026-10
+# ------------------------------------------------------------------------------
+
+"""Extraction benchmarks over synthetic datasets of all four MIME types.
+
+    $ python metaData/bench/runBench.py [options]
+
+Datasets are generated under a scratch directory, by bench/synthetic.py, in
+sweeps of
+
+    fits         FITS image cubes of each --cubes shape, plain and gzipped
+    mef          FITS files of each --extensions number of image extensions
+    uvfits       random groups UVFITS of each --channels number of channels
+    image        Casa Images of each --cubes shape, as directories, tar and
+                 gzipped tar archives
+    ms-channels  Measurement Sets of each --channels number of channels, and
+    ms-fields    of each --fields number of fields, in --spws windows of
+                 --antennas antennas, as directories, tar and tar.gz
+
+and extract is run on each dataset --repeat times, each in a new process,
+with --timing (see utils/stageTimer.py). FITS images are extracted with and
+without --fits-stats, and Measurement Sets with and without the main table
+stages, --ms-scan --ms-flags --ms-uvw. Casa Images and Measurement Sets
+need pyrap to be made, and are recorded as skipped without it.
+
+The results, for the run of least process wall time of each case, its
+dataset size, process and extraction wall times, cpu time, peak resident
+size, throughput, in datasets per second and in dataset and read megabytes
+per second of extraction, stage times and counters, are printed as a table
+and written as JSON to --results=FILE, eg.
+
+    {"metaData": "0.5.2", "python": ..., "host": ..., "started": ...,
+     "settings": {...},
+     "cases": [{"name": "ms-channels/c1024-f1-s4-a8/main/tar", ...}, ...]}
+
+With --compare=FILE, the cases are compared with those of an earlier
+results file, by name.
+"""
+
+# $Id$
+# ------------------------------------------------------------------------------
+__version__      = '$Revision$'[11:-3]
+__version_date__ = '$Date$'[7:-3]
+__author__       = "metaData maintainers"
+# ------------------------------------------------------------------------------
+
+import os, sys
+import json
+import time
+import getopt
+import shutil
+import platform
+import tempfile
+import subprocess
+
+import numpy
+
+from os.path     import abspath, basename, dirname, exists, join
+from collections import OrderedDict
+
+import metaData
+from metaData.bench import synthetic
+from metaData.metaDataVersion import version
+
+def usage(mod):
+    useBurp = '\n\tUsage: '+ mod + ' [--help] [--suites=LIST] [--cubes=LIST]\n'\
+              '\t       [--extensions=LIST] [--channels=LIST] [--fields=LIST]\n'\
+              '\t       [--spws=N] [--antennas=N] [--times=N] [--packings=LIST]\n'\
+              '\t       [--repeat=N] [--scratch=DIR] [--keep] [--results=FILE]\n'\
+              '\t       [--compare=FILE] [--extract-args=ARGS]\n\n'\
+              '\tGenerates synthetic datasets of each comma separated --suites,\n\t'\
+              '(fits, mef, uvfits, image, ms-channels, ms-fields; default all)\n\t'\
+              'at each scale, --cubes of ZxYxX image shapes (default\n\t'\
+              '16x128x128,64x256x256), --extensions (1,16), --channels\n\t'\
+              '(64,1024) and --fields (1,16), with --spws (4) windows,\n\t'\
+              '--antennas (8) and --times (10) integrations a field, packed\n\t'\
+              'as each of --packings (plain,gz,dir,tar,tgz), and times\n\t'\
+              'extract on each --repeat (3) times, with any --extract-args.\n\t'\
+              'Datasets are made under --scratch (default TMPDIR), and removed\n\t'\
+              'unless --keep is given. Results are written to --results\n\t'\
+              '(default metaData-bench-<time>.json), and compared with those\n\t'\
+              'of an earlier run with --compare.\n\n'
+    return useBurp
+
+
+suiteNames   = ['fits', 'mef', 'uvfits', 'image', 'ms-channels', 'ms-fields']
+packingNames = ['plain', 'gz', 'dir', 'tar', 'tgz']
+
+defaultSettings = { 'suites'     : suiteNames,
+                    'cubes'      : [(16, 128, 128), (64, 256, 256)],
+                    'extensions' : [1, 16],
+                    'channels'   : [64, 1024],
+                    'fields'     : [1, 16],
+                    'spws'       : 4,
+                    'antennas'   : 8,
+                    'times'      : 10,
+                    'packings'   : packingNames,
+                    'repeat'     : 3,
+                    'scratch'    : None,
+                    'keep'       : False,
+                    'results'    : None,
+                    'compare'    : None,
+                    'extractArgs': [],
+                    }
+
+# The extract arguments of each mode of a suite.
+fitsModes = [('headers', []), ('stats', ['--fits-stats'])]
+msModes   = [('meta', []), ('main', ['--ms-scan', '--ms-flags', '--ms-uvw'])]
+
+def handleCLargs(args):
+    """Parse the command line. Returns a copy of defaultSettings <dict>
+    updated from it.
+    """
+    mod = basename(args[0])
+    long_options = ['help', 'suites=', 'cubes=', 'extensions=', 'channels=',
+                    'fields=', 'spws=', 'antennas=', 'times=', 'packings=',
+                    'repeat=', 'scratch=', 'keep', 'results=', 'compare=',
+                    'extract-args=']
+    try:
+        opts, arg = getopt.getopt(args[1:], '', long_options)
+        settings  = dict(defaultSettings)
+        for o, a in opts:
+            if o == "--help":
+                sys.exit(usage(mod))
+            elif o == "--suites":
+                settings['suites'] = listOf(a, str, suiteNames)
+            elif o == "--packings":
+                settings['packings'] = listOf(a, str, packingNames)
+            elif o == "--cubes":
+                settings['cubes'] = [tuple([int(n) for n in cube.split('x')])
+                                     for cube in a.split(',')]
+            elif o in ("--extensions", "--channels", "--fields"):
+                settings[o[2:]] = listOf(a, int)
+            elif o in ("--spws", "--antennas", "--times", "--repeat"):
+                settings[o[2:]] = int(a)
+            elif o == "--scratch":
+                settings['scratch'] = a
+            elif o == "--keep":
+                settings['keep'] = True
+            elif o == "--results":
+                settings['results'] = a
+            elif o == "--compare":
+                settings['compare'] = a
+            elif o == "--extract-args":
+                settings['extractArgs'] = a.split()
+    except (getopt.GetoptError, ValueError):
+        sys.exit(usage(mod))
+    if arg or settings['repeat'] < 1: sys.exit(usage(mod))
+    return settings
+
+def listOf(text, kind, allowed=None):
+    """Return the <list> of the passed comma separated values <string>, as
+    the passed type, raising a ValueError on any not in allowed.
+    """
+    values = [kind(value) for value in text.split(',') if value]
+    if allowed and [value for value in values if value not in allowed]:
+        raise ValueError, "Unknown value in "+text
+    return values
+
+
+########################### cases ###########################
+
+def cases(settings):
+    """Yield the (suite, label, params, make, packings, modes) of each
+    dataset to be generated, where make(name) writes it, packings are the
+    packings of its type and modes the (mode, extract arguments) with which
+    it is timed.
+    """
+    spws, antennas, times = settings['spws'], settings['antennas'], \
+                            settings['times']
+    fitsPackings = ['plain', 'gz']
+    casaPackings = ['dir', 'tar', 'tgz']
+    for suite in settings['suites']:
+        if suite == 'fits':
+            for cube in settings['cubes']:
+                yield (suite, 'x'.join(map(str, cube)), {'shape': cube},
+                       lambda name, cube=cube: synthetic.fitsImage(name, cube),
+                       fitsPackings, fitsModes)
+        elif suite == 'mef':
+            for n in settings['extensions']:
+                yield (suite, "e%d" % n, {'extensions': n},
+                       lambda name, n=n: synthetic.fitsMef(name, n),
+                       fitsPackings, fitsModes[:1])
+        elif suite == 'uvfits':
+            for n in settings['channels']:
+                params = {'channels': n, 'antennas': antennas, 'times': times}
+                yield (suite, "c%d-a%d" % (n, antennas), params,
+                       lambda name, p=params: synthetic.uvFits(name, **p),
+                       fitsPackings, fitsModes[:1])
+        elif suite == 'image':
+            for cube in settings['cubes']:
+                yield (suite, 'x'.join(map(str, cube)), {'shape': cube},
+                       lambda name, cube=cube: synthetic.casaImage(name, cube),
+                       casaPackings, [('stats', [])])
+        elif suite in ('ms-channels', 'ms-fields'):
+            if suite == 'ms-channels':
+                scales = [(n, settings['fields'][0])
+                          for n in settings['channels']]
+            else:
+                scales = [(settings['channels'][0], n)
+                          for n in settings['fields']]
+            for channels, fields in scales:
+                params = {'channels': channels, 'fields': fields, 'spws': spws,
+                          'antennas': antennas, 'times': times}
+                yield (suite, "c%d-f%d-s%d-a%d" % (channels, fields, spws,
+                                                   antennas), params,
+                       lambda name, p=params: synthetic.measurementSet(name, **p),
+                       casaPackings, msModes)
+
+def pack(name, packing):
+    """Return the name of the passed dataset in the passed packing, writing
+    the gzipped file or tar archive.
+    """
+    if packing == 'gz':  return synthetic.gzipFile(name)
+    if packing == 'tar': return synthetic.tarDataset(name)
+    if packing == 'tgz': return synthetic.tarDataset(name, compress=True)
+    return name
+
+
+########################### timing ##########################
+
+def extractCommand():
+    """Return the <list> of the command running extract, and the environment
+    <dict> in which metaData can be imported.
+    """
+    packageDir = dirname(abspath(metaData.__file__))
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join([dirname(packageDir)] +
+                                        [p for p in [env.get('PYTHONPATH')] if p])
+    env.pop('METADATA_TIMING', None)
+    return [sys.executable, join(packageDir, 'extract.py')], env
+
+def timeExtract(dataset, workDir, extractArgs, repeat):
+    """Run extract on the passed dataset name <string>, repeat <int> times,
+    each in a new process, with --timing and the passed extract arguments
+    <list>, writing its output and timing records in workDir.
+
+    Return: <list> of the timing record <dict> of each run, with its process
+    wall time as 'processWall', or, should extract fail, a <string>, the
+    last line of its error output.
+
+    Each process extracts the one dataset, so that the maxRss of its record,
+    the process's peak resident size, is that of the dataset alone.
+    """
+    command, env = extractCommand()
+    timingFile   = join(workDir, 'timing.jsonl')
+    outputFile   = join(workDir, 'output')
+    records = []
+    for i in range(repeat):
+        if exists(timingFile): os.remove(timingFile)
+        start = time.time()
+        proc  = subprocess.Popen(command + ['--timing='+timingFile,
+                                            '--output='+outputFile] +
+                                 extractArgs + [dataset],
+                                 env=env, stdout=subprocess.PIPE,
+                                 stderr=subprocess.PIPE)
+        out, err = proc.communicate()
+        elapsed  = time.time() - start
+        if proc.returncode or not exists(timingFile):
+            lines = (err or out or "extract exited %d" % proc.returncode
+                     ).strip().splitlines()
+            return lines[-1]
+        fob = open(timingFile)
+        try:     record = json.loads(fob.readlines()[-1],
+                                 object_pairs_hook=OrderedDict)
+        finally: fob.close()
+        record['processWall'] = elapsed
+        records.append(record)
+    return records
+
+def caseResult(name, suite, params, packing, mode, size, records):
+    """Return the result <OrderedDict> of a case from the timing records
+    <list> of its runs, those of the run of least process wall time.
+    """
+    walls  = sorted([record['processWall'] for record in records])
+    best   = min(records, key=lambda record: record['processWall'])
+    result = OrderedDict([('name', name), ('suite', suite),
+                          ('mimeType', best['mimeType']),
+                          ('packing', packing), ('mode', mode),
+                          ('params', params), ('size', size),
+                          ('runs', len(records)),
+                          ('processWall', round(walls[0], 6)),
+                          ('processWallMedian', round(numpy.median(walls), 6)),
+                          ('wall', best['wall']), ('cpu', best['cpu']),
+                          ('maxRss', best['maxRss'])])
+    bytesRead = best['counters'].get('bytesRead', 0)
+    result['throughput'] = OrderedDict([
+        ('datasetsPerSecond', round(1.0 / walls[0], 3)),
+        ('megabytesPerSecond',
+         round(size / 1e6 / best['wall'], 3) if best['wall'] else None),
+        ('readMegabytesPerSecond',
+         round(bytesRead / 1e6 / best['wall'], 3) if best['wall'] else None)])
+    result['stages']   = best['stages']
+    result['counters'] = best['counters']
+    return result
+
+
+########################### reports #########################
+
+def runBench(settings):
+    """Generate, time and remove the datasets of all cases.
+
+    Return: <OrderedDict>, the results.
+    """
+    started = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    start   = time.time()
+    scratch = tempfile.mkdtemp(prefix='metaData-bench-', dir=settings['scratch'])
+    results = []
+    try:
+        for suite, label, params, make, packings, modes in cases(settings):
+            packings = [p for p in packings if p in settings['packings']]
+            if not packings: continue
+            caseDir = join(scratch, suite, label)
+            os.makedirs(caseDir)
+            name    = join(caseDir, "synthetic" + datasetSuffix(suite))
+            try:
+                make(name)
+                datasets = [(packing, pack(name, packing))
+                            for packing in packings]
+            except Exception, err:
+                for packing in packings:
+                    for mode, args in modes:
+                        results.append(skipped("/".join([suite, label, mode,
+                                                         packing]),
+                                               suite, params, packing, mode,
+                                               err))
+                        report(results[-1])
+                shutil.rmtree(caseDir, ignore_errors=True)
+                continue
+            for packing, dataset in datasets:
+                size = synthetic.datasetSize(dataset)
+                for mode, args in modes:
+                    caseName = "/".join([suite, label, mode, packing])
+                    records  = timeExtract(dataset, caseDir,
+                                           args + settings['extractArgs'],
+                                           settings['repeat'])
+                    if isinstance(records, basestring):
+                        result = OrderedDict([('name', caseName),
+                                              ('suite', suite),
+                                              ('packing', packing),
+                                              ('mode', mode),
+                                              ('params', params),
+                                              ('size', size),
+                                              ('error', records)])
+                    else:
+                        result = caseResult(caseName, suite, params, packing,
+                                            mode, size, records)
+                    results.append(result)
+                    report(result)
+            if not settings['keep']: shutil.rmtree(caseDir, ignore_errors=True)
+    finally:
+        if not settings['keep']: shutil.rmtree(scratch, ignore_errors=True)
+    settingsRecord = OrderedDict([(key, settings[key]) for key in
+                                  sorted(settings) if key not in
+                                  ('results', 'compare', 'scratch', 'keep')])
+    return OrderedDict([('metaData', version),
+                        ('python', platform.python_version()),
+                        ('numpy', numpy.__version__),
+                        ('host', platform.node()),
+                        ('platform', platform.platform()),
+                        ('started', started),
+                        ('elapsed', round(time.time() - start, 3)),
+                        ('scratch', settings['keep'] and scratch or None),
+                        ('settings', settingsRecord),
+                        ('cases', results)])
+
+def datasetSuffix(suite):
+    if suite in ('fits', 'mef'): return '.fits'
+    if suite == 'uvfits':        return '.uvfits'
+    if suite == 'image':         return '.image'
+    return '.ms'
+
+def skipped(name, suite, params, packing, mode, err):
+    return OrderedDict([('name', name), ('suite', suite),
+                        ('packing', packing), ('mode', mode),
+                        ('params', params),
+                        ('skipped', "%s: %s" % (err.__class__.__name__, err))])
+
+rowFormat = "%-46s %9s %9s %9s %9s %8s  %s"
+
+def report(result):
+    """Print the passed case result as one line of the results table."""
+    if 'skipped' in result or 'error' in result:
+        print "%-46s %s" % (result['name'], result.get('skipped') or
+                            "FAIL "+result['error'])
+    else:
+        stages  = [(entry['wall'], stage) for stage, entry in
+                   result['stages'].items()]
+        slowest = max(stages)
+        print rowFormat % (result['name'], "%.2f" % (result['size']/1e6),
+                           "%.3f" % result['processWall'],
+                           "%.3f" % result['wall'],
+                           "%.1f" % (result['throughput']['megabytesPerSecond']
+                                     or 0.0),
+                           "%.1f" % (result['maxRss']/1024.),
+                           "%s %.3f" % (slowest[1], slowest[0]))
+    sys.stdout.flush()
+    return
+
+def compare(results, earlierName):
+    """Print the ratios of the process wall time and peak resident size of
+    each case to those of the same case in the named earlier results file.
+    """
+    fob = open(earlierName)
+    try:     earlier = json.load(fob)
+    finally: fob.close()
+    before = dict([(case['name'], case) for case in earlier['cases']
+                   if 'processWall' in case])
+    print "\nCompared with", earlierName, "(metaData v%s, %s):" % (
+        earlier.get('metaData'), earlier.get('started'))
+    print "%-46s %9s %9s" % ("case", "wall", "maxRss")
+    for case in results['cases']:
+        old = before.get(case['name'])
+        if not old or 'processWall' not in case: continue
+        print "%-46s %8.2fx %8.2fx" % (case['name'],
+                                       case['processWall']/old['processWall'],
+                                       float(case['maxRss'])/old['maxRss'])
+    return
+
+
+if __name__ == '__main__':
+
+    settings = handleCLargs(sys.argv)
+    print "metaData, v"+version+": extraction benchmarks,",\
+        settings['repeat'], "run(s) a case\n"
+    print rowFormat % ("case", "MB", "process s", "extract s", "MB/s",
+                       "RSS MB", "slowest stage s")
+    results  = runBench(settings)
+    fileName = settings['results'] or time.strftime(
+                   "metaData-bench-%Y%m%dT%H%M%S.json", time.gmtime())
+    fob = open(fileName, "w")
+    try:     json.dump(results, fob, indent=1)
+    finally: fob.close()
+    print "\nResults written to", fileName
+    if settings['compare']: compare(results, settings['compare'])
+    sys.exit()
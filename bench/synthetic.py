@@ -0,0 +1,376 @@
+#!/usr/bin/env python
+#
+#                                                 CyberSKA CASA Metadata Project
+#
+#                                                  metaData.bench.synthetic.py
+#                                                  metaData maintainers, 2026-10
+# ------------------------------------------------------------------------------
+
+"""Synthetic datasets of each MIME type, at a given scale, for the
+benchmarks of bench/runBench.py.
+
+    fitsImage()        image/fits       a FITS image cube
+    fitsMef()          image/fits       a primary header and image extensions
+    uvFits()           image/fits-uvw   random groups visibilities, AN table
+    casaImage()        image/ms-image   a Casa Image cube        (pyrap)
+    measurementSet()   image/ms-uvw     fields x spws x channels (pyrap)
+
+and their packings, a gzipped FITS file, gzipFile(), and a tar or gzipped
+tar archive of a Casa Tables dataset, tarDataset(). Pixels, visibilities
+and flags are seeded random values; data are written a plane, or a time
+step, at a time, so that memory does not grow with the dataset. Each
+function returns the name of the dataset written.
+
+Casa Images and Measurement Sets are made with pyrap, imported as they are
+made, and an ImportError is raised without it.
+"""
+
+# $Id$
+# ------------------------------------------------------------------------------
+__version__      = '$Revision$'[11:-3]
+__version_date__ = '$Date$'[7:-3]
+__author__       = "metaData maintainers"
+# ------------------------------------------------------------------------------
+
+import os
+import gzip
+import shutil
+import tarfile
+
+import numpy
+
+from os.path import basename, isdir, join
+
+blockSize = 2880
+cardSize  = 80
+
+# Observation values common to all datasets.
+telescope = 'SYNTH'
+observer  = 'metaData bench'
+target    = 'SYNTHETIC'
+dateObs   = '2012-12-12T00:00:00'
+mjdStart  = 56273.0 * 86400             # 2012-12-12, MJD seconds
+refFreq   = 1.4e9                       # Hz
+chanWidth = 1.0e6                       # Hz, per spectral window channel
+raDec     = (3.5, -0.5)                 # field 0 direction, radians
+
+########################### FITS ############################
+
+def card(key, value=None, comment=''):
+    """Return the 80 character card image <string> of the passed key and
+    value, bool, int, float or string, with fixed format values.
+    """
+    if value is None:
+        image = "%-8s%s" % (key, comment)
+    else:
+        if isinstance(value, bool):
+            field = "%20s" % (value and "T" or "F")
+        elif isinstance(value, (int, long)):
+            field = "%20d" % value
+        elif isinstance(value, float):
+            field = "%20s" % repr(value).upper()
+        else:
+            field = "%-20s" % ("'%-8s'" % str(value).replace("'", "''"))
+        image = "%-8s= %s" % (key, field)
+        if comment: image += " / " + comment
+    return image[:cardSize].ljust(cardSize)
+
+def header(cards):
+    """Return the header <string> of the passed card images, with its END
+    card, padded to whole blocks.
+    """
+    text = "".join(cards) + "END".ljust(cardSize)
+    return text + " " * padding(len(text))
+
+def padding(nbytes):
+    return (blockSize - nbytes % blockSize) % blockSize
+
+def imageCards(shape, bitpix=-32):
+    """Return the axis and world coordinate cards of an image of the passed
+    numpy order shape <tuple>, (y, x), (freq, y, x) or (stokes, freq, y, x).
+    """
+    naxis = len(shape)
+    cards = [card('BITPIX', bitpix), card('NAXIS', naxis)]
+    for i in range(naxis):
+        cards.append(card('NAXIS%d' % (i+1), shape[naxis-1-i]))
+    axes  = [('RA---SIN', numpy.degrees(raDec[0]), -1.0/3600),
+             ('DEC--SIN', numpy.degrees(raDec[1]),  1.0/3600),
+             ('FREQ',     refFreq, chanWidth),
+             ('STOKES',   1.0, 1.0)]
+    for i in range(naxis):
+        ctype, crval, cdelt = axes[i]
+        cards.extend([card('CTYPE%d' % (i+1), ctype),
+                      card('CRVAL%d' % (i+1), float(crval)),
+                      card('CDELT%d' % (i+1), float(cdelt)),
+                      card('CRPIX%d' % (i+1), float(shape[naxis-1-i]//2 + 1))])
+    return cards
+
+def observationCards():
+    return [card('BUNIT', 'JY/BEAM'), card('OBJECT', target),
+            card('TELESCOP', telescope), card('OBSERVER', observer),
+            card('DATE-OBS', dateObs), card('RESTFREQ', refFreq)]
+
+def writeImageData(fob, shape, random):
+    """Write random float32 pixels of the passed shape, a plane at a time,
+    padded to whole blocks.
+    """
+    plane  = shape[-2:]
+    planes = 1
+    for n in shape[:-2]: planes *= n
+    for i in range(planes):
+        fob.write(random.standard_normal(plane).astype('>f4').tostring())
+    fob.write("\0" * padding(planes * plane[0] * plane[1] * 4))
+    return
+
+def fitsImage(fileName, shape=(64, 256, 256), seed=0):
+    """Write a FITS image of the passed numpy order shape <tuple>."""
+    random = numpy.random.RandomState(seed)
+    cards  = [card('SIMPLE', True)] + imageCards(shape) + observationCards()
+    fob = open(fileName, 'wb')
+    try:
+        fob.write(header(cards))
+        writeImageData(fob, shape, random)
+    finally: fob.close()
+    return fileName
+
+def fitsMef(fileName, extensions=8, shape=(256, 256), seed=0):
+    """Write a FITS file of a data-less primary header and the passed number
+    of image extensions <int>, each of the passed shape <tuple>.
+    """
+    random  = numpy.random.RandomState(seed)
+    primary = [card('SIMPLE', True), card('BITPIX', 8), card('NAXIS', 0),
+               card('EXTEND', True), card('NEXTEND', extensions)]
+    fob = open(fileName, 'wb')
+    try:
+        fob.write(header(primary + observationCards()))
+        for i in range(extensions):
+            cards = [card('XTENSION', 'IMAGE')] + imageCards(shape) + \
+                    [card('PCOUNT', 0), card('GCOUNT', 1),
+                     card('EXTNAME', 'SCI'), card('EXTVER', i+1)]
+            fob.write(header(cards))
+            writeImageData(fob, shape, random)
+    finally: fob.close()
+    return fileName
+
+def uvFits(fileName, channels=64, antennas=16, times=20, stokes=4, seed=0):
+    """Write a random groups UVFITS file of the passed number of channels,
+    antennas, integrations and Stokes parameters <int>, one group per
+    baseline and integration, followed by an AIPS AN table.
+    """
+    random    = numpy.random.RandomState(seed)
+    baselines = [(a1, a2) for a1 in range(1, antennas+1)
+                          for a2 in range(a1+1, antennas+1)]
+    groups    = len(baselines) * times
+    cards = [card('SIMPLE', True), card('BITPIX', -32), card('NAXIS', 7),
+             card('NAXIS1', 0), card('NAXIS2', 3), card('NAXIS3', stokes),
+             card('NAXIS4', channels), card('NAXIS5', 1), card('NAXIS6', 1),
+             card('NAXIS7', 1), card('EXTEND', True), card('GROUPS', True),
+             card('PCOUNT', 6), card('GCOUNT', groups),
+             card('CTYPE2', 'COMPLEX'), card('CRVAL2', 1.0),
+             card('CTYPE3', 'STOKES'), card('CRVAL3', -1.0),
+             card('CDELT3', -1.0), card('CRPIX3', 1.0),
+             card('CTYPE4', 'FREQ'), card('CRVAL4', refFreq),
+             card('CDELT4', chanWidth), card('CRPIX4', 1.0),
+             card('CTYPE5', 'IF'), card('CRVAL5', 1.0),
+             card('CTYPE6', 'RA'), card('CRVAL6', float(numpy.degrees(raDec[0]))),
+             card('CTYPE7', 'DEC'), card('CRVAL7', float(numpy.degrees(raDec[1]))),
+             card('PTYPE1', 'UU---SIN'), card('PTYPE2', 'VV---SIN'),
+             card('PTYPE3', 'WW---SIN'), card('PTYPE4', 'BASELINE'),
+             card('PTYPE5', 'DATE'), card('PSCAL5', 1.0),
+             card('PZERO5', 2456273.5), card('PTYPE6', 'DATE')]
+    cards.extend(observationCards())
+    groupSize = 6 + 3 * stokes * channels
+    fob = open(fileName, 'wb')
+    try:
+        fob.write(header(cards))
+        baseline = numpy.array([256*a1 + a2 for a1, a2 in baselines], 'f4')
+        for t in range(times):
+            block = random.standard_normal((len(baselines), groupSize))
+            block[:,3] = baseline
+            block[:,4] = 0.0
+            block[:,5] = t * 10.0 / 86400
+            fob.write(block.astype('>f4').tostring())
+        fob.write("\0" * padding(groups * groupSize * 4))
+        writeAntennaTable(fob, antennas)
+    finally: fob.close()
+    return fileName
+
+def writeAntennaTable(fob, antennas):
+    """Write an AIPS AN binary table of the passed number of antennas."""
+    cards = [card('XTENSION', 'BINTABLE'), card('BITPIX', 8),
+             card('NAXIS', 2), card('NAXIS1', 32), card('NAXIS2', antennas),
+             card('PCOUNT', 0), card('GCOUNT', 1), card('TFIELDS', 2),
+             card('TTYPE1', 'ANNAME'), card('TFORM1', '8A'),
+             card('TTYPE2', 'STABXYZ'), card('TFORM2', '3D'),
+             card('TUNIT2', 'METERS'), card('EXTNAME', 'AIPS AN'),
+             card('ARRNAM', telescope)]
+    fob.write(header(cards))
+    rows = []
+    for a in range(antennas):
+        rows.append(("A%02d" % (a+1)).ljust(8) +
+                    numpy.array([a * 100.0, 0.0, 0.0], '>f8').tostring())
+    fob.write("".join(rows))
+    fob.write("\0" * padding(32 * antennas))
+    return
+
+def gzipFile(fileName):
+    """Write a gzipped copy of the passed file, fileName + '.gz'."""
+    fob = open(fileName, 'rb')
+    gz  = gzip.open(fileName + '.gz', 'wb')
+    try:     shutil.copyfileobj(fob, gz, 1024*1024)
+    finally:
+        gz.close()
+        fob.close()
+    return fileName + '.gz'
+
+######################## CASA Tables ########################
+
+def casaImage(imageName, shape=(64, 256, 256), seed=0):
+    """Write a Casa Image of the passed numpy order shape <tuple>, eg.
+    (freq, y, x) or (freq, stokes, y, x), with pyrap's default coordinates.
+    """
+    from pyrap.images import image as pyrapimage
+    random = numpy.random.RandomState(seed)
+    im     = pyrapimage(imageName, shape=list(shape), overwrite=True)
+    planes = [()]
+    for n in shape[:-2]:
+        planes = [p + (i,) for p in planes for i in range(n)]
+    for plane in planes:
+        data = random.standard_normal((1,)*len(plane) + tuple(shape[-2:]))
+        im.putdata(data.astype('f4'), blc=list(plane) + [0, 0])
+    del im
+    return imageName
+
+def measurementSet(msName, fields=1, spws=1, channels=64, antennas=16,
+                   times=20, corrs=4, flagged=0.05, seed=0):
+    """Write a Measurement Set of the passed numbers of fields, spectral
+    windows, channels per window, antennas, integrations per field and
+    correlations <int>, with the passed fraction <float> of its FLAG set.
+    Each field is observed in a scan of its own, every integration holding
+    all cross correlation baselines in every window.
+    """
+    from pyrap.tables import table as pyraptable, default_ms
+    random    = numpy.random.RandomState(seed)
+    baselines = [(a1, a2) for a1 in range(antennas)
+                          for a2 in range(a1+1, antennas)]
+    ms = default_ms(msName)
+    try:
+        subTable = lambda name: pyraptable(join(msName, name),
+                                           readonly=False, ack=False)
+        sub = subTable('ANTENNA')
+        sub.addrows(antennas)
+        sub.putcol('NAME',    ["A%02d" % a for a in range(antennas)])
+        sub.putcol('STATION', ["S%02d" % a for a in range(antennas)])
+        sub.putcol('TYPE',    ['GROUND-BASED'] * antennas)
+        sub.putcol('MOUNT',   ['ALT-AZ'] * antennas)
+        sub.putcol('DISH_DIAMETER', numpy.full(antennas, 25.0))
+        position = numpy.zeros((antennas, 3))
+        position[:,0] = 5109e3 + numpy.arange(antennas) * 100.0
+        sub.putcol('POSITION', position)
+        sub.close()
+
+        sub = subTable('FIELD')
+        sub.addrows(fields)
+        directions = numpy.zeros((fields, 1, 2))
+        directions[:,0,0] = raDec[0] + numpy.arange(fields) * 0.01
+        directions[:,0,1] = raDec[1]
+        sub.putcol('NAME',   ["%s_%d" % (target, f) for f in range(fields)])
+        sub.putcol('CODE',   [''] * fields)
+        sub.putcol('TIME',   numpy.full(fields, mjdStart))
+        sub.putcol('SOURCE_ID', numpy.arange(fields, dtype='i4'))
+        for column in ['PHASE_DIR', 'REFERENCE_DIR', 'DELAY_DIR']:
+            sub.putcol(column, directions)
+        sub.close()
+
+        sub = subTable('SPECTRAL_WINDOW')
+        sub.addrows(spws)
+        width = numpy.full((spws, channels), chanWidth)
+        freqs = refFreq + numpy.arange(spws)[:,None] * channels * chanWidth + \
+                numpy.arange(channels)[None,:] * chanWidth
+        sub.putcol('NUM_CHAN', numpy.full(spws, channels, 'i4'))
+        sub.putcol('NAME', ["SPW%d" % s for s in range(spws)])
+        sub.putcol('REF_FREQUENCY', freqs[:,0])
+        sub.putcol('TOTAL_BANDWIDTH', numpy.full(spws, channels * chanWidth))
+        sub.putcol('MEAS_FREQ_REF', numpy.full(spws, 5, 'i4'))    # TOPO
+        sub.putcol('CHAN_FREQ', freqs)
+        for column in ['CHAN_WIDTH', 'EFFECTIVE_BW', 'RESOLUTION']:
+            sub.putcol(column, width)
+        sub.close()
+
+        sub = subTable('POLARIZATION')
+        sub.addrows(1)
+        sub.putcol('NUM_CORR', numpy.array([corrs], 'i4'))
+        sub.putcol('CORR_TYPE', numpy.array([range(9, 9+corrs)], 'i4'))
+        products = [[0, 0], [0, 1], [1, 0], [1, 1]][:corrs]
+        sub.putcol('CORR_PRODUCT', numpy.array([products], 'i4'))
+        sub.close()
+
+        sub = subTable('DATA_DESCRIPTION')
+        sub.addrows(spws)
+        sub.putcol('SPECTRAL_WINDOW_ID', numpy.arange(spws, dtype='i4'))
+        sub.putcol('POLARIZATION_ID', numpy.zeros(spws, 'i4'))
+        sub.close()
+
+        sub = subTable('OBSERVATION')
+        sub.addrows(1)
+        sub.putcol('TELESCOPE_NAME', [telescope])
+        sub.putcol('OBSERVER', [observer])
+        sub.putcol('PROJECT', ['BENCH'])
+        sub.putcol('TIME_RANGE', numpy.array([[mjdStart, mjdStart +
+                                               fields * times * 10.0]]))
+        sub.close()
+
+        ms.addrows(fields * times * spws * len(baselines))
+        ant1 = numpy.array([b[0] for b in baselines] * spws, 'i4')
+        ant2 = numpy.array([b[1] for b in baselines] * spws, 'i4')
+        ddid = numpy.repeat(numpy.arange(spws, dtype='i4'), len(baselines))
+        nrow = len(ant1)
+        row  = 0
+        for field in range(fields):
+            for t in range(times):
+                time = mjdStart + (field * times + t) * 10.0
+                ms.putcol('TIME',          numpy.full(nrow, time), row, nrow)
+                ms.putcol('TIME_CENTROID', numpy.full(nrow, time), row, nrow)
+                ms.putcol('INTERVAL',      numpy.full(nrow, 10.0), row, nrow)
+                ms.putcol('EXPOSURE',      numpy.full(nrow, 9.5),  row, nrow)
+                ms.putcol('ANTENNA1',      ant1, row, nrow)
+                ms.putcol('ANTENNA2',      ant2, row, nrow)
+                ms.putcol('DATA_DESC_ID',  ddid, row, nrow)
+                ms.putcol('FIELD_ID',      numpy.full(nrow, field, 'i4'),
+                          row, nrow)
+                ms.putcol('SCAN_NUMBER',   numpy.full(nrow, field+1, 'i4'),
+                          row, nrow)
+                ms.putcol('UVW', random.uniform(-3e3, 3e3, (nrow, 3)),
+                          row, nrow)
+                ms.putcol('FLAG', random.random_sample(
+                              (nrow, channels, corrs)) < flagged, row, nrow)
+                ms.putcol('FLAG_ROW', numpy.zeros(nrow, bool), row, nrow)
+                ms.putcol('WEIGHT', numpy.ones((nrow, corrs), 'f4'),
+                          row, nrow)
+                ms.putcol('SIGMA',  numpy.ones((nrow, corrs), 'f4'),
+                          row, nrow)
+                row += nrow
+    finally: ms.close()
+    return msName
+
+def tarDataset(datasetName, compress=False):
+    """Write a tar archive of the passed Casa Tables dataset directory,
+    datasetName + '.tar', or, compressed, '.tar.gz'.
+    """
+    if compress: tarName, mode = datasetName + '.tar.gz', 'w:gz'
+    else:        tarName, mode = datasetName + '.tar',    'w'
+    archive = tarfile.open(tarName, mode)
+    try:     archive.add(datasetName, arcname=basename(datasetName))
+    finally: archive.close()
+    return tarName
+
+def datasetSize(name):
+    """Return the size in bytes <int> of the passed dataset file or
+    directory.
+    """
+    if not isdir(name): return os.path.getsize(name)
+    size = 0
+    for root, dirs, files in os.walk(name):
+        for fileName in files:
+            size += os.path.getsize(join(root, fileName))
+    return size
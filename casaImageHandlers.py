@@ -25,9 +25,11 @@ from pyrap.images   import image as pyrapimage
 from pyrap.images   import coordinates
 
 from metaData.utils.runUtils import redirectStdOut,resetStdOut
-from metaData.utils.runUtils import decdeg2hmsString, decdeg2dmsString
+from metaData.utils.runUtils import raDecStrings, dmsStrings
 from metaData.utils.runUtils import stringify, delist, vtranslate, ptime
+from metaData.utils.runUtils import defaultOptions, isoDateTimes
 from metaData.utils.genUtils import convertHz
+from metaData.utils          import imageStats, hdrWriter, stageTimer
 
 from metaData.convert import mjdConversions
 from metaData.metaDataVersion import pkg_name, version
@@ -127,23 +129,27 @@ class CasaImageHandlers(pyrapimage):
     appropriate way.
     """
 
-    def parseImage(self, mimeType):
+    def parseImage(self, mimeType, options=None):
         """Parse and extract required metadata from a CASA Image, as passed to the
         constructor.  Caller passes the MIME Type, which is determined prior to 
         instantiating this class.
         
         Parameters: <string>, the mimetype of the Casa Image, as determined (usually)
         by the MSMimeTyping class.
+                    <dict>, optional run options, see runUtils.defaultOptions.
+                    Only the 'stats' and 'statsMemory' options are used here.
 
         Return: void
         """
 
-        self.__setInstanceAttrs(mimeType)
-        self.pimCoords = self.coordinates()
-        self.pimageInfo= self.imageinfo()
-        self.imAxes    = self.buildImAxes()
-        self.axesNames = self.pimCoords._names
-        self.extract()
+        self.__setInstanceAttrs(mimeType, options)
+        with stageTimer.stage('coordinates'):
+            self.pimCoords = self.coordinates()
+            self.pimageInfo= self.imageinfo()
+            self.imAxes    = self.buildImAxes()
+            self.axesNames = self.pimCoords._names
+        with stageTimer.stage('conversions'):
+            self.extract()
         return
 
 
@@ -245,16 +251,11 @@ class CasaImageHandlers(pyrapimage):
         Parameters: none
         Return: tuple, (<string>, ISO8601 Date-Time, <string> time system)
         """
-        epochDelta   = 3506716800.
         daySecs      = 86400
         date,timesys = self.mjdObsDate()
         secondsMJD   = date*daySecs
 
-        try:
-            isoTime = time.strftime("%Y-%m-%dT%H:%M:%SZ", \
-                                        time.gmtime(secondsMJD - epochDelta))
-        except ValueError:
-            isoTime = "Invalid DATE-OBS"
+        isoTime = isoDateTimes([secondsMJD], "Invalid DATE-OBS")[0]
         return isoTime, timesys
 
 
@@ -385,9 +386,8 @@ class CasaImageHandlers(pyrapimage):
         """
         try:
             pc = self.pimCoords.dict()['pointingcenter']['value']
-            ra = decdeg2hmsString(degrees(pc[0]))
-            dec= decdeg2dmsString(degrees(pc[1]))
-            self.meta.append(("POINTING", str(ra)+"\t"+str(dec)))
+            ras, decs = raDecStrings([pc[0], pc[1]])
+            self.meta.append(("POINTING", ras[0]+"\t"+decs[0]))
         except KeyError:
             print "Pointing Information not found."
             pass
@@ -396,13 +396,28 @@ class CasaImageHandlers(pyrapimage):
 
     def imStats(self):
         """Build the image statistics onto an instance meta structure.
+        By default, statistics are computed by utils.imageStats, reading the
+        image in tile aligned chunks within the 'statsMemory' budget; the
+        'approx' stats mode estimates the median and quartiles from a sample
+        within the 'statsError' rank error bound. Passes are spread over
+        'statsWorkers' processes by image plane, each opening the image
+        itself. The 'casa' stats mode calls
+        image.statistics() over the whole image.
 
         Parameters: none
         Return: void
         """
-        stats = self.statistics()
-        for stat in statInclusions:
-            self.meta.append(("IMAGE-"+string.upper(stat),stringify(stats[stat])))
+        if self.statsMode == 'casa':
+            with stageTimer.stage('imStats'):
+                stats = self.statistics()
+            for stat in statInclusions:
+                self.meta.append(("IMAGE-"+string.upper(stat),stringify(stats[stat])))
+            return
+        with stageTimer.stage('imStats'):
+            stats = imageStats.imageStatistics(imageStats.ImageSource(self),
+                                               self.statsMemory, self.statsMode,
+                                               self.statsError, self.statsWorkers)
+        self.meta.extend(imageStats.statsMeta(stats))
         return
 
 
@@ -465,29 +480,25 @@ class CasaImageHandlers(pyrapimage):
         tar archive. 
         -- 28.09.2011
         """
-        fileWrite = inFileName + ".hdr"
-        fob = open(fileWrite,"w")
-        for key,val in self.meta:
-            sval = str(val)
-            if len(key) >= 16:
-                fob.write(key+"\t"+str(val)+"\n")
-            elif len(key) < 8:
-                fob.write(key+"  \t\t"+str(val)+"\n")
-            else: fob.write(key+"\t\t"+str(val)+"\n")
-        fob.close()
-        return fileWrite
+        return writeImageHdr(self.meta, inFileName + ".hdr")
 
     #################################### prive #################################
 
-    def __setInstanceAttrs(self, mimeType):
+    def __setInstanceAttrs(self, mimeType, options=None):
         """ Set some instance variables.
 
-        Parameters: none
+        Parameters: <string>, <dict>
         Return: void
         """
+        if options is None: options = defaultOptions
         self.imFileName = basename(self.name())
         self.mimeType   = mimeType
+        self.statsMode  = options['stats']
+        self.statsMemory= options['statsMemory']
+        self.statsError = options['statsError']
+        self.statsWorkers = options['statsWorkers']
         self.meta = []
+        self.values = {}    # native values by meta key, see extract.run()
         return
 
     def __buildCoordData(self, coordinateObj, coordinateType, i):
@@ -512,14 +523,16 @@ class CasaImageHandlers(pyrapimage):
         try:
             if coordinateType == 'direction':
                 refval = coordinateObj.get_referencevalue()
-                dec = decdeg2dmsString(degrees(refval[0]))
-                ra  = decdeg2hmsString(degrees(refval[1]))
-                raDecStr = dec+", "+ra
+                ras, decs = raDecStrings([refval[1], refval[0]])
+                raDecStr = decs[0]+", "+ras[0]
                 self.meta.append(("REFERENCE"+str(i)+"-VALUE", raDecStr))
+                self.values["REFERENCE"+str(i)+"-VALUE"] = refval
             elif coordinateType == 'spectral':
-                reftup = convertHz(coordinateObj.get_referencevalue())
+                hz     = coordinateObj.get_referencevalue()
+                reftup = convertHz(hz)
                 refval = stringify(delist(reftup))
                 self.meta.append(("REFERENCE"+str(i)+"-VALUE", refval))
+                self.values["REFERENCE"+str(i)+"-VALUE"] = hz
             else: 
                 refval = stringify(coordinateObj.get_referencevalue())
                 self.meta.append(("REFERENCE"+str(i)+"-VALUE", refval))
@@ -531,9 +544,8 @@ class CasaImageHandlers(pyrapimage):
         try:
             if coordinateType == 'direction':
                 cincr   = coordinateObj.get_increment()
-                cincdec = decdeg2dmsString(degrees(cincr[0]))
-                cincra  = decdeg2dmsString(degrees(cincr[1]))
-                cincstr = cincdec+", "+cincra
+                cincstr = ", ".join(dmsStrings([degrees(cincr[0]),
+                                                degrees(cincr[1])]))
                 self.meta.append(("INCREMENT"+str(i), cincstr))
                 self.meta.append(("INCREMENT"+str(i)+"_UNITS","deg, deg"))
             elif coordinateType == 'spectral':
@@ -554,9 +566,11 @@ class CasaImageHandlers(pyrapimage):
             self.meta.append(("PROJECTION"+str(i), cproj))
         except AttributeError: pass
         try: 
-            rfreqtup = convertHz(stringify(coordinateObj.get_restfrequency()))
+            hz       = coordinateObj.get_restfrequency()
+            rfreqtup = convertHz(stringify(hz))
             restfreq = stringify(delist(rfreqtup))
             self.meta.append(("REST-FREQUENCY", restfreq))
+            self.values["REST-FREQUENCY"] = hz
         except AttributeError: pass
         try: 
             velunit  = stringify(coordinateObj.__dict__['_coord']['velUnit'])
@@ -576,3 +590,14 @@ class CasaImageHandlers(pyrapimage):
         except KeyError: pass
 
         return
+
+
+def writeImageHdr(meta, fileName):
+    """Write the passed meta <list> of (key, value) tuples, as built by
+    CasaImageHandlers.extract(), to the named header file, or file-like
+    object, formatted by utils.hdrWriter.formatImageHdr().
+
+    Parameters: <list>, <string>
+    Return:     <string>, file name written.
+    """
+    return hdrWriter.writeHdr(hdrWriter.formatImageHdr(meta), fileName)
@@ -34,6 +34,7 @@ __author__       = "k.r. anderson, <ken.anderson@ubc.ca>"
 # 2011.08.22
 
 import math
+import numpy
 
 MJD0 = 2400000.5                  # 1858 November 17, 00:00:00 hours 
 
@@ -187,6 +188,100 @@ def caldate(mjd):
   #return (year,month,day,int(sign+str(hour)),minute,second)
 
 
+def julian_dates(year,month,day,hour,minute,second):
+  """Array julian_date(). Given arrays, or scalars, of year, month, day,
+  hour, minute and second, return an <ndarray> of JD.
+
+  The calendar arithmetic, and the Julian calendar switchover, are those
+  of julian_date(), done for the whole arrays at once with integer floor
+  division. The fraction of the day is summed from the numbers
+  themselves, as base60_to_decimal() does, without joining them into a
+  string and parsing it back, so seconds are not first rounded to the 12
+  significant digits of str().
+  """
+  year,month,day,hour,minute,second = numpy.broadcast_arrays(
+    year,month,day,hour,minute,second)
+  year,month,day,hour,minute = [numpy.asarray(x).astype(numpy.int64) for x in
+                                (year,month,day,hour,minute)]
+  second = numpy.asarray(second,dtype=numpy.float64)
+
+  early = month <= 2
+  month = numpy.where(early,month+12,month)
+  year = numpy.where(early,year-1,year)
+
+  # Julian calendar on or before 1582 October 4 and Gregorian calendar
+  # afterwards.
+  b = numpy.where((10000*year+100*month+day) <= 15821004,
+                  -2 + (year+4716)//4 - 1179,
+                  year//400 - year//100 + year//4)
+
+  mjdmidnight = 365*year - 679004 + b +\
+                numpy.trunc(30.6001*(month+1)).astype(numpy.int64) + day
+
+  hours = abs(hour) + abs(minute)/60.0 + abs(second)/3600.0
+  fracofday = numpy.where(hour < 0,-hours,hours) / 24.0
+
+  return MJD0 + mjdmidnight + fracofday
+
+
+def caldates(mjd,precision=1e-8):
+  """Array caldate(). Given an array, or a scalar, of mjd return a <list>
+  of the ISO 8601 date-time strings caldate() returns for each.
+
+  Dates, and hours, minutes and seconds, as decimal_to_base60() finds
+  them to within ``precision``, are computed for the whole array at once,
+  and the strings built in one pass. Non-finite mjd are passed to
+  caldate(), to fail as before.
+  """
+  mjd = numpy.asarray(mjd,dtype=numpy.float64).ravel()
+  if not numpy.isfinite(mjd).all():
+    return [caldate(m) for m in mjd.tolist()]
+
+  def whole(x):
+    return numpy.trunc(x).astype(numpy.int64)
+
+  a = whole(mjd+MJD0+0.5)
+  # Julian calendar on or before 1582 October 4 and Gregorian calendar
+  # afterwards.
+  b = whole((a-1867216.25)/36524.25)
+  c = numpy.where(a < 2299161,a + 1524,a + b - b//4 + 1525)
+
+  d = whole((c-122.1)/365.25)
+  e = 365*d + d//4
+  f = whole((c-e)/30.6001)
+
+  day = c - e - whole(30.6001*f)
+  month = f - 1 - 12*(f//14)
+  year = d - 4715 - (7+month)//10
+  hours = (mjd - numpy.floor(mjd)) * 24.0
+
+  frac1, hour = numpy.modf(hours)
+  frac2, minute = numpy.modf(frac1*60.0)
+  second = frac2*60.0
+
+  # Keep seconds and minutes in [0 - 60.0000), as decimal_to_base60(),
+  # whose carried minute of 60 becomes the <float> 0.0.
+  carry = abs(second - 60.0) < precision
+  second = numpy.where(carry,0.0,second)
+  minute = minute + carry
+  carry = abs(minute - 60.0) < precision
+  minute = numpy.where(carry,0.0,minute)
+  hour = hour + carry
+
+  minutes = minute.astype(numpy.int64).tolist()
+  for i in numpy.flatnonzero(carry):
+    minutes[i] = 0.0
+
+  sects = [year,month,day,hour.astype(numpy.int64),minute,second]
+  zeros = [numpy.where(sect < 10,"0","").tolist() for sect in sects]
+  sects = [sect.tolist() for sect in sects[:4]] + [minutes,second.tolist()]
+  parts = []
+  for zero, sect in zip(zeros,sects):
+    parts.extend([zero,sect])
+
+  return ["%s%s-%s%s-%s%sT%s%s:%s%s:%s%s" % date for date in zip(*parts)]
+
+
 if __name__ == '__main__':
   print "Julian date for 2010/1/1 13:20:12.3456 : ",
   j = julian_date(2010,1,1,13,20,12.3456)
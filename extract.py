@@ -15,14 +15,24 @@ __version_date__ = '$Date$'[7:-3]
 __author__       = "k.r. anderson, <ken.anderson@ubc.ca>"
 # ------------------------------------------------------------------------------
 
-import sys, logging
-from   os.path  import dirname, basename
+import os, sys, logging
+import time, tarfile
+import traceback
 
-from metaData import msMimeTyping, fitsMimeTyping
-from metaData import msHandlers, casaImageHandlers, fitsHandlers
-from metaData.utils import runUtils
+from   os.path         import dirname, basename, join
+from   cStringIO       import StringIO
+from   multiprocessing import Pool, cpu_count, util
+
+from metaData import fitsMimeTyping
+from metaData.utils import runUtils, tarUtils, resultCache, hdrWriter
+from metaData.utils import catalogue, stageTimer
 from metaData import metaDataVersion
 
+# The dataset handlers, the Measurement Set typer and the table sessions,
+# and with them pyrap, casacore and numpy, are imported only as a dataset of
+# their MIME type is typed or dispatched in run(), so that a FITS run never
+# loads casacore, nor a CASA Tables run the FITS handlers.
+
 class MimetypeError(TypeError):
     """Raise this if the Mime Typing returns something off.
     This shouldn't happen, of course, but just in case of 
@@ -31,191 +41,509 @@ class MimetypeError(TypeError):
     pass
 
 def getFitsMimeType(fitsFileName,verbosity):
-    fmtype = fitsMimeTyping.FITSMimeTyping(fitsFileName,verbosity)
-    mimeType = fmtype.buildType()
+    with stageTimer.stage('typing'):
+        fmtype = fitsMimeTyping.FITSMimeTyping(fitsFileName,verbosity)
+        mimeType = fmtype.buildType()
     return mimeType
 
-def getMSMimeType(msFileName,verbosity):
+def getMSMimeType(msFileName,verbosity,session=None):
     try: 
-        msTypingObj = msMimeTyping.MSMimeTyping(msFileName,verbosity)
-        mimeType = msTypingObj.buildType()
+        if not session:
+            with stageTimer.stage('import'):
+                from metaData import msMimeTyping
+        with stageTimer.stage('typing'):
+            if session:
+                mimeType = session.mimeType(verbosity)
+            else:
+                msTypingObj = msMimeTyping.MSMimeTyping(msFileName,verbosity)
+                mimeType = msTypingObj.buildType()
     except RuntimeError: mimeType = ''
     return mimeType
 
-def run(inFileName, mimeType, untarredName=""):
+def run(inFileName, mimeType, untarredName="", session=None, cache=None,
+        options=None, target=None):
     """Extract metadata of the appropriate mime type passed.
 
     Parameters: inFileName   <string>, dataset name
                 mimeType     <string>, the mime type of dataset
                 untarredName <string>, optional name for untarred file name.
+                session      <TableSession>, optional open table handles
+                             of a Measurement Set, shared with the typing.
+                cache        <ResultCache>, optional, in which the extracted
+                             meta is stored against inFileName.
+                options      <dict>, optional run options, see
+                             runUtils.defaultOptions.
+                target       optional file-like object, to which the output
+                             is written in place of a file, see writeOutput().
 
     Return: <bool> or <string>, None or the header file name written.
     """
     fileWrite= None
+    values   = None
+    stageTimer.note('mimeType', mimeType)
     if mimeType == "image/ms-uvw":
+        with stageTimer.stage('import'):
+            from metaData import msHandlers
         if untarredName:
-            handler   = msHandlers.MSHandlers(untarredName)
-        else: handler = msHandlers.MSHandlers(inFileName)
-        handler.parseMS(mimeType)
+            handler   = msHandlers.MSHandlers(untarredName, session=session)
+        else: handler = msHandlers.MSHandlers(inFileName, session=session)
+        handler.parseMS(mimeType, options)
         handler.buildFlatMeta()
-        fileWrite = handler.writeHdr(inFileName)
+        values = handler.values
     elif mimeType == "image/ms-image":
-        if untarredName:
-            handler   = casaImageHandlers.CasaImageHandlers(untarredName)
-        else: handler = casaImageHandlers.CasaImageHandlers(inFileName)
-        handler.parseImage(mimeType)
-        fileWrite = handler.writeHdr(inFileName)
+        with stageTimer.stage('import'):
+            from metaData import casaImageHandlers
+        with stageTimer.stage('open'):
+            if untarredName:
+                handler   = casaImageHandlers.CasaImageHandlers(untarredName)
+            else: handler = casaImageHandlers.CasaImageHandlers(inFileName)
+        stageTimer.count('tableOpens')
+        handler.parseImage(mimeType, options)
+        values = handler.values
     elif mimeType == "image/fits" or mimeType == "image/fits-uvw":
+        with stageTimer.stage('import'):
+            from metaData import fitsHandlers
         handler = fitsHandlers.FitsHandlers(inFileName)
-        handler.parseFits(mimeType)
-        fileWrite = handler.writeHdr()
+        handler.parseFits(mimeType, options)
     else:
         err = "Unknown File MIME Type on: "+inFileName
         raise MimetypeError, err
+    fileWrite = writeOutput(inFileName, mimeType, handler.meta, values,
+                            options, target)
+    if cache:
+        with stageTimer.stage('cache'):
+            cache.put(inFileName, mimeType, handler.meta, values)
     return fileWrite
 
 
-if __name__ == '__main__':
+def writeOutput(inFileName, mimeType, meta, values=None, options=None,
+                target=None):
+    """Write the output for the passed dataset name from its meta list and
+    native values, in the format of options['format'] (see
+    utils.hdrWriter.formatOutput), either to the file named as the dataset
+    with that format's extension, eg. '.hdr' or '.json', or to the passed
+    file-like target.
 
-    import shutil, tarfile
+    A target with an add() method, eg. a utils.catalogue.Catalogue, is
+    passed the dataset's meta and values instead.
 
-    # Initalise a default logger
-    logging.basicConfig(format="%(message)s")
-    logger = logging.getLogger()
-    logger.setLevel(logging.DEBUG)
+    Parameters: inFileName <string>, dataset name
+                mimeType   <string>, the mime type of dataset
+                meta       <list>, the handler meta list of the dataset
+                values     <dict>, optional native values, eg. MSHandlers.values
+                options    <dict>, run options, see runUtils.defaultOptions
+                target     optional file-like object or catalogue
 
-    #-----------------------------------------------------------------#
-    #                         Handle Cl Options
-    ##----------------------------------------------------------------#
+    Return: <string>, the file name written, or the target's name.
+    """
+    if options is None: options = runUtils.defaultOptions
+    if mimeType not in hdrWriter.formatters:
+        err = "Unknown File MIME Type on: "+inFileName
+        raise MimetypeError, err
+    with stageTimer.stage('write'):
+        if hasattr(target, 'add'):
+            target.add(inFileName, mimeType, meta, values)
+            return target.name
+        outputFormat = options['format']
+        output = hdrWriter.formatOutput(outputFormat, inFileName, mimeType,
+                                        meta, values)
+        if target is None:
+            target = inFileName + hdrWriter.extensions[outputFormat]
+        hdrWriter.writeHdr(output, target)
+        stageTimer.count('bytesWritten', len(output))
+    return getattr(target, 'name', target)
 
-    inFileName,verbosity = runUtils.handleCLargs(sys.argv)
 
-    #-----------------------------------------------------------------#
-    #                       End Handle Cl Options
-    ##----------------------------------------------------------------#
+def writeHdr(inFileName, mimeType, meta):
+    """Write a header file for the passed dataset name from a meta list
+    previously extracted, eg. as held by a ResultCache, without opening
+    the dataset.
+
+    Parameters: inFileName <string>, dataset name
+                mimeType   <string>, the mime type of dataset
+                meta       <list>, the handler meta list of the dataset
+
+    Return: <string>, the header file name written.
+    """
+    return writeOutput(inFileName, mimeType, meta)
+
+
+def openCache(options):
+    """Return a ResultCache as configured by the passed run options, or None
+    if no cache directory is configured.
+    """
+    if not options['cache']: return None
+    return resultCache.ResultCache(options['cache'], options['cacheSize'],
+                                   options['cacheHash'], cacheVariant(options))
 
-    # Get the MIME Type. This will take considerably longer if a tarfile
-    # is passed. Input can be 
-    # 
-    # -- FITS
-    # -- UVFITS
-    # -- UV Measurement Set, ) straight, tar, or gzip tar
-    # -- Casa Image,         ) straight, tar, or gzip tar
-    #
-    # Extracts all data in order to make pyrap work, which is why it
-    # takes so long. Dump in '.', then remove it.
-
-    # Testing first for a FITS file ...
-    # Verbosity clause eliminates 15 truth tests in previous version.
-    # See commented section below.
-    # New in v0.5.2, added 2012-12-12 kra.
 
+def cacheVariant(options):
+    """Return the ResultCache variant <string> of the passed run options,
+    naming those that change results.
+    """
+    return "%s %r %r %r %r %r %r" % (options['stats'], options['statsError'],
+                                     options['fitsStats'], options['msScan'],
+                                     options['msFlags'], options['msUvw'],
+                                     options['chanRuns'])
+
+
+# The (key, ResultCache, finalizer) held by this process, see processCache().
+heldCache = None
+
+def processCache(options):
+    """Return the ResultCache configured by the passed run options, opened
+    by the first dataset extracted in this process and held for the rest,
+    eg. by a batch or server worker, or None if no cache directory is
+    configured. The held cache is closed, and its hits' access times
+    written, as the process exits.
+    """
+    global heldCache
+    if not options['cache']: return None
+    key = (os.getpid(), options['cache'], options['cacheSize'],
+           options['cacheHash'], cacheVariant(options))
+    if heldCache is None or heldCache[0] != key:
+        # A finalizer does nothing in a process other than its own, eg. in
+        # a worker forked after the parent opened a cache.
+        if heldCache is not None: heldCache[2]()
+        cache     = openCache(options)
+        heldCache = (key, cache, util.Finalize(cache, cache.close,
+                                               exitpriority=10))
+    return heldCache[1]
+
+
+def extractDataset(inFileName, verbosity=False, options=None, target=None,
+                   mimeType=None):
+    """Determine the MIME type of, and extract metadata from, a single dataset.
+
+    Input can be
+
+    -- FITS
+    -- UVFITS
+    -- UV Measurement Set, ) straight, tar, or gzip tar
+    -- Casa Image,         ) straight, tar, or gzip tar
+
+    If a result cache is configured in the options and holds the dataset,
+    unchanged, the header is written from the cache, and the dataset is not
+    opened at all.
+
+    With timing switched on, by options['timing'] or the environment, a
+    record of the time spent in each stage is written, see utils.stageTimer.
+
+    Parameters: inFileName <string>, dataset name
+                verbosity  <bool>,   print progress to stdout
+                options    <dict>,   run options, see runUtils.defaultOptions
+                target     optional file-like object to write to, in place
+                           of a file named after the dataset
+                mimeType   <string>, optional MIME type of the dataset, if
+                           known, in which case it is not typed again
+
+    Return: <bool> or <string>, None or the header file name written.
+    """
+    if options is None: options = dict(runUtils.defaultOptions)
     if verbosity:
-        notice = "Wrote header to file: "
-        fileWrite = None
         print "\n\n\tThis is metaData, v"+metaDataVersion.version
         print "\t"+("-")*24+"\n"
         print "Operating on", inFileName
-        try:
-            print "\nTesting for tar ..."
-            if not tarfile.is_tarfile(inFileName):     # must be a FITS file
+    cache  = processCache(options)
+    timing = stageTimer.begin(inFileName, options)
+    error  = None
+    try:
+        if cache:
+            with stageTimer.stage('cache'):
+                hit = cache.get(inFileName)
+            if hit:
+                stageTimer.note('mimeType', hit[0])
+                stageTimer.note('cached', True)
+                fileWrite = writeOutput(inFileName, hit[0], hit[1], hit[2],
+                                        options, target)
+                if verbosity:
+                    print "\nGot a cached", hit[0], "result."
+                    print "Wrote header to file: ",fileWrite
+                return fileWrite
+        return typeAndRun(inFileName, verbosity, options, cache, target,
+                          mimeType)
+    except Exception, err:
+        error = "%s: %s" % (err.__class__.__name__, err)
+        raise
+    finally:
+        stageTimer.end(timing, error)
+
+
+def typeAndRun(inFileName, verbosity, options, cache=None, target=None,
+               mimeType=None):
+    """Determine the MIME type of a dataset and extract its metadata.
+
+    Tar archives must be extracted in order to make pyrap work. By default
+    only the tables and files needed for metadata are extracted (see
+    tarUtils); options['extract'] = 'full' extracts everything, which is why
+    that takes so long, as do the main table stages of utils.msMainTable.
+    Extraction is into a private scratch directory, removed however this
+    function exits.
+
+    Parameters: as extractDataset(), plus an optional ResultCache.
+    Return: <bool> or <string>, None or the header file name written.
+    """
+    notice    = "Wrote header to file: "
+    fileWrite = None
+    hint      = mimeType
+    try:
+        if verbosity: print "\nTesting for tar ..."
+        if not tarfile.is_tarfile(inFileName):     # must be a FITS file
+            if verbosity:
                 print "\ntarfile test is False"
                 print "\nCheck for FITS type."
-                mimeType = getFitsMimeType(inFileName,verbosity)
+            mimeType = hint or getFitsMimeType(inFileName,verbosity)
+            if verbosity:
                 print "\nGot a FITS mimetype:", mimeType
                 print "\ncalling run functional on",inFileName,",",mimeType
-                fileWrite = run(inFileName,mimeType)
-                print notice,fileWrite
-            else:
-                print "\ntarfile detected. Opening ..."
-                msTarObj     = tarfile.open(inFileName)
-                untarredName = msTarObj.getnames()[0]
-                print "Tarfile name is,",basename(inFileName),"is really",untarredName
-                msTarObj.extractall()             # dumps into '.' Watch out.
-                mimeType     = getMSMimeType(untarredName,verbosity)
-                print "\nGot an MS mimetype:",mimeType
-                del msTarObj
-                print "\ncalling run functional on",inFileName,",",mimeType
-                fileWrite = run(inFileName,mimeType,untarredName=untarredName)
-                print notice,fileWrite
-                print "\ndeleting untarred",mimeType,"dataset..."
-                shutil.rmtree(untarredName)
-        except IOError, err:
-            if "Is a directory:" in str(err):
-                print "Not tar ..."
-                mimeType = getMSMimeType(inFileName,verbosity)
-                print "\nGot an MS mimetype:",mimeType
-                if mimeType: 
-                    if verbosity: print "\ncalling run functional on",inFileName,",",mimeType
-                    fileWrite = run(inFileName,mimeType)
-                    print notice,fileWrite
-                else: 
+            fileWrite = run(inFileName,mimeType,cache=cache,options=options,
+                            target=target)
+            if verbosity: print notice,fileWrite
+        else:
+            if verbosity: print "\ntarfile detected. Opening ..."
+            with stageTimer.stage('import'):
+                from metaData import tableSession
+                from metaData.utils import msMainTable
+            msTarObj     = tarfile.open(inFileName)
+            fullExtract  = options['extract'] == 'full' or \
+                           msMainTable.readsMainTable(options)
+            scratch      = tarUtils.makeScratchDir(
+                               tarUtils.payloadSize(msTarObj, fullExtract),
+                               options['scratch'], options['shm'],
+                               options['shmCap'])
+            try:
+                with stageTimer.stage('tar-extract'):
+                    untarredName, nbytes = tarUtils.extractMeta(msTarObj,
+                                                                scratch,
+                                                                fullExtract)
+                stageTimer.count('bytesExtracted', nbytes)
+                if verbosity:
+                    print "Tarfile name is,",basename(inFileName),"is really",untarredName
+                    print "Extracted", nbytes, "bytes into", scratch
+                untarredName = join(scratch, untarredName)
+                session      = tableSession.TableSession(untarredName)
+                try:
+                    mimeType = hint or getMSMimeType(untarredName,verbosity,
+                                                     session)
+                    if verbosity: print "\nGot an MS mimetype:",mimeType
+                    del msTarObj
+                    if verbosity:
+                        print "\ncalling run functional on",inFileName,",",mimeType
+                    fileWrite = run(inFileName,mimeType,untarredName=untarredName,
+                                    session=session,cache=cache,
+                                    options=options,target=target)
+                    if verbosity: print notice,fileWrite
+                finally: session.close()
+            finally:
+                if verbosity: print "\ndeleting untarred dataset..."
+                with stageTimer.stage('scratch-remove'):
+                    tarUtils.removeScratchDir(scratch)
+    except IOError, err:
+        if "Is a directory:" in str(err):
+            if verbosity: print "Not tar ..."
+            with stageTimer.stage('import'):
+                from metaData import tableSession
+            session  = tableSession.TableSession(inFileName)
+            try:
+                mimeType = hint or getMSMimeType(inFileName,verbosity,session)
+                if verbosity: print "\nGot an MS mimetype:",mimeType
+                if mimeType:
+                    if verbosity:
+                        print "\ncalling run functional on",inFileName,",",mimeType
+                    fileWrite = run(inFileName,mimeType,session=session,
+                                    cache=cache,options=options,
+                                    target=target)
+                    if verbosity: print notice,fileWrite
+                elif verbosity:
                     print "Indeterminate MIME-TYPE on file:",inFileName
-            else: 
-                print "\n*** Hit an IOError. Probable fail on run() ***"
-                raise IOError,err
-    # not verbose clause
+            finally: session.close()
+        else:
+            if verbosity: print "\n*** Hit an IOError. Probable fail on run() ***"
+            raise IOError,err
+    return fileWrite
+
+
+def batchWorker(job):
+    """Pool worker for runBatch(). Extract one dataset, trapping any failure
+    so that one bad dataset does not take down the whole batch.
+
+    With options['output'] set, the output is not written to a file, but
+    returned, to be streamed by runBatch() to that output. Likewise, with
+    options['catalogue'] set, a <list> of the (inFileName, mimeType, meta,
+    values) of the dataset is returned, to be added by runBatch().
+
+    Parameters: job <tuple>, (inFileName, verbosity, options)
+    Return: <tuple>, (inFileName, header file written or None,
+                      error <string> or None, elapsed seconds <float>,
+                      output <string>, <list> or None)
+    """
+    inFileName, verbosity, options = job
+    start  = time.time()
+    error  = None
+    output = None
+    target = None
+    if options['catalogue']: target = Records(options['catalogue'])
+    elif options['output']:  target = StringIO()
+    try:
+        fileWrite = extractDataset(inFileName, verbosity, options, target)
+        if not fileWrite:
+            error = "Indeterminate MIME-TYPE, no header written"
+        elif options['catalogue']:
+            output    = list(target)
+        elif target:
+            fileWrite = options['output']
+            output    = target.getvalue()
+    except Exception, err:
+        fileWrite = None
+        error     = "%s: %s" % (err.__class__.__name__, err)
+        if verbosity: traceback.print_exc()
+    return inFileName, fileWrite, error, time.time() - start, output
+
+
+def runBatch(inFiles, verbosity=False, options=None):
+    """Extract metadata from many datasets over a pool of worker processes.
+    Passed directories that are not themselves CASA Tables are searched for
+    datasets (see runUtils.findDatasets). Each worker process imports pyrap
+    once, and then serves many datasets.
+
+    One line is reported per dataset as it completes, followed by an
+    aggregate summary. With options['output'] set, the output of every
+    dataset, eg. one JSON Lines record each, is written to that file, or
+    '-' for stdout, as the dataset completes, and reports to stdout then go
+    to stderr. With options['catalogue'] set, every dataset is added to
+    that catalogue by this process alone, many datasets per transaction.
+
+    Parameters: inFiles   <list>, dataset and/or directory names
+                verbosity <bool>
+                options   <dict>, run options, see runUtils.defaultOptions
+
+    Return: <int>, the number of datasets that failed.
+    """
+    if options is None: options = dict(runUtils.defaultOptions)
+    datasets = runUtils.findDatasets(inFiles, runUtils.writtenPaths(options))
+    jobs     = [(name, verbosity, options) for name in datasets]
+    workers  = min(options['workers'] or cpu_count(), len(jobs)) or 1
+    start    = time.time()
+    failed   = 0
+    output   = openOutput(options['output'])
+    catalogue= openCatalogue(options)
+    report   = sys.stdout
+    if output is sys.stdout: report = sys.stderr
+
+    print >>report, "metaData, v"+metaDataVersion.version+": extracting",\
+        len(jobs), "dataset(s) over", workers, "worker(s)"
+
+    if workers == 1:
+        pool    = None
+        results = (batchWorker(job) for job in jobs)
     else:
-        try:
-            if not tarfile.is_tarfile(inFileName):     # must be a FITS file
-                mimeType  = getFitsMimeType(inFileName,verbosity)
-                fileWrite = run(inFileName,mimeType)
+        pool    = Pool(processes=workers, initializer=runUtils.exitOnTerm)
+        results = pool.imap_unordered(batchWorker, jobs)
+
+    try:
+        for inFileName, fileWrite, error, elapsed, record in results:
+            if error:
+                failed += 1
+                print >>report, "FAIL  %8.2fs  %s: %s" % (elapsed, inFileName,
+                                                          error)
             else:
-                msTarObj     = tarfile.open(inFileName)
-                untarredName = msTarObj.getnames()[0]
-                msTarObj.extractall()             # dumps into '.' Watch out.
-                mimeType     = getMSMimeType(untarredName,verbosity)
-                del msTarObj
-                fileWrite = run(inFileName,mimeType,untarredName=untarredName)
-                shutil.rmtree(untarredName)
-        except IOError, err:
-            if "Is a directory:" in str(err):
-                mimeType = getMSMimeType(inFileName,verbosity)
-                if mimeType: 
-                    fileWrite = run(inFileName,mimeType)
-            else: 
-                raise IOError,err
-    sys.exit()
+                if catalogue:
+                    for dataset in record: catalogue.add(*dataset)
+                elif record:
+                    output.write(record)
+                    output.flush()
+                print >>report, "OK    %8.2fs  %s -> %s" % (elapsed, inFileName,
+                                                            fileWrite)
+            report.flush()
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+        if output and output is not sys.stdout: output.close()
+        if catalogue: catalogue.close()
+
+    elapsed = time.time() - start
+    print >>report, "_"*20
+    print >>report, "Datasets: %d, succeeded: %d, failed: %d, elapsed: %.2fs (%.2f datasets/s)"\
+        % (len(jobs), len(jobs) - failed, failed, elapsed,
+           len(jobs)/elapsed if elapsed else 0.)
+    return failed
+
+
+def openCatalogue(options):
+    """Return a Catalogue as configured by the passed run options, or None
+    if no catalogue file is configured.
+    """
+    if not options['catalogue']: return None
+    return catalogue.Catalogue(options['catalogue'])
+
+
+class Records(list):
+    """A <list> standing in for the named Catalogue in a batch worker, to
+    which the (inFileName, mimeType, meta, values) of each dataset are
+    added, for the batch parent to add to the catalogue.
+    """
+    def __init__(self, name):
+        list.__init__(self)
+        self.name = name
+
+    def add(self, *dataset):
+        self.append(dataset)
 
 
-    # if verbosity:
-    #     print "\n\n\tThis is metaData, v"+metaDataVersion.version
-    #     print "\t"+("-")*24+"\n"
-    #     print "Operating on", inFileName
-
-    # try:
-    #     if verbosity: print "\nTesting for tar ..."
-    #     if not tarfile.is_tarfile(inFileName):     # must be a FITS file
-    #         if verbosity: print "\ntarfile test is False"
-    #         if verbosity: print "\nCheck for FITS type."
-    #         mimeType = getFitsMimeType(inFileName,verbosity)
-    #         if verbosity: print "\nGot a FITS mimetype:", mimeType
-    #         if verbosity: print "\ncalling run functional on",inFileName,",",mimeType
-    #         run(inFileName,mimeType)
-    #     else:
-    #         if verbosity: print "\ntarfile detected. Opening ..."
-    #         msTarObj     = tarfile.open(inFileName)
-    #         untarredName = msTarObj.getnames()[0]
-    #         if verbosity: print "Tarfile name is,",basename(inFileName),"is really",untarredName
-    #         msTarObj.extractall()             # dumps into '.' Watch out.
-    #         mimeType     = getMSMimeType(untarredName,verbosity)
-    #         if verbosity: print "\nGot an MS mimetype:",mimeType
-    #         del msTarObj
-    #         if verbosity: print "\ncalling run functional on",inFileName,",",mimeType
-    #         run(inFileName,mimeType,untarredName=untarredName)
-    #         if verbosity: print "\ndeleting untarred",mimeType,"dataset..."
-    #         shutil.rmtree(untarredName)
-    # except IOError, err:
-    #     if "Is a directory:" in str(err):
-    #         if verbosity: print "Not tar ..."
-    #         mimeType = getMSMimeType(inFileName,verbosity)
-    #         if verbosity: print "\nGot an MS mimetype:",mimeType
-    #         if mimeType: 
-    #             if verbosity: print "\ncalling run functional on",inFileName,",",mimeType
-    #             run(inFileName,mimeType)
-    #         else: 
-    #             if verbosity: print "Indeterminate MIME-TYPE on file:",inFileName
-    #     else: 
-    #         if verbosity: print "\n*** Hit an IOError. Probable fail on run() ***"
-    #         raise IOError,err
-    # sys.exit()
+def openOutput(outputName):
+    """Return the file-like object to which options['output'] names the
+    output of all datasets to be written, i.e. stdout for '-', or the file
+    opened for writing, or None if outputName is None.
+    """
+    if outputName is None: return None
+    if outputName == "-":  return sys.stdout
+    return open(outputName, "wb")
+
+
+if __name__ == '__main__':
+
+    # Initalise a default logger
+    logging.basicConfig(format="%(message)s")
+    logger = logging.getLogger()
+    logger.setLevel(logging.DEBUG)
+
+    # Let scratch directories be cleaned up on a kill.
+    runUtils.exitOnTerm()
+
+    #-----------------------------------------------------------------#
+    #                         Handle Cl Options
+    ##----------------------------------------------------------------#
+
+    inFiles,verbosity,options = runUtils.handleCLargs(sys.argv)
+
+    if options['cacheInvalidate']:
+        cache   = openCache(options)
+        version = options['cacheInvalidate']
+        if version == 'old': version = None
+        print "Removed", cache.invalidate(version), "cached result(s)."
+        cache.close()
+        if not inFiles: sys.exit()
+
+    #-----------------------------------------------------------------#
+    #                       End Handle Cl Options
+    ##----------------------------------------------------------------#
+
+    if options['serve']:
+        from metaData import extractServer
+        try: extractServer.serve(options['serve'], options, verbosity)
+        except (IOError, ImportError), err: sys.exit(str(err))
+        sys.exit()
+
+    if options['connect']:
+        from metaData import extractServer
+        sys.exit(extractServer.runClient(inFiles, verbosity, options) and 1 or 0)
+
+    if options['batch']:
+        sys.exit(runBatch(inFiles, verbosity, options) and 1 or 0)
+
+    output = openCatalogue(options) or openOutput(options['output'])
+    try:     extractDataset(inFiles[0], verbosity, options, output)
+    finally:
+        if output and output is not sys.stdout: output.close()
+    sys.exit()
@@ -0,0 +1,389 @@
+#!/usr/bin/env python
+#
+#                                                 CyberSKA CASA Metadata Project
+#
+#                                                      metaData.extractServer.py
+#                                                  metaData maintainers, 2026-10
+# ------------------------------------------------------------------------------
+
+"""A persistent extraction server, and its client.
+
+Every run of extract pays for interpreter startup, the numpy, pyrap and
+casacore imports and their initialisation, which for a small FITS file is
+longer than the extraction itself. A server, started once,
+
+    $ metaData/extract --serve=/tmp/metaData.sock --workers=4 [options]
+
+keeps a pool of worker processes, each of which has made those imports,
+and serves extraction jobs over a Unix domain socket, with the run options
+it was started with. The socket is made readable and writable by its owner
+only. The client, the same extract command,
+
+    $ metaData/extract --connect=/tmp/metaData.sock <dataset>
+    $ metaData/extract --connect=/tmp/metaData.sock --batch <dataset or dir> ...
+
+sends the datasets as jobs, and reports as extract and extract --batch do.
+
+The protocol is one JSON object per line each way. A job is
+
+    {"id": <any>, "path": <absolute dataset name>, "mimeType": <hint>,
+     "format": <hdr|json|jsonl|msgpack>, "output": <bool>}
+
+of which only "path" is required. A MIME type hint, eg. 'image/fits', spares
+the server typing the dataset. Without "output", the server writes the
+dataset's header, or record, to its usual file; with it, nothing is written
+and the output is returned. The reply to a job is
+
+    {"id": <the job's>, "path": <dataset>, "file": <file written>,
+     "error": <string or null>, "elapsed": <seconds>, "output": <string>}
+
+with msgpack output base64 encoded, marked by "encoding": "base64". Jobs
+of one connection run concurrently over the pool; replies are sent as each
+completes, not in job order, by a writer thread of the connection, so
+that a client slow to read holds up only its own replies. The client ends
+its jobs by shutting down its side of the socket, and the server closes the
+connection once all of them are answered.
+
+A job whose worker dies, eg. on a casacore segfault, is never completed by
+the pool. Should none of a connection's outstanding jobs complete within
+options['jobTimeout'] seconds, they are all answered with a timeout error.
+"""
+
+# $Id$
+# ------------------------------------------------------------------------------
+__version__      = '$Revision$'[11:-3]
+__version_date__ = '$Date$'[7:-3]
+__author__       = "metaData maintainers"
+# ------------------------------------------------------------------------------
+
+import os, sys
+import json, time
+import base64
+import socket
+import threading
+import traceback
+import Queue
+
+from   os.path         import abspath, exists
+from   cStringIO       import StringIO
+from   multiprocessing import Pool, cpu_count
+
+from metaData import extract
+from metaData.utils import runUtils, hdrWriter
+from metaData import metaDataVersion
+
+# Seconds for which a connection's queued replies may wait on a client that
+# has stopped reading, once all are answered, before it is dropped.
+drainTimeout = 60.0
+
+# Run options of a server pool worker process.
+serverOptions = None
+
+def initWorker(options):
+    """Pool initializer: hold the server's run options, have SIGTERM exit
+    cleanly, and import the dataset handlers, and through them pyrap and
+    casacore, once.
+    """
+    global serverOptions
+    serverOptions = options
+    runUtils.exitOnTerm()
+    importHandlers()
+    return
+
+
+def importHandlers():
+    """Import the dataset handlers, and through them pyrap and casacore."""
+    from metaData import msHandlers, casaImageHandlers, fitsHandlers
+    return
+
+
+def serveJob(job):
+    """Pool worker: extract one dataset of the passed job <dict>, trapping
+    any failure.
+
+    Return: <dict>, the reply to the job.
+    """
+    start  = time.time()
+    reply  = {'id': job.get('id'), 'path': job.get('path'), 'file': None,
+              'error': None}
+    options = dict(serverOptions or runUtils.defaultOptions)
+    options['format'] = job.get('format') or options['format']
+    target = None
+    if job.get('output'): target = StringIO()
+    try:
+        checkJob(job)
+        fileWrite = extract.extractDataset(job['path'], False, options, target,
+                                           job.get('mimeType'))
+        if not fileWrite:
+            reply['error'] = "Indeterminate MIME-TYPE, no header written"
+        elif target is None:
+            reply['file'] = fileWrite
+        elif options['format'] == 'msgpack':
+            reply['output']   = base64.b64encode(target.getvalue())
+            reply['encoding'] = 'base64'
+        else:
+            reply['output'] = target.getvalue()
+    except Exception, err:
+        reply['error'] = "%s: %s" % (err.__class__.__name__, err)
+    reply['elapsed'] = time.time() - start
+    return reply
+
+
+def checkJob(job):
+    """Raise a ValueError if the passed job <dict> is malformed."""
+    if not isinstance(job.get('path'), basestring):
+        raise ValueError, "A job must give a dataset 'path'"
+    if job.get('format') and job['format'] not in hdrWriter.outputFormats:
+        raise ValueError, "Unknown output format: "+str(job['format'])
+    if job.get('mimeType') and job['mimeType'] not in hdrWriter.formatters:
+        raise ValueError, "Unknown MIME type: "+str(job['mimeType'])
+    return
+
+
+def listen(socketName):
+    """Return a listening Unix domain socket bound to the passed name
+    <string>, readable and writable by its owner only. A socket file left
+    by a server no longer running is replaced; raises an IOError if a
+    server is running on it.
+    """
+    if exists(socketName):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(socketName)
+            probe.close()
+            raise IOError, "A server is already listening on "+socketName
+        except socket.error:
+            os.remove(socketName)
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    umask    = os.umask(0177)
+    try:     listener.bind(socketName)
+    finally: os.umask(umask)
+    listener.listen(16)
+    return listener
+
+
+def serve(socketName, options=None, verbosity=False):
+    """Serve extraction jobs on the passed Unix domain socket name <string>
+    until killed, over a pool of options['workers'] processes (0 for one per
+    cpu), running each job with the passed run options <dict>. Raises an
+    ImportError if the dataset handlers cannot be imported.
+    """
+    if options is None: options = dict(runUtils.defaultOptions)
+    # Should the handlers not import, eg. without pyrap, every worker would
+    # die in initWorker(), and the pool replace it, forever, while clients
+    # waited on their jobs. Fail here instead, before listening.
+    try: importHandlers()
+    except ImportError, err:
+        raise ImportError, "Cannot serve, the handlers do not import: "+str(err)
+    workers  = options['workers'] or cpu_count()
+    listener = listen(socketName)
+    pool     = Pool(processes=workers, initializer=initWorker,
+                    initargs=(options,))
+    print >>sys.stderr, "metaData, v"+metaDataVersion.version+": serving on",\
+        socketName, "over", workers, "worker(s)"
+    try:
+        while True:
+            conn, address = listener.accept()
+            handler = threading.Thread(target=handleConnection,
+                                       args=(conn, pool, verbosity,
+                                             options['jobTimeout']))
+            handler.daemon = True
+            handler.start()
+    finally:
+        listener.close()
+        try: os.remove(socketName)
+        except OSError: pass
+        pool.terminate()
+        pool.join()
+    return
+
+
+def handleConnection(conn, pool, verbosity=False, jobTimeout=None):
+    """Read the jobs of one client connection, one JSON line each, until
+    the client shuts down its side, run them over the pool, and reply to
+    each as it completes, or as timed out after jobTimeout <float> seconds
+    in which none completes (None or 0 for no limit). Replies are queued to
+    a writer thread. The connection is closed when all jobs are answered,
+    and their replies sent or drainTimeout passed.
+    """
+    lock     = threading.Lock()
+    replies  = Queue.Queue()
+    pending  = []
+    answered = set()
+    writer   = threading.Thread(target=writeReplies, args=(conn, replies))
+    writer.daemon = True
+    writer.start()
+
+    def reply(response, index=None):
+        """Queue the response, once only for the job of the passed index."""
+        lock.acquire()
+        try:
+            if index is not None:
+                if index in answered: return
+                answered.add(index)
+        finally: lock.release()
+        if verbosity:
+            print >>sys.stderr, "%s  %8.2fs  %s" % (
+                response['error'] and "FAIL" or "OK  ",
+                response.get('elapsed', 0.0), response['path'])
+        replies.put(json.dumps(response, separators=(',', ':')) + "\n")
+        return
+
+    fob = conn.makefile('rb')
+    try:
+        while True:
+            line = fob.readline()
+            if not line: break
+            if not line.strip(): continue
+            try:
+                job = json.loads(line)
+                if not isinstance(job, dict):
+                    raise ValueError, "A job must be a JSON object"
+                checkJob(job)
+            except ValueError, err:
+                reply({'id': None, 'path': None, 'file': None,
+                       'error': "%s: %s" % (err.__class__.__name__, err)})
+                continue
+            callback = lambda response, index=len(pending): \
+                           reply(response, index)
+            pending.append((job, time.time(),
+                            pool.apply_async(serveJob, (job,),
+                                             callback=callback)))
+        waitForJobs(pending, jobTimeout, reply)
+    except Exception:
+        if verbosity: traceback.print_exc()
+    finally:
+        replies.put(None)
+        writer.join(drainTimeout)
+        # Shut down, not just close: a pool worker forked since the
+        # connection was accepted, eg. to replace one that died, holds a
+        # copy of its descriptor. Shutting down also ends a writer blocked
+        # on a client that has stopped reading.
+        try: conn.shutdown(socket.SHUT_RDWR)
+        except socket.error: pass
+        writer.join()
+        fob.close()
+        conn.close()
+    return
+
+
+def waitForJobs(pending, jobTimeout, reply):
+    """Wait on the passed <list> of (job, submission time, AsyncResult) of a
+    connection until all are ready, or, with a jobTimeout <float>, until
+    that many seconds pass in which none becomes ready, when the rest are
+    answered with a timeout error through the passed reply function.
+    """
+    outstanding = range(len(pending))
+    progress    = time.time()
+    while outstanding:
+        result = pending[outstanding[0]][2]
+        if jobTimeout:
+            result.wait(max(0.0, progress + jobTimeout - time.time()))
+        else:
+            result.wait()
+        ready = [i for i in outstanding if pending[i][2].ready()]
+        if ready:
+            outstanding = [i for i in outstanding if i not in ready]
+            progress    = time.time()
+        elif time.time() - progress >= jobTimeout:
+            break
+    for index in outstanding:
+        job, submitted, result = pending[index]
+        reply({'id': job.get('id'), 'path': job.get('path'), 'file': None,
+               'error': "Timeout: no job completed in %g s; the worker may "
+                        "have died" % jobTimeout,
+               'elapsed': time.time() - submitted}, index)
+    return
+
+
+def writeReplies(conn, replies):
+    """Send the reply lines of the passed Queue to the connection, until a
+    None. Once the client has gone, the rest are dropped.
+    """
+    gone = False
+    for line in iter(replies.get, None):
+        if gone: continue
+        try: conn.sendall(line)
+        except socket.error: gone = True
+    return
+
+
+def submit(socketName, jobs):
+    """Send the passed <list> of job <dict>s to the server on the passed
+    socket name <string>, and yield the reply <dict> to each as it arrives.
+    """
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    client.connect(socketName)
+    try:
+        client.sendall("".join([json.dumps(job) + "\n" for job in jobs]))
+        client.shutdown(socket.SHUT_WR)
+        fob = client.makefile('rb')
+        for line in iter(fob.readline, ''):
+            yield json.loads(line)
+    finally:
+        client.close()
+
+
+def runClient(inFiles, verbosity=False, options=None):
+    """Extract metadata from the passed datasets on the server at
+    options['connect'], as extract or, with options['batch'], as runBatch()
+    would, reporting one line per dataset in batch mode, or in single mode
+    any failure. With options['output'] set, the output of every dataset is
+    returned by the server and written to that file, or '-' for stdout.
+
+    Return: <int>, the number of datasets that failed.
+    """
+    if options is None: options = dict(runUtils.defaultOptions)
+    if options['batch']:
+        datasets = runUtils.findDatasets(inFiles, runUtils.writtenPaths(options))
+    else:
+        datasets = inFiles
+    output = extract.openOutput(options['output'])
+    jobs   = [{'id': i, 'path': abspath(name), 'format': options['format'],
+               'output': output is not None}
+              for i, name in enumerate(datasets)]
+    report = sys.stdout
+    if output is sys.stdout or not options['batch']: report = sys.stderr
+    start  = time.time()
+    failed = 0
+    unanswered = set(range(len(jobs)))
+    try:
+        for reply in submit(options['connect'], jobs):
+            name = reply['path']
+            if reply['id'] is not None:
+                name = datasets[reply['id']]
+                unanswered.discard(reply['id'])
+            if reply['error']:
+                failed += 1
+                print >>report, "FAIL  %8.2fs  %s: %s" % (
+                    reply.get('elapsed', 0.0), name, reply['error'])
+                continue
+            fileWrite = reply['file']
+            if output is not None:
+                record = reply['output']
+                if reply.get('encoding') == 'base64':
+                    record = base64.b64decode(record)
+                elif isinstance(record, unicode):
+                    record = record.encode('utf-8')
+                output.write(record)
+                output.flush()
+                fileWrite = options['output']
+            if options['batch']:
+                print >>report, "OK    %8.2fs  %s -> %s" % (
+                    reply['elapsed'], name, fileWrite)
+            elif verbosity:
+                print >>report, "Wrote header to file: ", fileWrite
+            report.flush()
+    finally:
+        if output and output is not sys.stdout: output.close()
+    for i in sorted(unanswered):
+        failed += 1
+        print >>report, "FAIL  %8.2fs  %s: %s" % (0.0, datasets[i],
+                                                  "No reply from server")
+    if options['batch']:
+        elapsed = time.time() - start
+        print >>report, "_"*20
+        print >>report, "Datasets: %d, succeeded: %d, failed: %d, elapsed: %.2fs (%.2f datasets/s)"\
+            % (len(jobs), len(jobs) - failed, failed, elapsed,
+               len(jobs)/elapsed if elapsed else 0.)
+    return failed
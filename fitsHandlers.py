@@ -14,13 +14,13 @@ __version_date__ = '$Date$'[7:-3]
 __author__       = "k.r. anderson, <ken.anderson@ubc.ca>"
 # ------------------------------------------------------------------------------
 
-import pyfits
-
 from os.path import basename
 from types   import BooleanType as boolean
 
 from metaData.metaDataVersion import version, pkg_name
 from metaData.utils.runUtils  import ptime
+from metaData.utils           import fitsScan, hdrWriter, stageTimer
+from metaData.utils.runUtils  import defaultOptions
 
 class FitsHandlers(object):
     """Though much simpler than either the CasaImageHandlers or MSHandlers
@@ -39,89 +39,105 @@ class FitsHandlers(object):
     """
 
     def __init__(self,fitsFile):
-        """Constructor receives a fitsfile name <string>. Does not support
-        tarred or gzipped files.
+        """Constructor receives a fitsfile name <string>, plain or compressed
+        with gzip, bzip2 or compress. Does not support tarred files. Headers
+        are read with the utils.fitsScan header reader; data units are not
+        read.
         """
         self.fitsFileName = fitsFile
-        self.fitsObj      = pyfits.open(fitsFile)
         self.hduList      = []
         self.fitsHdrFile  = self.fitsFileName+'.hdr'
 
-    def parseFits(self, mimeType):
+    def parseFits(self, mimeType, options=None):
         """Caller passes the predetermined mime-type <string> of the file.
         In the case of FITS, this will either be,
         
         'image/fits-image'  or,
         'image/fits-uvw'
+
+        and optionally the run options <dict>, see runUtils.defaultOptions.
+        With the 'fitsStats' option, image statistics are added, as for
+        Casa Images (see utils.imageStats).
+
+        Builds self.meta, the ordered list of header cards to be written,
+        as (key, value, comment) tuples, in parallel with the meta lists of
+        the CasaImageHandlers and MSHandlers classes.
         """
+        if options is None: options = defaultOptions
         self.mimeType = mimeType
-        for i in range(len(self.fitsObj)):
-            self.hduList.append(self.fitsObj[i].header)
+        self.options  = options
+        with stageTimer.stage('fits-headers'):
+            self.hduList = fitsScan.readHeaders(self.fitsFileName)
+        self.buildMeta()
         return
 
-    def writeHdr(self):
-        """write out the header data as pretty print to a header file.
+    def buildMeta(self):
+        """Build self.meta from the parsed HDU headers. HISTORY, PC matrix and
+        blank cards are not carried.
 
         parameters: <void>
-        return:     <bool> or <string>, None or the file name written.
+        return:     <void>
         """
-
-        fitsCmnt = "Flexible Image Transport System"
-        format1  = "%-8s= %21s\n"
-        format2  = "%-8s= %21s /%s\n"
-        formatc  = "%-8s %21s\n"
-        fhdrFile = open(self.fitsHdrFile,'w')
-        fileWrite= None
+        fitsCmnt  = "Flexible Image Transport System"
+        self.meta = []
         # The following header data have been requested removed by
         # A. Grimstrup, 04-10-11
         
-        # fhdrFile.write(format1 % ("FILENAME",basename(self.fitsFileName)))
-        fhdrFile.write(format2 % ("FILETYPE","FITS",fitsCmnt))
-        # fhdrFile.write(format1 % ("MIME-TYPE",self.mimeType))
-        # fhdrFile.write("\nFITS Header Actual Begin:\n\n")
+        # self.meta.append(("FILENAME",basename(self.fitsFileName),""))
+        self.meta.append(("FILETYPE","FITS",fitsCmnt))
+        # self.meta.append(("MIME-TYPE",self.mimeType,""))
         
         for hdu in self.hduList:
-            for card in hdu.ascardlist():
-                key     = card.key
-                value   = card.value
-                comment = card.comment
+            for key, value, comment in hdu:
                 if key== 'HISTORY': continue
                 if key[:2] == 'PC': continue
                 #if key == 'COMMENT': continue       # request COMMENT cards -- R. Taylor.
-                if key == 'COMMENT':
-                    hline = formatc %(key,str(value))
-                    fhdrFile.write(hline)
-                    continue
-                if value and type(value) == boolean:
-                    value = "T"
-                if len(key) < 8:
-                    if not key.strip(): continue
-                    if not comment.strip():
-                        hline   = format1 %(key,str(value))
-                    else: hline = format2 %(key,str(value),comment)
-                    fhdrFile.write(hline)
-                    continue
-                else: 
-                    if not key.strip(): continue
-                    if not comment.strip():
-                        hline   = format1 % (key,str(value))
-                    else: hline = format2 % (key,str(value),comment)
-                    fhdrFile.write(hline)
-        fhdrFile.write(format1 % ("PARSER",pkg_name+" v"+version))
-        fhdrFile.write(format1 % ("PARSE-DATE",ptime().split("T")[0]))
-        fhdrFile.close()
-        fileWrite = self.fitsHdrFile
-        return fileWrite
+                if not key.strip(): continue
+                self.meta.append((key, value, comment))
+        if self.options['fitsStats'] and self.mimeType == "image/fits":
+            self.imStats()
+        self.meta.append(("PARSER",pkg_name+" v"+version,""))
+        self.meta.append(("PARSE-DATE",ptime().split("T")[0],""))
+        return
+
+    def imStats(self):
+        """Add the statistics of the first image HDU to self.meta. The data
+        unit is read through a memory map, so compressed files, which cannot
+        be mapped, are given no statistics.
+
+        parameters: <void>
+        return:     <void>
+        """
+        found = fitsScan.findImage(self.fitsFileName)
+        if not found: return
+        with stageTimer.stage('import'):
+            from metaData.utils import imageStats
+        with stageTimer.stage('imStats'):
+            source = imageStats.FitsImageSource(found[0], found[1],
+                                                self.fitsFileName)
+            stats  = imageStats.imageStatistics(source,
+                                                self.options['statsMemory'],
+                                                self.options['stats'],
+                                                self.options['statsError'],
+                                                self.options['statsWorkers'])
+        for key, value in imageStats.statsMeta(stats):
+            self.meta.append((key, value, ""))
+        return
+
+    def writeHdr(self):
+        """write out the header data as pretty print to a header file.
+
+        parameters: <void>
+        return:     <bool> or <string>, None or the file name written.
+        """
+        return writeFitsHdr(self.meta, self.fitsHdrFile)
 
     def render(self):
         """To stdout."""
         format1 = "%-8s= %24s"
         format2 = "%-8s= %24s /%s"
         for hdu in self.hduList:
-            for card in hdu.ascardlist():
-                key     = card.key
-                value   = card.value
-                comment = card.comment
+            for key, value, comment in hdu:
                 if key == 'HISTORY': continue
                 if key == 'COMMENT': continue
                 if value and type(value) == boolean:
@@ -140,3 +156,14 @@ class FitsHandlers(object):
                     else: hline = format2 %(key,str(value),comment)
                     print hline
         return
+
+
+def writeFitsHdr(meta, fileName):
+    """Write the passed meta <list> of FITS header cards, (key, value, comment)
+    tuples as built by FitsHandlers.buildMeta(), to the named header file, or
+    file-like object, formatted by utils.hdrWriter.formatFitsHdr().
+
+    parameters: <list>, <string>
+    return:     <string>, the file name written.
+    """
+    return hdrWriter.writeHdr(hdrWriter.formatFitsHdr(meta), fileName)
@@ -18,7 +18,7 @@ import time
 import types
 from   os.path import basename, join
 
-import pyfits
+from metaData.utils import fitsScan
 
 class FITSMimeTypeError(TypeError):
     """Raise this if the Mime Typing returns something off.
@@ -37,7 +37,7 @@ class FITSMimeTyping(object):
 
         self.fitsFileName = fileName
         self.verbosity    = verbosity
-        self.fitsObj      = pyfits.open(fileName) # nulling stdout from this call
+        self.primaryCards = fitsScan.readHeaders(fileName, maxHdus=1)[0]
 
 
     def buildType(self):
@@ -45,7 +45,6 @@ class FITSMimeTyping(object):
         fitsType   = self.__getType()
         mimeType = self.__buildMimeType(fitsType)
         if self.verbosity: self.__printHeader(fitsType,mimeType)
-        self.fitsObj.close()
         return mimeType
 
     ################################ prive #################################
@@ -60,15 +59,9 @@ class FITSMimeTyping(object):
         'Image' or
         'Visibility'
         """
-        uvwKeywordSet = ['PTYPE1','PTYPE2','PTYPE3']
-        try:
-            uukey = self.fitsObj[0].header[uvwKeywordSet[0]]
-            vvkey = self.fitsObj[0].header[uvwKeywordSet[1]]
-            wwkey = self.fitsObj[0].header[uvwKeywordSet[2]]
-            if 'UU' in uukey and 'VV' in vvkey and 'WW' in wwkey:
-                fitsType = 'Visibility'
-            else: raise KeyError
-        except KeyError:
+        if fitsScan.isVisibility(self.primaryCards):
+            fitsType = 'Visibility'
+        else:
             fitsType = 'Image'
         return fitsType
 
@@ -17,16 +17,24 @@ __author__       = "k.r. anderson, <ken.anderson@ubc.ca>"
 import time
 import types
 import sys
+import numpy
 
 from os.path        import basename
+from collections    import OrderedDict
+from numpy          import ndarray
 from pyrap.tables   import table as pyraptable
 
 from metaData.utils.runUtils import redirectStdOut,resetStdOut
 from metaData.utils.runUtils import delist, isoDateTime, raDecConvert
+from metaData.utils.runUtils import isoDateTimes, raDecStrings
 from metaData.utils.runUtils import decdeg2dmsString, decdeg2hmsString
 from metaData.utils.runUtils import stringify, polarizationConvert, ptime
+from metaData.utils.runUtils import defaultOptions
 
-from metaData.utils.genUtils import convertHz
+from metaData.utils.genUtils import convertHz, hzStrings, channelRuns
+from metaData.utils.genUtils import channelRanges
+from metaData.utils          import hdrWriter
+from metaData.utils          import msMainTable, stageTimer
 
 from metaData.metaDataVersion import pkg_name,version
 
@@ -35,9 +43,18 @@ from metaData.incl.tablesInclusion import orderedTableNamesAsKeys, tableIncludes
 from metaData.convert.timeConversions         import timeKeys
 from metaData.convert.directionConversions    import directionKeys
 from metaData.convert.polarizationConversions import polarizationKeys
+from metaData.convert.polarizationConversions import casaStokesTypes
 from metaData.convert.frequencyConversions    import frequencyReference
 from metaData.convert.frequencyConversions    import frequencyFields, referenceFields
 
+# SPECTRAL_WINDOW array columns, one array of channel values per row, of
+# which only the first and last channel values are reported.
+channelFields = ['SPECTRAL_WINDOW:CHAN_FREQ',
+                 'SPECTRAL_WINDOW:CHAN_WIDTH',
+                 'SPECTRAL_WINDOW:EFFECTIVE_BW',
+                 'SPECTRAL_WINDOW:RESOLUTION'
+                 ]
+
 """ Initial open and step through all keyword tables in a CASA 
 Measuremet Set, slurping each table's metadata -- keyword-value pairs.
 This module and class will provide methods to create a FITS-like "flat"
@@ -93,12 +110,15 @@ class MSHandlers(object):
     Constructor opens a passed Measurement Set name.
     """
 
-    def __init__(self, msFile):
+    def __init__(self, msFile, session=None):
         """ Open the Measurement Set file. Caller receives an MSHandler 
         object with four (4) attributes: the passed filename, a casacore table
         tool for the passed CASA measurement set, and unpopulated data
         structures,  "meta" of type <list> and "metaDict" of type <dict>
 
+        If a tableSession.TableSession is passed, its main table and subtable
+        handles are used, and are left for the session to close.
+
         *** This constructor fiddles with stdout to suppress
         pyrap.tables.table stdout output, which is not desired as part of
         stdout output from this module. ***
@@ -115,17 +135,31 @@ class MSHandlers(object):
         ('RELEASE_DATE', 'Jan 01, 2011'),
          ...
         ]
+
+        self.values holds, by meta key, the native values from which the
+        meta values of numeric columns are formatted, eg. the Hz of
+        REF_FREQUENCY, the radians of FIELD:REFERENCE_DIR or the MJD seconds
+        of a time column, for structured output (see utils.hdrWriter).
         """
 
-        fsock,saveStdOut = redirectStdOut()
         self.msFileName = msFile
-        self.msObj      = pyraptable(msFile)
+        self.session    = session
         self.metaDict   = {}
         self.meta       = []                 # ordered meta tuples 
-        resetStdOut(fsock,saveStdOut)
+        self.values     = {}                 # native values by meta key
+        self.mainMeta   = []                 # main table stage meta tuples
+        self.options    = defaultOptions
+        if session:
+            self.msObj  = session.table()
+        else:
+            with stageTimer.stage('open'):
+                fsock,saveStdOut = redirectStdOut()
+                self.msObj  = pyraptable(msFile)
+                resetStdOut(fsock,saveStdOut)
+            stageTimer.count('tableOpens')
 
         
-    def parseMS(self, mimeType):
+    def parseMS(self, mimeType, options=None):
         """Parse and extract all meta info from a Measurement Set.
         A FloatType value will be the MS_VERSION, likely 2.0.
         Only one FloatType keyword value has been observed to date,
@@ -138,17 +172,28 @@ class MSHandlers(object):
           'image/ms-uvw'
 
         to indicate a Visibility (UV) Measurement Set.
+
+        options, <dict>, optional run options, see runUtils.defaultOptions.
+        With 'msScan' set, the main table is summarised by scan and field,
+        'msChunkRows' rows at a time, with 'msFlags', its flags are
+        counted, within 'msMemory' bytes a chunk, and with 'msUvw', its
+        baseline lengths summarised, over 'msWorkers' processes (see
+        utils.msMainTable). With 'chanRuns', the CHAN_FREQ_RUNS key is
+        added.
         """
+        if options is None: options = defaultOptions
 
+        self.options   = options
         self.mimeType  = mimeType
         self.msVersion = None
         topLevelNames  = self.msTopLevelKeywords()
         orderedKeyVals = []
         topLevelTables = []
 
-        for name in topLevelNames:
-            val = self.msObj.getkeyword(name)
-            orderedKeyVals.append((name,val))
+        with stageTimer.stage('keywords'):
+            for name in topLevelNames:
+                val = self.msObj.getkeyword(name)
+                orderedKeyVals.append((name,val))
 
         for key,val in orderedKeyVals:
             if type(val) == types.FloatType:
@@ -165,8 +210,10 @@ class MSHandlers(object):
                     err = "Unknown Measurement Set keyword value:"+val
                     raise MSTableValueError,err
         
-        self.openTopLevelTables(topLevelTables)
-        self.msObj.close()
+        with stageTimer.stage('subtables'):
+            self.openTopLevelTables(topLevelTables)
+        if msMainTable.readsMainTable(options): self.__readMainTable(options)
+        if not self.session: self.msObj.close()
         return
 
 
@@ -218,9 +265,11 @@ class MSHandlers(object):
 
         # The "OBSERVATION" key is special as primary information
 
-        for tabKey in orderedTableNamesAsKeys:
-            if tabKey == "OBSERVATION": self.__buildObsKey(tabKey)
-            else: self.__buildGenericKey(tabKey)
+        with stageTimer.stage('conversions'):
+            for tabKey in orderedTableNamesAsKeys:
+                if tabKey == "OBSERVATION": self.__buildObsKey(tabKey)
+                else: self.__buildGenericKey(tabKey)
+        self.meta.extend(self.mainMeta)
         self.meta.append(("PARSER",pkg_name+", v"+version))
         self.meta.append(("PARSE-DATE",  ptime().split("T")[0]))
         return
@@ -250,31 +299,7 @@ class MSHandlers(object):
         the tar archive. 
         -- 28.09.2011
         """
-        frequency_truncs = ['CHAN_FREQ','CHAN_WIDTH','EFFECTIVE_BW','RESOLUTION']
-        hdrFile = inFileName+".hdr"
-        fob     = open(hdrFile,"w")
-
-        for key,val in self.meta:
-            sval = str(val)
-            if "_DIR" in key:
-                self.__writeSetValues(key,sval,fob)
-                continue
-            elif ":POSITION" in key:
-                self.__writeSetValues(key,sval,fob)
-                continue
-            elif key == "WINDOW_NAME":
-                self.__writeWinNames(key,sval,fob)
-                continue
-            # elif key in frequency_truncs and len(sval) > 55:
-            #     self.__writeTruncValues(key,sval,fob)
-            #     continue
-            elif len(sval) > 55:
-                self.__writeLongValue(key,sval,fob)
-                continue
-            self.__writeNominalValue(key,sval,fob)
-        fob.write("\n")
-        fob.close()
-        return hdrFile
+        return writeMSHdr(self.meta, inFileName+".hdr")
                 
 
     #################################### prive #################################
@@ -291,10 +316,14 @@ class MSHandlers(object):
 
         As in the contructor, this method fiddles with stdout to suppress
         pyrap.tables.table print output when opening all subTables.
+
+        With a session, the session's cached subtable handle is returned.
         """
+        if self.session: return self.session.subTable(tableName)
         fsock,saveStdOut = redirectStdOut()
         pyrapttool = pyraptable(tableName)
         resetStdOut(fsock,saveStdOut)
+        stageTimer.count('tableOpens')
         return pyrapttool
 
     def __extract(self, tableName,tableTool):
@@ -304,15 +333,176 @@ class MSHandlers(object):
         An undefined column will raise a RuntimeError exception,
         and will be marked at 'Undefined.'
 
+        The SPECTRAL_WINDOW channel columns are not read whole; see
+        __readChannelEnds(), and, with the 'chanRuns' option, which reads
+        the CHAN_FREQ cells and takes their ends from them,
+        __readChannelRuns().
         """
+        freqEnds = None
+        if tableName == "SPECTRAL_WINDOW" and self.options['chanRuns']:
+            try: runs, freqEnds = self.__readChannelRuns(tableTool)
+            except RuntimeError: runs = "Undefined"
+            self.metaDict['SPECTRAL_WINDOW:CHAN_FREQ_RUNS'] = runs
 
         for keyName in tableIncludes[tableName]:
-            try: keyval = tableTool.getcol(keyName)
+            metaDictKey = tableName+':'+keyName
+            try:
+                if metaDictKey == 'SPECTRAL_WINDOW:CHAN_FREQ' and freqEnds:
+                    keyval = freqEnds
+                elif metaDictKey in channelFields:
+                    keyval = self.__readChannelEnds(tableTool, keyName)
+                else: keyval = tableTool.getcol(keyName)
+                stageTimer.countBytes(keyval)
             except RuntimeError: keyval = "Undefined"; pass
-            self.metaDict[tableName+':'+keyName]= keyval
-        tableTool.close()
+            self.metaDict[metaDictKey]= keyval
+        if not self.session: tableTool.close()
         return
 
+    def __readChannelEnds(self, tableTool, colName):
+        """Read the first and last channel values of each row of the passed
+        SPECTRAL_WINDOW array column name <string>, by column or cell slices,
+        rather than the whole column. With tens of thousands of channels in
+        hundreds of windows, getcol() materialises the lot.
+
+        A window of no channels has no ends to slice, and is given NaN
+        ends.
+
+        Return: <tuple>, (first, last, nchan) <ndarray>s, one value per row.
+        """
+        nchan = tableTool.getcol('NUM_CHAN')
+        if not len(nchan): return nchan, nchan, nchan
+        if (nchan == nchan[0]).all() and nchan[0] > 0:
+            n     = int(nchan[0])
+            first = tableTool.getcolslice(colName, [0], [0])[:,0]
+            last  = tableTool.getcolslice(colName, [n-1], [n-1])[:,0]
+        else:
+            first = []
+            last  = []
+            for row in range(len(nchan)):
+                n = int(nchan[row])
+                if n < 1:
+                    first.append(numpy.nan)
+                    last.append(numpy.nan)
+                    continue
+                first.append(tableTool.getcellslice(colName, row, [0], [0])[0])
+                last.append(tableTool.getcellslice(colName, row, [n-1], [n-1])[0])
+        return first, last, nchan
+
+    def __readMainTable(self, options):
+        """Run the main table stages switched on in the passed run options,
+        over a RowRunner of options['msWorkers'] processes, as the MAIN:*
+        keys placed before PARSER. A stage failing on an undefined column
+        is marked 'Undefined'.
+        """
+        runner = msMainTable.RowRunner(self.msObj, self.msFileName,
+                                       options['msWorkers'])
+        try:
+            if options['msScan']:
+                try:
+                    with stageTimer.stage('ms-scan'):
+                        summary = msMainTable.scanSummary(
+                                      runner, options['msChunkRows'])
+                    self.__addMainMeta(*msMainTable.scanMeta(summary))
+                except RuntimeError:
+                    self.mainMeta.append(("MAIN:SCAN_NUMBER", "Undefined"))
+            if options['msFlags']:
+                spws, corrs, shapes = self.__dataDescriptions()
+                if shapes: cellSize = max([c*n for c, n in shapes])
+                else:      cellSize = self.__maxChannels() * 4
+                rows = msMainTable.flagRows(options['msMemory'], cellSize,
+                                            options['msChunkRows'])
+                try:
+                    with stageTimer.stage('ms-flags'):
+                        counts = msMainTable.flagCounts(runner, rows, shapes)
+                    self.__addMainMeta(*msMainTable.flagMeta(
+                        counts, spws, corrs, self.__antennaNames()))
+                except RuntimeError:
+                    self.mainMeta.append(("MAIN:FLAGGED_FRACTION", "Undefined"))
+            if options['msUvw']:
+                try:
+                    with stageTimer.stage('ms-uvw'):
+                        stats = msMainTable.baselineStats(
+                                    runner, options['msChunkRows'])
+                    self.__addMainMeta(*msMainTable.baselineMeta(
+                        stats, *self.__frequencyRange()))
+                except RuntimeError:
+                    self.mainMeta.append(("MAIN:UVDIST_MAX", "Undefined"))
+        finally: runner.close()
+        return
+
+    def __addMainMeta(self, meta, values):
+        self.mainMeta.extend(meta)
+        self.values.update(values)
+        return
+
+    def __dataDescriptions(self):
+        """Return a 3-tuple of <list>s by DATA_DESC_ID, (spectral window
+        ids, correlation type names, (nchan, ncorr) cell shapes), from the
+        DATA_DESCRIPTION, POLARIZATION and SPECTRAL_WINDOW columns read, or
+        Nones where those are undefined.
+        """
+        try:
+            spws   = [int(s) for s in
+                      self.metaDict['DATA_DESCRIPTION:SPECTRAL_WINDOW_ID']]
+            pols   = [int(p) for p in
+                      self.metaDict['DATA_DESCRIPTION:POLARIZATION_ID']]
+            types  = self.metaDict['POLARIZATION:CORR_TYPE']
+            nchans = self.metaDict['SPECTRAL_WINDOW:NUM_CHAN']
+            corrs  = [[casaStokesTypes[int(c)] for c in types[p]] for p in pols]
+            shapes = [(int(nchans[s]), len(c)) for s, c in zip(spws, corrs)]
+        except (KeyError, IndexError, TypeError, ValueError):
+            return None, None, None
+        return spws, corrs, shapes
+
+    def __frequencyRange(self):
+        """Return the lowest and highest channel frequencies, Hz <float>, of
+        the spectral windows, from the first and last channels read, or else
+        REF_FREQUENCY; Nones where neither is defined.
+        """
+        ends = self.metaDict.get('SPECTRAL_WINDOW:CHAN_FREQ')
+        try: freqs = numpy.concatenate([numpy.ravel(ends[0]),
+                                        numpy.ravel(ends[1])]).astype(float)
+        except (TypeError, ValueError, IndexError):
+            try: freqs = numpy.ravel(self.metaDict['SPECTRAL_WINDOW:REF_FREQUENCY']
+                                     ).astype(float)
+            except (KeyError, TypeError, ValueError): return None, None
+        freqs = freqs[numpy.isfinite(freqs) & (freqs > 0)]
+        if not freqs.size: return None, None
+        return float(freqs.min()), float(freqs.max())
+
+    def __maxChannels(self):
+        try: return int(max(self.metaDict['SPECTRAL_WINDOW:NUM_CHAN']))
+        except (KeyError, TypeError, ValueError): return 1
+
+    def __antennaNames(self):
+        names = self.metaDict.get('ANTENNA:NAME')
+        if isinstance(names, (list, ndarray)): return list(names)
+        return None
+
+    def __readChannelRuns(self, tableTool):
+        """Read the CHAN_FREQ cells of SPECTRAL_WINDOW one row at a time,
+        and find the runs of uniformly spaced channels of each, see
+        genUtils.channelRuns(). Memory is bounded by one window's channels,
+        but the reads grow with the channel count, hence the 'chanRuns'
+        option.
+
+        Return: <tuple>, (runs, ends): a <list> of a <list> of (start, step,
+        count) runs per row, and the (first, last, nchan) channel ends, as
+        __readChannelEnds().
+        """
+        runs  = []
+        first = []
+        last  = []
+        nchan = tableTool.getcol('NUM_CHAN')
+        for row in range(tableTool.nrows()):
+            cell = tableTool.getcell('CHAN_FREQ', row)
+            stageTimer.countBytes(cell)
+            runs.append(channelRuns(cell))
+            if not len(cell): cell = [numpy.nan]
+            first.append(cell[0])
+            last.append(cell[-1])
+        return runs, (first, last, nchan)
+
     def __buildObsKey(self,obsKey):
         for subKey in tableIncludes[obsKey]:
             metaDictKey = obsKey+":"+subKey
@@ -324,8 +514,9 @@ class MSHandlers(object):
                 self.meta.append(("EXPOSURE",      self.__expTime()))
                 self.meta.append(("EXPOSURE-UNIT", 'seconds'))
             else: 
-                self.meta.append((subKey, 
-                                  delist(list(set(self.metaDict[metaDictKey])))))
+                values = list(set(self.metaDict[metaDictKey]))
+                self.meta.append((subKey, delist(values)))
+                self.values[subKey] = values
         return
 
     def __buildGenericKey(self,tabKey):
@@ -336,6 +527,7 @@ class MSHandlers(object):
             if tabKey == tossKeys[-1] and subKey == "NAME":
                 metaKey = "WINDOW_"+subKey
             metaDictKey = tabKey+":"+subKey
+            self.values[metaKey] = self.metaDict[metaDictKey]
             if metaDictKey in timeKeys:
                 timeList = self.__convertTimeValues(metaDictKey)
                 self.meta.append((metaKey, delist(timeList)))
@@ -345,15 +537,33 @@ class MSHandlers(object):
             elif metaDictKey in polarizationKeys:
                 polList = self.__convertPolValues(metaDictKey)
                 self.meta.append((metaKey, polList))
+                del self.values[metaKey]
             elif metaDictKey in frequencyFields:
                 freqVals = self.__convertFreqValues(metaDictKey)
                 self.meta.append((metaKey, freqVals))
+                if metaDictKey in channelFields:
+                    self.values[metaKey] = self.__channelEnds(metaDictKey)
+                if (metaDictKey == 'SPECTRAL_WINDOW:CHAN_FREQ' and
+                    'SPECTRAL_WINDOW:CHAN_FREQ_RUNS' in self.metaDict):
+                    self.meta.append(("CHAN_FREQ_RUNS", self.__handleRuns()))
+                    self.values["CHAN_FREQ_RUNS"] = \
+                        self.metaDict['SPECTRAL_WINDOW:CHAN_FREQ_RUNS']
             elif metaDictKey in referenceFields:
                 refs = self.__convertReferences(metaDictKey)
                 self.meta.append((metaKey, refs))
+                del self.values[metaKey]
             else: self.meta.append((metaKey, delist(self.metaDict[metaDictKey])))
         return
 
+    def __channelEnds(self, dictKey):
+        """Return the (first, last, nchan) channel values of the passed
+        channelFields key as a <dict> of those names, or the <string> read
+        in their place, eg. 'Undefined'.
+        """
+        ends = self.metaDict[dictKey]
+        if type(ends) == types.StringType: return ends
+        return OrderedDict(zip(['first', 'last', 'nchan'], ends))
+
     def __startObs(self):
         timeStr = delist(self.metaDict['OBSERVATION:TIME_RANGE'][0]).split(',')[0]
         return isoDateTime(timeStr)
@@ -379,18 +589,23 @@ class MSHandlers(object):
         """Caller passes a known TIME type key, converts values
         in metaDict to the proper TIME type (see timeConversions), 
         i.e. ISO8601 Date-Time format, as returned by the runUtils
-        function, isoDateTime().
+        function, isoDateTime(), for the whole column at once.
         """
-        return [isoDateTime(val) for val in self.metaDict[dictKey]]
+        return isoDateTimes(self.metaDict[dictKey])
         
     def __convertDirValues(self,dictKey):
         """Caller passes a known direction type key, converts values
         in metaDict to RA,Dec in HMS,decdegrees (see directionConversions).
+        The first RA,Dec pair of each row is converted, as raDecConvert()
+        would, for the whole column at once.
         """
-        radecString = ''
-        for dpair in self.metaDict[dictKey]:
-            radecString += raDecConvert(dpair)
-        return radecString
+        directions = self.metaDict[dictKey]
+        if isinstance(directions, ndarray) and directions.ndim == 3:
+            directions = directions[:,0]
+        else:
+            directions = [dpair[0] for dpair in directions]
+        ras, decs = raDecStrings(directions)
+        return "".join(['('+ra+' '+dec+'), ' for ra, dec in zip(ras, decs)])
 
     def __convertPolValues(self,dictKey):
         """Caller passes a known polarization type key, converts values
@@ -457,112 +672,49 @@ class MSHandlers(object):
     ############################ channel handlers ###########################
 
     def __handleNest(self,dictKey):
-        fbegin = fend = ' '
         freqValues = self.metaDict[dictKey]
         if type(freqValues) != types.StringType:
-            freqString = ''
-            for i in range(len(freqValues)):
-                lenf = len(freqValues[i])
-                fbegin = "%s %s" % convertHz(list(freqValues[i])[0])
-                if lenf > 1:
-                    fend = " [..] %s %s" % convertHz(list(freqValues[i])[-1])
-                    fend += " ("+str(lenf)+" chan), "
-                freqString += fbegin + fend
+            freqString = channelRanges(*freqValues)
         elif type(freqValues) == types.StringType:
             freqString   = freqValues
         else: freqString = "Unknown frequency field datatype"
         return freqString
 
+    def __handleRuns(self):
+        """Return the CHAN_FREQ runs of uniformly spaced channels as a
+        <string>, 'start step STEP xCOUNT' per run, runs of a window joined
+        by ' + ', windows by ', '.
+        """
+        windows = self.metaDict['SPECTRAL_WINDOW:CHAN_FREQ_RUNS']
+        if type(windows) == types.StringType: return windows
+        allRuns = [run for runs in windows for run in runs]
+        starts  = iter(hzStrings([start for start, step, count in allRuns]))
+        steps   = iter(hzStrings([step for start, step, count in allRuns]))
+        runStrings = []
+        for runs in windows:
+            runStrings.append(" + ".join([starts.next() +
+                                          " step " + steps.next() +
+                                          " x%d" % count
+                                          for start, step, count in runs]))
+        return ", ".join(runStrings)
+
     def __handleSingle(self, dictKey):
         freqString = ''
         freqValues = self.metaDict[dictKey]
         if type(freqValues) != types.StringType:
-            freqString = ", ".join("%s %s" % convertHz(freq) for freq in (list(freqValues)))
+            freqString = ", ".join(hzStrings(list(freqValues)))
         elif type(freqValues) == types.StringType:
             freqString   = freqValues
         else: freqString = "Unknown frequency datatype"
         return freqString
 
-    ###################### file output support methods ######################
-
-    def __writeWinNames(self,key,val,fob):
-        """Write the channel names for SPECTRAL_WINDOW:NAME key. These will 
-        very often be null strings, which should then not be written as blank lines.
-        """
-        vals = val.split(',')
-        if not vals[0].strip():
-            if   len(key) >= 16: fob.write("\n"+key+"\tNone")
-            elif len(key) <= 7:  fob.write("\n"+key+"\t\t\tNone")
-            else: fob.write("\n"+key+"\t\tNone")
-        else: self.__writeNominalValue(key,vals[0],fob)
-        if len(vals) > 1:
-            for nextval in vals[1:]:
-                if not nextval.strip(): continue
-                else: fob.write("\n\t\t"+nextval)
-        fob.flush()
-        return
-
-    def __writeSetValues(self, key,val,fob):
-        """Write a set of direction values, one pair per line."""
-        vals = val.split(',')
-        self.__writeNominalValue(key,vals[0],fob)
-        if len(vals) > 1:
-            fob.write("\n\t\t\t")
-            fob.write("\n\t\t\t".join([val for val in vals[1:]]))
-        fob.flush()
-        return
-
-    def __writeTruncValues(self,key,val,fob):
-        """Write the first value of a long string set of channel frequency
-        information for those values in the frequency_truncs list.
-        Key length checks are not needed, as the lengths of these keys
-        are known to be > 7 & < 16.
-        """
-        fvals = val.split(',')
-        fob.write("\n"+key+"\t\t"+fvals[0]+" ... "+fvals[-1])
-        fob.flush()
-        return
-
-    def __writeLongValue(self,key,val,fob):
-        """Write lines for a val considered to be 'long.'
-        Method splits the val string, write the pieces
-        properly to the passed file object.
-        """
-        line    = ''
-        values  = val.split(',')
-        lineset = []
-
-        for item in values:
-            if not item.strip(): continue
-            if len(line) <= 55:
-                line += item+", "
-                continue
-            else:
-                lineset.append(line)
-                line = item+", "
-        lineset.append(line)
-
-        # lineset list will have a set of lines.
-        # First one gets the key.
 
-        self.__writeNominalValue(key,lineset[0],fob)
+########################### file output support ###########################
 
-        if len(lineset) > 1:
-            fob.write("\n\t\t\t")
-            fob.write("\n\t\t\t".join([line for line in lineset[1:]]))
-        fob.flush()
-        return
-
-    def __writeNominalValue(self,key,val,fob):
-        """Write a header line where the passed val is 
-        written to one line. The passed value, 'val' must
-        be of type <string>.
-        """
-        if len(key) >= 16:
-            fob.write("\n"+key+"\t"+val)
-        elif len(key) <= 7:
-            fob.write("\n"+key+"\t\t\t"+val)
-        else:
-            fob.write("\n"+key+"\t\t"+val)
-        fob.flush()
-        return
+def writeMSHdr(meta, fileName):
+    """write out the passed meta <list> of (key, value) tuples, as built by
+    MSHandlers.buildFlatMeta(), as pretty print to the named header file,
+    or file-like object, formatted by utils.hdrWriter.formatMSHdr().
+    Returns the file name written.
+    """
+    return hdrWriter.writeHdr(hdrWriter.formatMSHdr(meta), fileName)
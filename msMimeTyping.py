@@ -17,10 +17,11 @@ __author__       = "k.r. anderson, <ken.anderson@ubc.ca>"
 import time
 import types
 
-from os.path        import basename, join
+from os.path        import basename, join, normpath
 from pyrap.tables   import table as pyraptable
 
 from metaData.utils.runUtils import redirectStdOut,resetStdOut
+from metaData.utils          import stageTimer
 
 
 class MSMimeTypeError(TypeError):
@@ -30,12 +31,35 @@ class MSMimeTypeError(TypeError):
     """
     pass
 
+
+def tableInfoType(fileName):
+    """Caller passes a CASA Tables dataset name <string>.
+
+    Returns the table type recorded on the 'Type =' line of the dataset's
+    table.info file, eg. 'Measurement Set' or 'Image', without opening the
+    table. Returns an empty <string> if no table.info can be read.
+    """
+    try: fob = open(join(fileName,'table.info'))
+    except IOError: return ''
+    try:
+        for line in fob:
+            if line.startswith('Type'):
+                return line.split('=',1)[1].strip()
+    finally: fob.close()
+    return ''
+
         
 class MSMimeTyping(object):
-    def __init__(self, fileName, verbosity):
+    def __init__(self, fileName, verbosity, tableObj=None):
         """Class definition for some mime typing of CASA Images and
         Visibility Measurement Sets.
 
+        Caller may pass an already open pyrap table, tableObj, as held by a
+        TableSession, which is then used and left open. Otherwise, a Casa
+        Image, known by its table.info, is typed without opening the table
+        at all, and any other dataset is opened here and closed again by
+        buildType().
+
         This constructor does some fiddling with stdout to suppress
         pyrap.tables.table print output, which is not desired as part of
         stdout output string from this module.
@@ -45,12 +69,20 @@ class MSMimeTyping(object):
         a header file ... 
                        *******************
         """
-
-        fsock, saveStdOut = redirectStdOut()
         self.msFileName   = fileName
         self.verbosity    = verbosity
-        self.msObj        = pyraptable(fileName) # nulling stdout from this call
-        resetStdOut(fsock,saveStdOut)
+        self.infoType     = ''
+        self.ownsTable    = tableObj is None
+        if tableObj is not None:
+            self.msObj    = tableObj
+        elif tableInfoType(fileName) == "Image":
+            self.infoType = "Image"
+            self.msObj    = None
+        else:
+            fsock, saveStdOut = redirectStdOut()
+            self.msObj    = pyraptable(fileName) # nulling stdout from this call
+            resetStdOut(fsock,saveStdOut)
+            stageTimer.count('tableOpens')
 
 
     def buildType(self,msVersion=None):
@@ -58,7 +90,7 @@ class MSMimeTyping(object):
         msType   = self.__getType()
         mimeType = self.__buildMimeType(msType)
         if self.verbosity: self.__printHeader(msType,mimeType,msVersion)
-        self.msObj.close()
+        if self.ownsTable and self.msObj is not None: self.msObj.close()
         return mimeType
 
     #################################### prive #################################
@@ -89,6 +121,7 @@ class MSMimeTyping(object):
         hope not.
         """
 
+        if self.infoType: return self.infoType
         msType = self.msObj.info()['type']
         if msType == "Measurement Set":
             msExtraTypeCheck = self.msObj.getcolkeywords('UVW')['MEASINFO']['type']
@@ -128,7 +161,7 @@ class MSMimeTyping(object):
         print "Content-Type:",mimeType
         if msVersion:
             print "Content-Version: MS_VERSION=" + str(msVersion[1])
-        print "Content-Disposition: filename=" + basename(self.msObj.name()) + ";\n\t" \
+        print "Content-Disposition: filename=" + basename(normpath(self.msFileName)) + ";\n\t" \
             "parse-date=\""+self.__ptime()+"\";"
         print "_"*20,"\n"
 
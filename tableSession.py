@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+#
+#                                                 CyberSKA CASA Metadata Project
+#
+#                                                       metaData.tableSession.py
+#                                                  metaData maintainers, 2026-10
+# ------------------------------------------------------------------------------
+
+""" A TableSession holds the casacore table handles of one CASA Tables dataset
+for the duration of its typing and metadata extraction, so that each table is
+opened once only.
+
+Without a session, MSMimeTyping opens and closes the main table, MSHandlers
+opens it again, and then opens each subtable in turn. On network filesystems
+every table open costs a lock file and several metadata round trips.
+
+eg.,
+
+    session = TableSession(msName)
+    try:
+        mimeType = session.mimeType(verbosity)
+        handler  = msHandlers.MSHandlers(msName, session=session)
+        handler.parseMS(mimeType)
+        ...
+    finally:
+        session.close()
+"""
+
+# $Id$
+# ------------------------------------------------------------------------------
+__version__      = '$Revision$'[11:-3]
+__version_date__ = '$Date$'[7:-3]
+__author__       = "metaData maintainers"
+# ------------------------------------------------------------------------------
+
+from pyrap.tables   import table as pyraptable
+
+from metaData.msMimeTyping import MSMimeTyping, tableInfoType
+from metaData.utils        import stageTimer
+
+
+class TableSession(object):
+    """Class holds the main table and subtable handles of a CASA Tables
+    dataset. Tables are opened on first request and remain open until
+    close() is called.
+    """
+
+    def __init__(self, tableName):
+        """Caller passes the dataset name <string>. Nothing is opened here.
+        The table type recorded in table.info is read, should it be needed
+        for MIME typing.
+        """
+        self.tableName = tableName
+        self.tableType = tableInfoType(tableName)
+        self.mainTable = None
+        self.subTables = {}
+        self.opens     = 0
+
+
+    def mimeType(self, verbosity=False):
+        """Return the MIME type <string> of the dataset, as built by the
+        MSMimeTyping class on the session's main table handle. A Casa Image
+        is typed from its table.info, and its main table is not opened here,
+        as CasaImageHandlers opens the image itself.
+        """
+        if self.tableType == "Image":
+            typer = MSMimeTyping(self.tableName, verbosity)
+        else:
+            typer = MSMimeTyping(self.tableName, verbosity, tableObj=self.table())
+        return typer.buildType()
+
+
+    def table(self):
+        """Return the open main table, opening it on first call."""
+        if self.mainTable is None:
+            self.mainTable = self.__open(self.tableName)
+        return self.mainTable
+
+
+    def subTable(self, tableName):
+        """Return the open subtable of the passed name <string>, opening it on
+        first call. The name is as found in the main table keyword values,
+        i.e. a POSIX like path.
+        """
+        if tableName not in self.subTables:
+            self.subTables[tableName] = self.__open(tableName)
+        return self.subTables[tableName]
+
+
+    def close(self):
+        """Close all tables opened by this session."""
+        for subTableTool in self.subTables.values():
+            subTableTool.close()
+        self.subTables = {}
+        if self.mainTable is not None:
+            self.mainTable.close()
+            self.mainTable = None
+        return
+
+    #################################### prive #################################
+
+    def __open(self, tableName):
+        """Open a table read only. ack=False suppresses the pyrap.tables.table
+        open notice on stdout, in place of redirecting stdout per open.
+        """
+        self.opens += 1
+        stageTimer.count('tableOpens')
+        return pyraptable(tableName, ack=False)
@@ -0,0 +1,230 @@
+#!/usr/bin/env python
+#
+#                                                 CyberSKA CASA Metadata Project
+#
+#                                                 metaData.tests.testFitsScan.py
+#                                                  metaData maintainers, 2026-10
+# ------------------------------------------------------------------------------
+
+"""Tests of the header only FITS reader of utils/fitsScan.py.
+
+A small multi-extension FITS file is written, compressed with gzip, bzip2
+and compress(1), and the headers read from each checked against those of
+the plain file. compress(1) is seldom installed, so .Z files are written by
+lzwCompress() here; they are read through gzip -dc, as fitsScan does.
+"""
+
+# $Id$
+# ------------------------------------------------------------------------------
+__version__      = '$Revision$'[11:-3]
+__version_date__ = '$Date$'[7:-3]
+__author__       = "metaData maintainers"
+# ------------------------------------------------------------------------------
+
+import os
+import bz2
+import gzip
+import shutil
+import tempfile
+import unittest
+
+from distutils.spawn import find_executable
+
+from metaData.utils import fitsScan
+
+
+def card(key, value=None, comment=None):
+    """Return an 80 character card image <string>."""
+    if value is None: return "%-80s" % key
+    image = "%-8s= %20s" % (key, value)
+    if comment: image += " / " + comment
+    return "%-80s" % image
+
+
+def hdu(cards, nbytes):
+    """Return an HDU <string> of the passed card images, END appended,
+    and nbytes <int> of data, each padded to whole FITS blocks.
+    """
+    header = "".join(cards) + card("END")
+    data   = "".join([chr(i % 251) for i in range(nbytes)])
+    return (header + " " * (-len(header) % fitsScan.blockSize) +
+            data + "\0" * (-len(data) % fitsScan.blockSize))
+
+
+def mefContent():
+    """Return a primary image and an IMAGE and a BINTABLE extension."""
+    primary = hdu([card("SIMPLE", "T", "conforms to FITS standard"),
+                   card("BITPIX", 16), card("NAXIS", 2),
+                   card("NAXIS1", 40), card("NAXIS2", 30),
+                   card("EXTEND", "T"),
+                   card("OBJECT", "'M31     '", "target"),
+                   card("CRVAL1", "1.0E-03"),
+                   card("HISTORY written by testFitsScan"),
+                   ], 2 * 40 * 30)
+    image   = hdu([card("XTENSION", "'IMAGE   '"), card("BITPIX", -32),
+                   card("NAXIS", 1), card("NAXIS1", 1000),
+                   card("PCOUNT", 0), card("GCOUNT", 1),
+                   card("EXTNAME", "'SCI     '"),
+                   ], 4 * 1000)
+    table   = hdu([card("XTENSION", "'BINTABLE'"), card("BITPIX", 8),
+                   card("NAXIS", 2), card("NAXIS1", 8), card("NAXIS2", 3),
+                   card("PCOUNT", 0), card("GCOUNT", 1),
+                   card("TFIELDS", 1), card("TTYPE1", "'FLUX    '"),
+                   card("TFORM1", "'D       '"),
+                   ], 8 * 3)
+    return primary + image + table
+
+
+def lzwCompress(data, maxbits=16):
+    """Return the passed <string> compressed as by compress(1), without
+    block mode. Codes are packed least significant bit first, and start at
+    9 bits; when the code width grows, the codes so far are padded to a
+    whole group of 8 codes of the old width, as the decoder expects.
+    """
+    table = dict([(chr(i), i) for i in range(256)])
+    codes = []
+    word  = ""
+    for c in data:
+        if word + c in table:
+            word += c
+            continue
+        codes.append(table[word])
+        if len(table) < 1 << maxbits: table[word + c] = len(table)
+        word = c
+    if word: codes.append(table[word])
+
+    out     = [fitsScan.compressMagic, chr(maxbits)]
+    nbits   = 9
+    maxcode = (1 << nbits) - 1
+    bits    = 0        # the bits to be written, and their count
+    nbuf    = 0
+    group   = 0        # bits written since the width last grew
+    for i, code in enumerate(codes):
+        # the decoder's table size as it reads this code
+        size = min(256 + max(0, i - 1), 1 << maxbits)
+        if size > maxcode:
+            pad    = -group % (nbits * 8)
+            nbuf  += pad
+            group  = 0
+            nbits += 1
+            if nbits == maxbits: maxcode = 1 << maxbits
+            else:                maxcode = (1 << nbits) - 1
+        bits  |= code << nbuf
+        nbuf  += nbits
+        group += nbits
+        while nbuf >= 8:
+            out.append(chr(bits & 0xff))
+            bits >>= 8
+            nbuf  -= 8
+    if nbuf: out.append(chr(bits & 0xff))
+    return "".join(out)
+
+
+class TestHeaders(unittest.TestCase):
+
+    def setUp(self):
+        self.dir   = tempfile.mkdtemp()
+        self.plain = self.write("mef.fits", mefContent())
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def write(self, name, content):
+        fileName = os.path.join(self.dir, name)
+        fob = open(fileName, 'wb')
+        fob.write(content)
+        fob.close()
+        return fileName
+
+    def testPlain(self):
+        headers = fitsScan.readHeaders(self.plain)
+        self.assertEqual(len(headers), 3)
+        self.assertEqual(headers[0][0], ('SIMPLE', True,
+                                         'conforms to FITS standard'))
+        self.assertEqual(fitsScan.cardValue(headers[0], 'OBJECT'), 'M31')
+        self.assertEqual(fitsScan.cardValue(headers[0], 'CRVAL1'), 1.0e-3)
+        self.assertEqual(fitsScan.cardValue(headers[1], 'EXTNAME'), 'SCI')
+        self.assertEqual(fitsScan.cardValue(headers[2], 'TTYPE1'), 'FLUX')
+        self.assertEqual(fitsScan.readHeaders(self.plain, 1), headers[:1])
+        self.assertEqual(fitsScan.compression(self.plain), None)
+
+    def testGzip(self):
+        name = os.path.join(self.dir, "mef.fits.gz")
+        fob  = gzip.GzipFile(name, 'wb')
+        fob.write(mefContent())
+        fob.close()
+        self.check(name, 'gzip')
+
+    def testBzip2(self):
+        self.check(self.write("mef.fits.bz2", bz2.compress(mefContent())),
+                   'bzip2')
+
+    def testCompress(self):
+        if not find_executable('gzip'):
+            self.skipTest("gzip is needed to read .Z files")
+        self.check(self.write("mef.fits.Z", lzwCompress(mefContent())),
+                   'compress')
+
+    def testCompressLong(self):
+        # Enough codes for the width to grow past 9 bits.
+        if not find_executable('gzip'):
+            self.skipTest("gzip is needed to read .Z files")
+        content = "".join([chr((i * 7919) % 256) for i in range(20000)])
+        name    = self.write("noise.Z", lzwCompress(content))
+        fob     = fitsScan.openStream(name, 'compress')
+        try:     self.assertEqual(fob.read(), content)
+        finally: fob.close()
+
+    def check(self, fileName, method):
+        self.assertEqual(fitsScan.compression(fileName), method)
+        self.assertEqual(fitsScan.readHeaders(fileName),
+                         fitsScan.readHeaders(self.plain))
+        self.assertEqual(fitsScan.readHeaders(fileName, 1),
+                         fitsScan.readHeaders(self.plain, 1))
+        self.assertEqual(fitsScan.findImage(fileName), None)
+
+    def testFindImage(self):
+        cards, offset = fitsScan.findImage(self.plain)
+        self.assertEqual(offset, fitsScan.blockSize)
+        self.assertEqual(fitsScan.cardValue(cards, 'NAXIS1'), 40)
+
+
+class TestErrors(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def testNotFits(self):
+        name = os.path.join(self.dir, "notes.txt")
+        open(name, 'w').write("not a FITS file\n" * 400)
+        self.assertRaises(fitsScan.FitsScanError, fitsScan.readHeaders, name)
+
+    def testShortNotFits(self):
+        # Less than a block, which is not a truncated header.
+        name = os.path.join(self.dir, "notes.txt")
+        open(name, 'w').write("not a FITS file\n")
+        try:
+            fitsScan.readHeaders(name)
+        except fitsScan.FitsScanError, err:
+            self.assertTrue("Not a FITS file" in str(err), str(err))
+        else: self.fail("FitsScanError not raised")
+
+    def testTruncated(self):
+        name = os.path.join(self.dir, "cut.fits")
+        open(name, 'wb').write(mefContent()[:1000])
+        self.assertRaises(fitsScan.FitsScanError, fitsScan.readHeaders, name)
+
+    def testTruncatedExtension(self):
+        content = mefContent()
+        name    = os.path.join(self.dir, "cut.fits")
+        # Cut within the BINTABLE header, of one block, and its data.
+        open(name, 'wb').write(content[:len(content) - 2000 -
+                                       fitsScan.blockSize])
+        self.assertEqual(len(fitsScan.readHeaders(name)), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+#
+#                                                 CyberSKA CASA Metadata Project
+#
+#                                                 metaData.tests.testGenUtils.py
+#                                                  metaData maintainers, 2026-10
+# ------------------------------------------------------------------------------
+
+"""Tests of the frequency formatting, channel ranges and channel run
+compression of utils/genUtils.py.
+"""
+
+# $Id$
+# ------------------------------------------------------------------------------
+__version__      = '$Revision$'[11:-3]
+__version_date__ = '$Date$'[7:-3]
+__author__       = "metaData maintainers"
+# ------------------------------------------------------------------------------
+
+import unittest
+
+import numpy
+
+from metaData.utils.genUtils import channelRanges, channelRuns
+from metaData.utils.genUtils import convertHz, hzStrings
+
+
+def expand(runs):
+    """Return the channel frequencies <ndarray> of the passed runs."""
+    return numpy.concatenate([start + step * numpy.arange(count)
+                              for start, step, count in runs])
+
+
+def frequencies():
+    """Return an <ndarray> of random and edge case frequencies, Hz, in each
+    of the Hz, kHz, MHz and GHz ranges of convertHz(), either sign.
+    """
+    rng    = numpy.random.RandomState(5)
+    edges  = [0.0, -0.0, 0.25, 1.0, 9.5, 9.949999, 9.95, 10.0, 123.5, 999.0,
+              999.5, 999.8999, numpy.nextafter(999.9, 0.0), 999.9]
+    values = numpy.concatenate((edges, rng.uniform(0.0, 10.0, 200),
+                                rng.uniform(0.0, 1000.0, 200),
+                                rng.randint(0, 1000, 100)))
+    scaled = numpy.concatenate([values * scale
+                                for scale in [1.0, 1.0e3, 1.0e6, 1.0e9]])
+    scaled = scaled[scaled < 999.8e9]          # see testTooHigh()
+    return numpy.concatenate((scaled, -scaled, 8435100000.0 +
+                              rng.uniform(-1.0e9, 1.0e9, 200)))
+
+
+class TestHzStrings(unittest.TestCase):
+
+    def testRanges(self):
+        freqs = frequencies()
+        self.assertEqual(hzStrings(freqs),
+                         ["%s %s" % convertHz(f) for f in freqs.tolist()])
+
+    def testExample(self):
+        self.assertEqual(hzStrings(8435100000.0), ['8.4351 GHz'])
+        self.assertEqual(hzStrings([]), [])
+
+    def testTooHigh(self):
+        # As convertHz(), which has no unit beyond GHz.
+        for freq in [999.9e9, 1.0e12, -1.0e12]:
+            self.assertRaises(IndexError, convertHz, freq)
+            self.assertRaises(IndexError, hzStrings, [1.4e9, freq])
+        self.assertEqual(hzStrings([999.89e9]), ['1000 GHz'])
+
+
+class TestChannelRanges(unittest.TestCase):
+
+    def testExample(self):
+        self.assertEqual(channelRanges([1.4e9, 1.6e9], [1.5e9, 1.6e9], [64, 1]),
+                         '1.4000 GHz [..] 1.5000 GHz (64 chan), 1.6000 GHz, ')
+
+    def testSingleChannel(self):
+        # One channel windows keep the separator, wherever they fall.
+        self.assertEqual(channelRanges([8.4e9], [8.4e9], [1]), '8.4000 GHz, ')
+        self.assertEqual(channelRanges([1.0e9, 2.0e9, 3.0e9],
+                                       [1.0e9, 2.5e9, 3.0e9], [1, 16, 1]),
+                         '1 GHz, 2 GHz [..] 2.5000 GHz (16 chan), 3 GHz, ')
+
+    def testNoChannels(self):
+        nan = float('nan')
+        self.assertEqual(channelRanges([1.4e9, nan], [1.5e9, nan], [64, 0]),
+                         '1.4000 GHz [..] 1.5000 GHz (64 chan), '
+                         'Undefined (0 chan), ')
+
+    def testEmpty(self):
+        self.assertEqual(channelRanges([], [], []), '')
+
+
+class TestChannelRuns(unittest.TestCase):
+
+    def testExample(self):
+        self.assertEqual(channelRuns([1.0, 2.0, 3.0, 5.0, 7.0]),
+                         [(1.0, 1.0, 3), (5.0, 2.0, 2)])
+
+    def testEmpty(self):
+        self.assertEqual(channelRuns([]), [])
+
+    def testSingle(self):
+        self.assertEqual(channelRuns([1.4e9]), [(1.4e9, 0.0, 1)])
+
+    def testUniform(self):
+        freqs = 1.4e9 + 62500.0 * numpy.arange(16384)
+        runs  = channelRuns(freqs)
+        self.assertEqual(len(runs), 1)
+        self.assertEqual(runs[0][2], freqs.size)
+        self.assertTrue(numpy.allclose(expand(runs), freqs, 1e-12, 0.0))
+
+    def testDescending(self):
+        freqs = 2.0e9 - 1.0e6 * numpy.arange(64)
+        self.assertEqual(channelRuns(freqs), [(2.0e9, -1.0e6, 64)])
+
+    def testSegments(self):
+        freqs = numpy.concatenate((1.0e9 + 1.0e5 * numpy.arange(10),
+                                   1.1e9 + 2.0e5 * numpy.arange(7),
+                                   [1.3e9],
+                                   1.4e9 + 1.0e5 * numpy.arange(5)))
+        runs  = channelRuns(freqs)
+        self.assertEqual(sum([count for start, step, count in runs]),
+                         freqs.size)
+        self.assertTrue(numpy.allclose(expand(runs), freqs, 1e-12, 0.0))
+        self.assertEqual(runs[0], (1.0e9, 1.0e5, 10))
+
+    def testTolerance(self):
+        freqs = 1.0e9 + 1.0e5 * numpy.arange(100)
+        freqs[50:] += 1.0e-3
+        self.assertEqual(len(channelRuns(freqs)), 1)
+        self.assertEqual(len(channelRuns(freqs, 0.0)), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
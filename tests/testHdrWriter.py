@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+#
+#                                                 CyberSKA CASA Metadata Project
+#
+#                                                metaData.tests.testHdrWriter.py
+#                                                  metaData maintainers, 2026-10
+# ------------------------------------------------------------------------------
+
+"""Tests of the header formatters of utils/hdrWriter.py.
+
+The expected headers were written by the writeHdr() methods of MSHandlers
+and CasaImageHandlers, and the card loop of FitsHandlers.writeHdr(), as they
+stood before the formatters were moved into hdrWriter, from the same meta
+lists. Headers must stay byte for byte the same.
+"""
+
+# $Id$
+# ------------------------------------------------------------------------------
+__version__      = '$Revision$'[11:-3]
+__version_date__ = '$Date$'[7:-3]
+__author__       = "metaData maintainers"
+# ------------------------------------------------------------------------------
+
+import os
+import json
+import shutil
+import tempfile
+import unittest
+
+from cStringIO import StringIO
+
+from metaData.utils import hdrWriter
+
+msMeta = [("MS_NAME", "n6251.ms"),
+          ("OBSERVATION:TELESCOPE_NAME", "VLA"),
+          ("FIELD:PHASE_DIR",
+           "16:32:31.97, +82.32.16.4, 04:37:4.375, +29.40.13.82"),
+          ("ANTENNA:POSITION", "-1601185.4 -5041977.5 3554875.9, "
+                               "-1601225.3 -5041980.4 3554855.7"),
+          ("WINDOW_NAME", ", LL, , RR"),
+          ("WINDOW_NAME", "A1, B2"),
+          ("SPECTRAL_WINDOW:CHAN_FREQ",
+           ", ".join(["%.1f MHz" % (1400.0 + 0.5*i) for i in range(16)])),
+          ("NCHAN", 16),
+          ("SPECTRAL_WINDOW:NUM_CHAN", "16"),
+          ("KEYLEN16CHARSXX", 1.5),
+          ("EMPTY", ""),
+          ]
+
+msHdr = ("\nMS_NAME\t\t\tn6251.ms"
+         "\nOBSERVATION:TELESCOPE_NAME\tVLA"
+         "\nFIELD:PHASE_DIR\t\t16:32:31.97"
+         "\n\t\t\t +82.32.16.4"
+         "\n\t\t\t 04:37:4.375"
+         "\n\t\t\t +29.40.13.82"
+         "\nANTENNA:POSITION\t-1601185.4 -5041977.5 3554875.9"
+         "\n\t\t\t -1601225.3 -5041980.4 3554855.7"
+         "\nWINDOW_NAME\t\tNone"
+         "\n\t\t LL"
+         "\n\t\t RR"
+         "\nWINDOW_NAME\t\tA1"
+         "\n\t\t B2"
+         "\nSPECTRAL_WINDOW:CHAN_FREQ\t1400.0 MHz,  1400.5 MHz,  1401.0 MHz,"
+         "  1401.5 MHz,  1402.0 MHz, "
+         "\n\t\t\t 1402.5 MHz,  1403.0 MHz,  1403.5 MHz,  1404.0 MHz,"
+         "  1404.5 MHz, "
+         "\n\t\t\t 1405.0 MHz,  1405.5 MHz,  1406.0 MHz,  1406.5 MHz,"
+         "  1407.0 MHz, "
+         "\n\t\t\t 1407.5 MHz, "
+         "\nNCHAN\t\t\t16"
+         "\nSPECTRAL_WINDOW:NUM_CHAN\t16"
+         "\nKEYLEN16CHARSXX\t\t1.5"
+         "\nEMPTY\t\t\t"
+         "\n")
+
+imageMeta = [("IMAGE", "cube.im"),
+             ("IMAGE-MEDIAN", "0.25"),
+             ("IMAGETYPE", "Intensity"),
+             ("RESTFREQ", 1.42040575e9),
+             ("COORDINATE-SYSTEM", "J2000"),
+             ]
+
+imageHdr = ("IMAGE  \t\tcube.im\n"
+            "IMAGE-MEDIAN\t\t0.25\n"
+            "IMAGETYPE\t\tIntensity\n"
+            "RESTFREQ\t\t1420405750.0\n"
+            "COORDINATE-SYSTEM\tJ2000\n")
+
+fitsMeta = [("SIMPLE", True, "conforms to FITS standard"),
+            ("BITPIX", -32, ""),
+            ("NAXIS", 2, " number of array dimensions"),
+            ("COMMENT", "written by hand", ""),
+            ("EXTEND", False, ""),
+            ("OBJECT", "M31", "target"),
+            ("CRVAL1", 10.684708, " "),
+            ]
+
+fitsHdr = ("SIMPLE  =                     T /conforms to FITS standard\n"
+           "BITPIX  =                   -32\n"
+           "NAXIS   =                     2 / number of array dimensions\n"
+           "COMMENT        written by hand\n"
+           "EXTEND  =                 False\n"
+           "OBJECT  =                   M31 /target\n"
+           "CRVAL1  =             10.684708\n")
+
+
+class TestFormatters(unittest.TestCase):
+
+    def testMSHdr(self):
+        self.assertEqual(hdrWriter.formatMSHdr(msMeta), msHdr)
+
+    def testImageHdr(self):
+        self.assertEqual(hdrWriter.formatImageHdr(imageMeta), imageHdr)
+
+    def testFitsHdr(self):
+        self.assertEqual(hdrWriter.formatFitsHdr(fitsMeta), fitsHdr)
+
+    def testDispatch(self):
+        for mimeType, meta, hdr in [('image/ms-uvw',   msMeta,    msHdr),
+                                    ('image/ms-image', imageMeta, imageHdr),
+                                    ('image/fits',     fitsMeta,  fitsHdr),
+                                    ('image/fits-uvw', fitsMeta,  fitsHdr)]:
+            self.assertEqual(hdrWriter.formatHdr(mimeType, meta), hdr)
+            self.assertEqual(hdrWriter.formatOutput('hdr', 'x', mimeType,
+                                                    meta), hdr)
+        self.assertRaises(KeyError, hdrWriter.formatHdr, 'text/plain', [])
+
+
+class TestOutput(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def testWriteHdrFile(self):
+        target = os.path.join(self.dir, "n6251.ms.hdr")
+        open(target, 'w').write("stale header\n")
+        self.assertEqual(hdrWriter.writeHdr(msHdr, target), target)
+        self.assertEqual(open(target, 'rb').read(), msHdr)
+        self.assertEqual(os.listdir(self.dir), ["n6251.ms.hdr"])
+
+    def testWriteHdrFileObject(self):
+        fob = StringIO()
+        hdrWriter.writeHdr(imageHdr, fob)
+        self.assertEqual(fob.getvalue(), imageHdr)
+
+    def testRecord(self):
+        record = json.loads(hdrWriter.formatOutput('json', 'cube.fits',
+                                                   'image/fits', fitsMeta))
+        self.assertEqual(record['file'], 'cube.fits')
+        self.assertEqual(record['mimeType'], 'image/fits')
+        self.assertEqual(record['keys'][0],
+                         ['SIMPLE', True, 'conforms to FITS standard'])
+        line = hdrWriter.formatOutput('jsonl', 'cube.im', 'image/ms-image',
+                                      imageMeta, {'RESTFREQ': [1.0, 2.0]})
+        self.assertEqual(line.count("\n"), 1)
+        self.assertEqual(json.loads(line)['keys'][3], ['RESTFREQ', [1.0, 2.0]])
+
+    def testNonFinite(self):
+        nan, inf = float('nan'), float('inf')
+        values = {'RESTFREQ': [nan, inf, -inf, 1.0],
+                  'IMAGE-MEDIAN': {'first': [nan], 'nchan': [0]}}
+        for outputFormat in ['json', 'jsonl']:
+            text = hdrWriter.formatOutput(outputFormat, 'cube.im',
+                                          'image/ms-image', imageMeta, values)
+            self.assertFalse('NaN' in text or 'Infinity' in text, text)
+            keys = dict([card[:2] for card in json.loads(text)['keys']])
+            self.assertEqual(keys['RESTFREQ'], [None, None, None, 1.0])
+            self.assertEqual(keys['IMAGE-MEDIAN'],
+                             {'first': [None], 'nchan': [0]})
+
+
+if __name__ == '__main__':
+    unittest.main()
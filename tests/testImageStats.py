@@ -0,0 +1,275 @@
+#!/usr/bin/env python
+#
+#                                                 CyberSKA CASA Metadata Project
+#
+#                                               metaData.tests.testImageStats.py
+#                                                  metaData maintainers, 2026-10
+# ------------------------------------------------------------------------------
+
+"""Tests of the bounded memory image statistics of utils/imageStats.py.
+
+Exact statistics are checked against numpy over the whole array, with memory
+budgets small enough to force many chunks and several median passes, on
+spread, tie-heavy, masked and constant images. The approximate mode's
+quartiles are checked to lie within the rank error bound it reports, and
+pooled passes over a FITS image to give the serial results.
+"""
+
+# $Id$
+# ------------------------------------------------------------------------------
+__version__      = '$Revision$'[11:-3]
+__version_date__ = '$Date$'[7:-3]
+__author__       = "metaData maintainers"
+# ------------------------------------------------------------------------------
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy
+
+from metaData.utils import imageStats
+from metaData.utils.fitsScan import findImage
+
+
+class ArraySource(object):
+    """Class presents an in-memory <ndarray> as a pixel source, with NaNs
+    as masked pixels, counting the pixels read.
+    """
+
+    def __init__(self, data, tile=None):
+        self.data  = numpy.asarray(data, dtype=numpy.float64)
+        self.shape = self.data.shape
+        self.tile  = tile or imageStats.planeTile(self.shape)
+        self.pixelsRead = 0
+
+    def read(self, blc, trc):
+        box  = tuple([slice(b, t+1) for b, t in zip(blc, trc)])
+        data = self.data[box].copy()
+        self.pixelsRead += data.size
+        valid = numpy.isfinite(data)
+        if valid.all(): valid = None
+        return data, valid
+
+    def passes(self):
+        return self.pixelsRead // self.data.size
+
+
+def writeFits(fileName, data):
+    """Write the passed <ndarray> as the primary image of a FITS file,
+    BITPIX -64.
+    """
+    cards = ["SIMPLE  = %20s" % "T", "BITPIX  = %20d" % -64,
+             "NAXIS   = %20d" % data.ndim]
+    for i, n in enumerate(data.shape[::-1]):
+        cards.append("NAXIS%-3d= %20d" % (i+1, n))
+    cards.append("END")
+    header = "".join(["%-80s" % card for card in cards])
+    raw    = data.astype('>f8').tostring()
+    fob = open(fileName, 'wb')
+    fob.write(header + " " * (-len(header) % 2880))
+    fob.write(raw + "\0" * (-len(raw) % 2880))
+    fob.close()
+
+
+class TestExact(unittest.TestCase):
+
+    # 100 pixels a chunk.
+    budget = 100 * imageStats.bytesPerPixel
+
+    def check(self, data, budget=None):
+        """Return the statistics of data <ndarray>, NaNs masked, and check
+        them against numpy.
+        """
+        source = ArraySource(data)
+        stats  = imageStats.imageStatistics(source, budget or self.budget)
+        values = data[numpy.isfinite(data)]
+        n      = values.size
+        self.assertEqual(stats['npts'][0], n)
+        self.assertEqual(stats['min'][0], values.min())
+        self.assertEqual(stats['max'][0], values.max())
+        self.assertEqual(stats['median'][0],
+                         numpy.sort(values)[(n - 1) // 2])
+        self.assertClose(stats['sum'][0], values.sum())
+        self.assertClose(stats['sumsq'][0], (values**2).sum())
+        self.assertClose(stats['mean'][0], values.mean())
+        self.assertClose(stats['rms'][0], numpy.sqrt((values**2).mean()))
+        if n > 1:
+            self.assertClose(stats['sigma'][0], values.std(ddof=1))
+        return source, stats
+
+    def assertClose(self, value, expected):
+        self.assertTrue(numpy.allclose(value, expected, 1e-9, 1e-12),
+                        (value, expected))
+
+    def testSpread(self):
+        data = numpy.random.RandomState(1).normal(size=(3, 40, 50))
+        source, stats = self.check(data)
+        # casacore axis order, i.e. numpy's reversed.
+        where = numpy.unravel_index(data.argmin(), data.shape)[::-1]
+        self.assertEqual(list(stats['minpos']), list(where))
+        where = numpy.unravel_index(data.argmax(), data.shape)[::-1]
+        self.assertEqual(list(stats['maxpos']), list(where))
+
+    def testEvenCount(self):
+        data = numpy.random.RandomState(2).uniform(size=(2, 30, 31))
+        self.check(data)
+
+    def testTieHeavy(self):
+        rng  = numpy.random.RandomState(3)
+        data = numpy.zeros((4, 50, 50))
+        data.flat[rng.randint(0, data.size, 500)] = rng.normal(size=500)
+        source, stats = self.check(data)
+        self.assertEqual(stats['median'][0], 0.0)
+        # The moments' pass and a few refinement passes, not one per bit.
+        self.assertTrue(source.passes() <= 5, source.passes())
+
+    def testTieHeavyOffCentre(self):
+        rng  = numpy.random.RandomState(4)
+        data = numpy.repeat([1.0, 2.0, 3.0], [4000, 3000, 3000])
+        data = rng.permutation(data).reshape(10, 20, 50)
+        source, stats = self.check(data)
+        self.assertEqual(stats['median'][0], 2.0)
+        self.assertTrue(source.passes() <= 5, source.passes())
+
+    def testNeighbouringValues(self):
+        value = 1.0e10
+        data  = numpy.array([value, numpy.nextafter(value, 0.0)] * 1000)
+        # sigma, from the sums, is lost to cancellation here; the median
+        # must still be found to the ulp.
+        source = ArraySource(data.reshape(1, 40, 50))
+        stats  = imageStats.imageStatistics(source, self.budget)
+        self.assertEqual(stats['median'][0], numpy.nextafter(value, 0.0))
+        self.assertTrue(source.passes() <= 5, source.passes())
+
+    def testMasked(self):
+        data = numpy.random.RandomState(5).normal(size=(2, 30, 40))
+        data[0, :10] = numpy.nan
+        data[1, 5, 5] = numpy.inf
+        self.check(data)
+
+    def testConstant(self):
+        source, stats = self.check(numpy.ones((2, 20, 20)))
+        self.assertEqual(stats['sigma'][0], 0.0)
+        self.assertEqual(source.passes(), 1)
+
+    def testSinglePixel(self):
+        self.check(numpy.array([[[7.5]]]))
+
+    def testAllMasked(self):
+        data  = numpy.zeros((1, 5, 5)) + numpy.nan
+        stats = imageStats.imageStatistics(ArraySource(data), self.budget)
+        self.assertEqual(stats['npts'].size, 0)
+        self.assertEqual(stats['median'].size, 0)
+
+    def testLargeBudget(self):
+        data = numpy.random.RandomState(6).normal(size=(3, 40, 50))
+        self.check(data, 256*1024*1024)
+
+
+class TestChunks(unittest.TestCase):
+
+    def testChunkBoxes(self):
+        shape = (3, 7, 5)
+        chunk = imageStats.chunkShape(shape, (1, 2, 5), 10 *
+                                      imageStats.bytesPerPixel)
+        self.assertEqual(chunk, (1, 2, 5))
+        covered = numpy.zeros(shape, dtype=int)
+        for blc, trc in imageStats.chunkBoxes(shape, chunk):
+            covered[tuple([slice(b, t+1) for b, t in zip(blc, trc)])] += 1
+        self.assertTrue((covered == 1).all())
+
+    def testSingleTile(self):
+        self.assertEqual(imageStats.chunkShape((2, 64, 64), (1, 64, 64), 1),
+                         (1, 64, 64))
+
+
+class TestApprox(unittest.TestCase):
+
+    def checkBound(self, data, rankError):
+        source = ArraySource(data)
+        stats  = imageStats.imageStatistics(source, 4*1024*1024, 'approx',
+                                            rankError)
+        values = numpy.sort(data.ravel())
+        n      = values.size
+        bound  = stats['rankError'][0]
+        self.assertTrue(0.0 < bound <= 1.5 * rankError, bound)
+        self.assertEqual(source.passes(), 1)
+        self.assertEqual(stats['npts'][0], n)
+        self.assertAlmostEqual(stats['mean'][0], values.mean(), 9)
+        for key, fraction in [('q1', 0.25), ('median', 0.5), ('q3', 0.75)]:
+            value = stats[key][0]
+            low   = numpy.searchsorted(values, value, 'left')  / float(n)
+            high  = numpy.searchsorted(values, value, 'right') / float(n)
+            error = max(0.0, low - fraction, fraction - high)
+            self.assertTrue(error <= bound, (key, error, bound))
+        return stats
+
+    def testRamp(self):
+        shape = (4, 1153, 200)
+        self.checkBound(numpy.arange(numpy.prod(shape),
+                                     dtype=numpy.float64).reshape(shape), 0.01)
+
+    def testColumnRamp(self):
+        # Values repeat with the row stride, which must not bias the sample.
+        shape = (4, 1153, 200)
+        data  = numpy.zeros(shape) + numpy.arange(shape[-1])
+        self.checkBound(data, 0.01)
+
+    def testSmallImage(self):
+        data  = numpy.random.RandomState(7).normal(size=(1, 30, 30))
+        stats = imageStats.imageStatistics(ArraySource(data), 1024*1024,
+                                           'approx', 0.01)
+        self.assertEqual(stats['rankError'][0], 0.0)
+        self.assertEqual(stats['sampleFraction'][0], 1.0)
+        self.assertEqual(stats['median'][0],
+                         numpy.sort(data.ravel())[(data.size - 1) // 2])
+
+    def testRankBound(self):
+        for rankError in [0.1, 0.01, 0.001]:
+            size = imageStats.sampleSize(rankError)
+            self.assertTrue(imageStats.rankBound(size) <= rankError)
+
+
+class TestFits(unittest.TestCase):
+
+    def setUp(self):
+        self.dir  = tempfile.mkdtemp()
+        self.name = os.path.join(self.dir, "cube.fits")
+        data = numpy.random.RandomState(8).normal(size=(6, 60, 70))
+        data[2, :, 10] = numpy.nan
+        writeFits(self.name, data)
+        self.data = data
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def source(self):
+        cards, offset = findImage(self.name)
+        return imageStats.FitsImageSource(cards, offset, self.name)
+
+    def testSerialPooled(self):
+        budget = 2 * 60 * 70 * imageStats.bytesPerPixel
+        for mode in ['exact', 'approx']:
+            serial = imageStats.imageStatistics(self.source(), budget, mode,
+                                                0.05, workers=1)
+            pooled = imageStats.imageStatistics(self.source(), budget, mode,
+                                                0.05, workers=3)
+            self.assertEqual(sorted(serial), sorted(pooled))
+            for key in serial:
+                self.assertTrue(numpy.array_equal(serial[key], pooled[key]),
+                                (mode, key))
+        values = self.data[numpy.isfinite(self.data)]
+        self.assertEqual(serial['npts'][0], values.size)
+
+    def testFitsExact(self):
+        stats  = imageStats.imageStatistics(self.source(), 4096)
+        values = self.data[numpy.isfinite(self.data)]
+        self.assertEqual(stats['median'][0],
+                         numpy.sort(values)[(values.size - 1) // 2])
+        self.assertEqual(stats['max'][0], values.max())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+#
+#                                                 CyberSKA CASA Metadata Project
+#
+#                                           metaData.tests.testMjdConversions.py
+#                                                  metaData maintainers, 2026-10
+# ------------------------------------------------------------------------------
+
+"""Tests of the array date conversions of convert/mjdConversions.py.
+
+caldates() must return, string for string, what caldate() returns for each
+element, and julian_dates() what julian_date() returns, to within its
+rounding of the seconds, at day boundaries, about leap days and across the
+Julian/Gregorian switchover.
+"""
+
+# $Id$
+# ------------------------------------------------------------------------------
+__version__      = '$Revision$'[11:-3]
+__version_date__ = '$Date$'[7:-3]
+__author__       = "metaData maintainers"
+# ------------------------------------------------------------------------------
+
+import unittest
+
+import numpy
+
+from metaData.convert import mjdConversions
+
+MJD0 = mjdConversions.MJD0
+
+# Leap days and their neighbours, Gregorian and Julian, and the switchover.
+dates = [(2000, 2, 28), (2000, 2, 29), (2000, 3, 1), (1900, 2, 28),
+         (1900, 3, 1), (2004, 2, 29), (2100, 2, 28), (2100, 3, 1),
+         (1996, 12, 31), (1997, 1, 1), (1500, 2, 29), (1500, 3, 1),
+         (1582, 10, 4), (1582, 10, 15), (1858, 11, 17), (1, 1, 1)]
+
+
+def midnights():
+    """Return an <ndarray> of the MJD midnights of the passed dates."""
+    return numpy.array([mjdConversions.julian_date(y, m, d, 0, 0, 0) - MJD0
+                        for y, m, d in dates])
+
+
+class TestCaldates(unittest.TestCase):
+
+    def check(self, mjd):
+        self.assertEqual(mjdConversions.caldates(mjd),
+                         [mjdConversions.caldate(m) for m in mjd.tolist()])
+
+    def testDayBoundaries(self):
+        days  = midnights()
+        steps = numpy.array([0.0, 1.0e-9, -1.0e-9, 0.5, 1.0e-5,
+                             1.0 - 1.0 / 86400, 1.0 - 1.0e-6,
+                             59.99999999999 / 86400, 3599.9999999 / 86400])
+        self.check((days[:, None] + steps).ravel())
+
+    def testLeapDays(self):
+        days = midnights()
+        self.check(numpy.concatenate((days, days + 0.75, days - 0.25)))
+
+    def testRandom(self):
+        rng = numpy.random.RandomState(3)
+        self.check(numpy.concatenate((rng.uniform(-200000.0, 100000.0, 500),
+                                      rng.uniform(40000.0, 70000.0, 500))))
+
+    def testScalar(self):
+        mjd = 49558.320659722245
+        self.assertEqual(mjdConversions.caldates(mjd),
+                         [mjdConversions.caldate(mjd)])
+
+
+class TestJulianDates(unittest.TestCase):
+
+    def testDates(self):
+        rng   = numpy.random.RandomState(4)
+        times = [(0, 0, 0.0), (23, 59, 59.999), (12, 0, 0.0), (7, 41, 45.5)]
+        times = times + zip(rng.randint(0, 24, 50), rng.randint(0, 60, 50),
+                            rng.uniform(0.0, 60.0, 50))
+        rows  = [date + time for date in dates for time in times]
+        jds   = mjdConversions.julian_dates(*zip(*rows))
+        for row, jd in zip(rows, jds.tolist()):
+            # julian_date() rounds the seconds to the 12 digits of str().
+            self.assertTrue(abs(jd - mjdConversions.julian_date(*row)) <=
+                            1.0e-9, row)
+
+    def testMidnights(self):
+        years, months, days = zip(*dates)
+        self.assertEqual(
+            mjdConversions.julian_dates(years, months, days, 0, 0, 0).tolist(),
+            [mjdConversions.julian_date(y, m, d, 0, 0, 0) for y, m, d in dates])
+
+    def testRoundTrip(self):
+        # caldate() pads years below 10 to two digits only.
+        years, months, days = zip(*dates[:-1])
+        mjd = mjdConversions.julian_dates(years, months, days, 6, 0, 0) - MJD0
+        self.assertEqual([date.split("T")[0]
+                          for date in mjdConversions.caldates(mjd)],
+                         ["%d-%02d-%02d" % date for date in dates[:-1]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,236 @@
+#!/usr/bin/env python
+#
+#                                                 CyberSKA CASA Metadata Project
+#
+#                                              metaData.tests.testMsMainTable.py
+#                                                  metaData maintainers, 2026-10
+# ------------------------------------------------------------------------------
+
+"""Tests of the main table reductions of utils/msMainTable.py.
+
+The accumulators are fed random main table columns in row chunks, through
+the reduction functions and a stand-in table tool, and checked against the
+same reductions done by numpy over all rows at once.
+"""
+
+# $Id$
+# ------------------------------------------------------------------------------
+__version__      = '$Revision$'[11:-3]
+__version_date__ = '$Date$'[7:-3]
+__author__       = "metaData maintainers"
+# ------------------------------------------------------------------------------
+
+import unittest
+
+import numpy
+
+from metaData.utils import msMainTable
+
+
+class ArrayTable(object):
+    """Class presents a <dict> of column <ndarray>s as a main table tool."""
+
+    def __init__(self, columns):
+        self.columns = columns
+
+    def nrows(self):
+        return len(self.columns['TIME'])
+
+    def getcol(self, column, startrow=0, nrow=-1):
+        if nrow < 0: nrow = self.nrows() - startrow
+        return self.columns[column][startrow:startrow+nrow].copy()
+
+
+def mainTable(nrows=5000, nchan=8, ncorr=2, nant=6, seed=1):
+    """Return an ArrayTable of random scans, fields, data descriptions,
+    antennas, flags and UVWs, in time order.
+    """
+    rng  = numpy.random.RandomState(seed)
+    scan = numpy.sort(rng.randint(1, 8, nrows))
+    a1   = rng.randint(0, nant, nrows)
+    a2   = rng.randint(0, nant, nrows)
+    return ArrayTable({
+        'TIME'         : 4.8e9 + numpy.arange(nrows) * 2.0 + scan * 100.0,
+        'INTERVAL'     : rng.choice([2.0, 4.0], nrows),
+        'EXPOSURE'     : rng.uniform(1.5, 2.0, nrows),
+        'SCAN_NUMBER'  : scan.astype(numpy.int32),
+        'FIELD_ID'     : (scan % 3).astype(numpy.int32),
+        'DATA_DESC_ID' : rng.randint(0, 3, nrows).astype(numpy.int32),
+        'ANTENNA1'     : numpy.minimum(a1, a2).astype(numpy.int32),
+        'ANTENNA2'     : numpy.maximum(a1, a2).astype(numpy.int32),
+        'FLAG_ROW'     : rng.uniform(size=nrows) < 0.05,
+        'FLAG'         : rng.uniform(size=(nrows, nchan, ncorr)) < 0.2,
+        'UVW'          : rng.normal(0.0, 3000.0, (nrows, 3)),
+        })
+
+
+class TestScanSummary(unittest.TestCase):
+
+    def testChunks(self):
+        table   = mainTable()
+        col     = table.columns
+        runner  = msMainTable.RowRunner(table, "main")
+        summary = msMainTable.scanSummary(runner, 777)
+        self.assertEqual(summary.nrows, table.nrows())
+        keys = set(zip(col['SCAN_NUMBER'].tolist(), col['FIELD_ID'].tolist()))
+        self.assertEqual(set(summary.groups), keys)
+        for (scan, field), group in summary.groups.items():
+            rows = (col['SCAN_NUMBER'] == scan) & (col['FIELD_ID'] == field)
+            half = col['INTERVAL'][rows] / 2.0
+            self.assertEqual(group[0], (col['TIME'][rows] - half).min())
+            self.assertEqual(group[1], (col['TIME'][rows] + half).max())
+            self.assertEqual(group[2], rows.sum())
+            self.assertAlmostEqual(group[3], col['INTERVAL'][rows].sum(), 6)
+            self.assertAlmostEqual(group[4], col['EXPOSURE'][rows].sum(), 6)
+            self.assertEqual(group[5],
+                             set(col['DATA_DESC_ID'][rows].tolist()))
+
+        meta, values = msMainTable.scanMeta(summary)
+        self.assertEqual(values["MAIN:NROWS"], table.nrows())
+        self.assertEqual(values["MAIN:NSCANS"], len(set(col['SCAN_NUMBER'])))
+        starts = values["MAIN:SCAN_START"]
+        self.assertEqual(starts, sorted(starts))
+        self.assertEqual(sum(values["MAIN:FIELD_NROWS"]), table.nrows())
+        self.assertEqual([key for key, value in meta], values.keys())
+
+    def testFieldTime(self):
+        # Six baselines an integration, with gaps between integrations and
+        # scans, read in chunks that split integrations.
+        rng   = numpy.random.RandomState(3)
+        nint  = 400
+        scan  = numpy.repeat(numpy.sort(rng.randint(1, 9, nint)), 6)
+        time  = numpy.repeat(4.8e9 + numpy.arange(nint) * 10.0, 6) + \
+                scan * 600.0
+        exposure = rng.uniform(1.5, 2.0, scan.size)
+        flagRow  = rng.uniform(size=scan.size) < 0.3
+        flagRow[:60] = True              # ten integrations flagged whole
+        table = ArrayTable({
+            'TIME': time, 'INTERVAL': numpy.full(scan.size, 2.0),
+            'EXPOSURE': exposure, 'SCAN_NUMBER': scan.astype(numpy.int32),
+            'FIELD_ID': (scan % 3).astype(numpy.int32),
+            'DATA_DESC_ID': numpy.zeros(scan.size, numpy.int32),
+            'FLAG_ROW': flagRow})
+        runner = msMainTable.RowRunner(table, "main")
+        meta, values = msMainTable.scanMeta(msMainTable.scanSummary(runner, 7))
+        for field, onSource in zip(values["MAIN:FIELD_ID"],
+                                   values["MAIN:FIELD_TIME"]):
+            longest = {}
+            for t, e, f, flag in zip(time, exposure, scan % 3, flagRow):
+                if f == field and not flag:
+                    longest[t] = max(e, longest.get(t, 0.0))
+            self.assertAlmostEqual(onSource, sum(longest.values()), 9)
+            self.assertTrue(onSource < 2.0 * nint)
+
+    def testMerge(self):
+        table = mainTable(seed=2)
+        whole = msMainTable.ScanSummary()
+        whole.add(*msMainTable.readChunk(table, msMainTable.scanColumns,
+                                         0, table.nrows()))
+        parts = msMainTable.ScanSummary()
+        for start, nrow in msMainTable.rowChunks(table.nrows(), 333):
+            part = msMainTable.ScanSummary()
+            part.add(*msMainTable.readChunk(table, msMainTable.scanColumns,
+                                            start, nrow))
+            parts.merge(part)
+        self.assertEqual(parts.nrows, whole.nrows)
+        self.assertEqual(sorted(parts.groups), sorted(whole.groups))
+        for key in whole.groups:
+            self.assertEqual(parts.groups[key][:3], whole.groups[key][:3])
+
+
+class TestFlagCounts(unittest.TestCase):
+
+    def testChunks(self):
+        table  = mainTable()
+        col    = table.columns
+        runner = msMainTable.RowRunner(table, "main")
+        counts = msMainTable.flagCounts(runner, 500)
+        flag   = col['FLAG'].copy()
+        flag[col['FLAG_ROW']] = True
+        nrows, nchan, ncorr = flag.shape
+        self.assertEqual(counts.nrows, nrows)
+        self.assertEqual(counts.rowsFlagged, col['FLAG_ROW'].sum())
+        for d in range(3):
+            rows = col['DATA_DESC_ID'] == d
+            self.assertEqual(counts.ddids[d][0].tolist(),
+                             flag[rows].sum(axis=(0, 1)).tolist())
+            self.assertEqual(counts.ddids[d][1], rows.sum() * nchan)
+        perRow = flag.sum(axis=(1, 2))
+        for a in range(6):
+            rows = (col['ANTENNA1'] == a).astype(int) + \
+                   (col['ANTENNA2'] == a).astype(int)
+            self.assertEqual(counts.antFlagged[a], (perRow * rows).sum())
+            self.assertEqual(counts.antTotal[a], rows.sum() * nchan * ncorr)
+
+        meta, values = msMainTable.flagMeta(counts, [0, 0, 1],
+                                            [['RR', 'LL']] * 3)
+        self.assertEqual(values["MAIN:VISIBILITIES"], flag.size)
+        self.assertAlmostEqual(values["MAIN:FLAGGED_FRACTION"],
+                               flag.mean(), 12)
+        self.assertEqual(values["MAIN:SPW_ID"], [0, 1])
+        self.assertEqual(values["MAIN:CORR_TYPE"], ['RR', 'LL'])
+        self.assertAlmostEqual(values["MAIN:CORR_FLAGGED_FRACTION"][1],
+                               flag[:, :, 1].mean(), 12)
+
+    def testCellShapes(self):
+        # Shape codes read the whole chunk where all cells are alike.
+        ddid = numpy.array([0, 0, 1, 1, 2, 0])
+        self.assertEqual(msMainTable.readRuns(ddid),
+                         [(0, 2), (2, 4), (4, 5), (5, 6)])
+        codes = numpy.array([0, 0, 1])
+        self.assertEqual(msMainTable.readRuns(ddid, codes),
+                         [(0, 4), (4, 5), (5, 6)])
+        self.assertEqual(msMainTable.readRuns(numpy.array([], int)), [])
+
+    def testFlagRows(self):
+        self.assertEqual(msMainTable.flagRows(1000, 10), 50)
+        self.assertEqual(msMainTable.flagRows(1, 10), 1)
+        self.assertEqual(msMainTable.flagRows(10**12, 10, 777), 777)
+
+
+class TestBaselineStats(unittest.TestCase):
+
+    def testChunks(self):
+        table  = mainTable()
+        col    = table.columns
+        runner = msMainTable.RowRunner(table, "main")
+        stats  = msMainTable.baselineStats(runner, 600)
+        keep   = (col['ANTENNA1'] != col['ANTENNA2']) & ~col['FLAG_ROW']
+        length = numpy.sort(numpy.hypot(col['UVW'][keep, 0],
+                                        col['UVW'][keep, 1]))
+        self.assertEqual(stats.count, length.size)
+        self.assertEqual(stats.min, length[0])
+        self.assertEqual(stats.max, length[-1])
+        for percent in [0, 5, 50, 95, 100]:
+            exact = length[int(percent / 100.0 * (length.size - 1))]
+            self.assertTrue(abs(stats.percentile(percent) / exact - 1) <=
+                            msMainTable.uvPrecision * 1.0001,
+                            (percent, stats.percentile(percent), exact))
+
+        meta, values = msMainTable.baselineMeta(stats, 1.0e9, 1.5e9)
+        self.assertEqual(values["MAIN:UVDIST_MAX"], length[-1])
+        self.assertAlmostEqual(values["MAIN:RESOLUTION"],
+                               msMainTable.arcsec(msMainTable.lightSpeed /
+                                                  1.5e9 / length[-1]), 9)
+
+    def testEmpty(self):
+        stats = msMainTable.BaselineStats()
+        stats.add(numpy.zeros((3, 3)), numpy.arange(3), numpy.arange(3),
+                  numpy.zeros(3, bool))
+        self.assertEqual(stats.count, 0)
+        self.assertEqual(stats.percentile(50), None)
+        meta, values = msMainTable.baselineMeta(stats)
+        self.assertEqual(dict(meta)["MAIN:UVDIST_MIN"], "Undefined")
+
+
+class TestRowChunks(unittest.TestCase):
+
+    def testRowChunks(self):
+        self.assertEqual(msMainTable.rowChunks(10, 4),
+                         [(0, 4), (4, 4), (8, 2)])
+        self.assertEqual(msMainTable.rowChunks(0, 4), [])
+        self.assertEqual(msMainTable.rowChunks(3, 0), [(0, 1), (1, 1), (2, 1)])
+
+
+if __name__ == '__main__':
+    unittest.main()
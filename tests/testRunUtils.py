@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+#
+#                                                 CyberSKA CASA Metadata Project
+#
+#                                                 metaData.tests.testRunUtils.py
+#                                                  metaData maintainers, 2026-10
+# ------------------------------------------------------------------------------
+
+"""Tests of the array formatters of utils/runUtils.py.
+
+hmsStrings(), dmsStrings() and isoDateTimes() must return, string for
+string, what decdeg2hmsString(), decdeg2dmsString() and isoDateTime() return
+for each element, including at unit boundaries, below the milli-arcsecond
+kludge and for invalid values.
+"""
+
+# $Id$
+# ------------------------------------------------------------------------------
+__version__      = '$Revision$'[11:-3]
+__version_date__ = '$Date$'[7:-3]
+__author__       = "metaData maintainers"
+# ------------------------------------------------------------------------------
+
+import unittest
+
+import numpy
+
+from metaData.utils import runUtils
+
+
+def degrees():
+    """Return an <ndarray> of random and edge case decimal degrees."""
+    rng   = numpy.random.RandomState(1)
+    edges = [0.0, -0.0, 15.0, 28.0, -28.0, 149.99999999, 180.0, 359.9999,
+             1.0/3600, -1.0/3600, 1.0e-9, -1.0e-9, 10.0 + 1.0e-8, 89.5,
+             numpy.degrees(0.4886921905584124)]
+    return numpy.concatenate((edges, rng.uniform(-90.0, 90.0, 500),
+                              rng.uniform(0.0, 360.0, 500)))
+
+
+class TestAngles(unittest.TestCase):
+
+    def testHms(self):
+        values = degrees()
+        scalar = runUtils.decdeg2hmsString
+        self.assertEqual(runUtils.hmsStrings(values),
+                         [scalar(v) for v in values.tolist()])
+
+    def testDms(self):
+        values = degrees()
+        scalar = runUtils.decdeg2dmsString
+        self.assertEqual(runUtils.dmsStrings(values),
+                         [scalar(v) for v in values.tolist()])
+
+    def testNonFinite(self):
+        # As the scalar functions, which cannot format them.
+        for value in [numpy.nan, numpy.inf]:
+            self.assertRaises(ValueError, runUtils.decdeg2hmsString, value)
+            self.assertRaises(ValueError, runUtils.hmsStrings, [12.5, value])
+            self.assertRaises(ValueError, runUtils.decdeg2dmsString, value)
+            self.assertRaises(ValueError, runUtils.dmsStrings, [12.5, value])
+
+    def testEmpty(self):
+        self.assertEqual(runUtils.hmsStrings([]), [])
+        self.assertEqual(runUtils.dmsStrings([]), [])
+        self.assertEqual(runUtils.raDecStrings([]), ([], []))
+
+    def testRaDec(self):
+        directions = numpy.radians([[248.13, 82.54], [69.27, -29.67]])
+        ras, decs  = runUtils.raDecStrings(directions)
+        self.assertEqual(ras, runUtils.hmsStrings(
+                                  numpy.degrees(directions[:, 0])))
+        self.assertEqual(decs, runUtils.dmsStrings(
+                                   numpy.degrees(directions[:, 1])))
+
+
+class TestTimes(unittest.TestCase):
+
+    def testIsoDateTimes(self):
+        rng   = numpy.random.RandomState(2)
+        times = numpy.concatenate((
+            [0.0, 1.0, runUtils.epochDelta, runUtils.epochDelta - 0.5,
+             runUtils.epochDelta + 0.999, 4.8e9 + 0.5, 4.8e9 - 0.5,
+             runUtils.epochDelta + runUtils.minIsoSecs,
+             runUtils.epochDelta + runUtils.minIsoSecs - 1.0],
+            rng.uniform(3.0e9, 6.0e9, 1000)))
+        self.assertEqual(runUtils.isoDateTimes(times),
+                         [runUtils.isoDateTime(t) for t in times.tolist()])
+
+    def testInvalid(self):
+        times = [numpy.nan, numpy.inf, -numpy.inf, 0.0]
+        self.assertEqual(runUtils.isoDateTimes(times), ["No Times"] * 4)
+        self.assertEqual(runUtils.isoDateTimes(times, "Undefined"),
+                         ["Undefined"] * 4)
+
+    def testFarFuture(self):
+        time = runUtils.epochDelta + runUtils.maxIsoSecs + 86400.0
+        self.assertEqual(runUtils.isoDateTimes([time]),
+                         [runUtils.isoDateTime(time)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+#
+#                                                 CyberSKA CASA Metadata Project
+#
+#                                                 metaData.tests.testTarUtils.py
+#                                                  metaData maintainers, 2026-10
+# ------------------------------------------------------------------------------
+
+"""Tests of the selective tar extraction of utils/tarUtils.py.
+
+A tarred Measurement Set skeleton is extracted into a scratch directory,
+and archives whose members lead out of it are refused before anything is
+written.
+"""
+
+# $Id$
+# ------------------------------------------------------------------------------
+__version__      = '$Revision$'[11:-3]
+__version_date__ = '$Date$'[7:-3]
+__author__       = "metaData maintainers"
+# ------------------------------------------------------------------------------
+
+import os
+import shutil
+import tarfile
+import tempfile
+import unittest
+
+from cStringIO import StringIO
+
+from metaData.utils import tarUtils
+
+
+def fileMember(name, content):
+    """Return a (TarInfo, file object) of a regular file member."""
+    info = tarfile.TarInfo(name)
+    info.size = len(content)
+    return info, StringIO(content)
+
+
+def linkMember(name, target, linkType=tarfile.SYMTYPE):
+    """Return a (TarInfo, None) of a symbolic, or hard, link member."""
+    info = tarfile.TarInfo(name)
+    info.type     = linkType
+    info.linkname = target
+    return info, None
+
+
+def msMembers():
+    """Return the members of a small tarred Measurement Set."""
+    return [fileMember("test.ms/table.info", "Type = Measurement Set\n"),
+            fileMember("test.ms/table.dat", "main table"),
+            fileMember("test.ms/table.f0", "tsm header"),
+            fileMember("test.ms/table.f0_TSM0", "x" * 5000),
+            fileMember("test.ms/ANTENNA/table.dat", "antennas")]
+
+
+class TestExtract(unittest.TestCase):
+
+    def setUp(self):
+        self.dir     = tempfile.mkdtemp()
+        self.scratch = os.path.join(self.dir, "scratch")
+        os.mkdir(self.scratch)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def archive(self, members):
+        name = os.path.join(self.dir, "test.ms.tar")
+        tob  = tarfile.open(name, 'w')
+        for info, fob in members: tob.addfile(info, fob)
+        tob.close()
+        return tarfile.open(name)
+
+    def testSkeleton(self):
+        root, nbytes = tarUtils.extractMeta(self.archive(msMembers()),
+                                            self.scratch)
+        self.assertEqual(root, "test.ms")
+        tsm = os.path.join(self.scratch, "test.ms", "table.f0_TSM0")
+        self.assertEqual(os.path.getsize(tsm), 5000)
+        self.assertEqual(open(tsm).read(10), "\0" * 10)
+        self.assertEqual(nbytes, sum([len(c) for c in
+                                      ["Type = Measurement Set\n",
+                                       "main table", "tsm header",
+                                       "antennas"]]))
+
+    def testOutside(self):
+        # Extracted members, placeholders and links alike. An absolute name
+        # is not a Measurement Set member, so is extracted in full only.
+        for bad, full in [
+                (fileMember("test.ms/../../evil", "evil"), False),
+                (fileMember(os.path.join(self.dir, "evil"), "evil"), True),
+                (fileMember("test.ms/../../table.f0_TSM1", "x"), False),
+                (linkMember("test.ms/ANTENNA/up", "../../.."), False),
+                (linkMember("test.ms/etc", "/etc"), False),
+                (linkMember("test.ms/hard", "../evil", tarfile.LNKTYPE), True)]:
+            tarObj = self.archive(msMembers() + [bad])
+            self.assertRaises(tarUtils.TarMemberError, tarUtils.extractMeta,
+                              tarObj, self.scratch, full)
+            self.assertEqual(os.listdir(self.scratch), [])
+            self.assertFalse(os.path.exists(os.path.join(self.dir, "evil")))
+
+    def testLinkInside(self):
+        members = msMembers() + [linkMember("test.ms/same", "table.dat")]
+        tarUtils.extractMeta(self.archive(members), self.scratch)
+        self.assertEqual(open(os.path.join(self.scratch, "test.ms",
+                                           "same")).read(), "main table")
+
+    def testMemberPath(self):
+        info = tarfile.TarInfo("test.ms/./ANTENNA//table.dat")
+        self.assertEqual(tarUtils.memberPath(self.scratch, info),
+                         os.path.join(os.path.realpath(self.scratch),
+                                      "test.ms", "ANTENNA", "table.dat"))
+
+
+if __name__ == '__main__':
+    unittest.main()
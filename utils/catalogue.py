@@ -0,0 +1,227 @@
+#!/usr/bin/env python
+#
+#                                                 CyberSKA CASA Metadata Project
+#
+#                                                    metaData.utils.catalogue.py
+#                                                  metaData maintainers, 2026-10
+# ------------------------------------------------------------------------------
+
+"""Consolidated catalogue of extraction results.
+
+In place of one header file per dataset, the meta lists of any number of
+datasets, as built by MSHandlers.buildFlatMeta(), CasaImageHandlers.extract()
+or FitsHandlers.parseFits(), are appended to a single sqlite database, in
+write-ahead log mode, a batch of datasets per transaction.
+
+Each dataset has a row in the table of its MIME type, ms_uvw, ms_image,
+fits_image or fits_uvw, keyed on its absolute path, with its telescope,
+observation date, target and reference frequency (Hz), each indexed, and its
+keys, in header order, in the keywords table,
+
+    keywords (path, seq, key, value, comment)
+
+Values are stored natively, eg. numbers as numbers, with arrays, such as the
+native values of MSHandlers.values, as JSON. A dataset added again replaces
+its previous rows.
+
+eg.,
+
+    catalogue = Catalogue(catalogueFile)
+    catalogue.add(inFileName, mimeType, meta, values)
+    ...
+    catalogue.close()
+
+    SELECT path FROM ms_uvw WHERE telescope='WSRT' AND date_obs>'2010';
+"""
+
+# $Id$
+# ------------------------------------------------------------------------------
+__version__      = '$Revision$'[11:-3]
+__version_date__ = '$Date$'[7:-3]
+__author__       = "metaData maintainers"
+# ------------------------------------------------------------------------------
+
+import json
+import time
+import sqlite3
+
+from os.path import abspath
+
+from metaData.metaDataVersion import version
+from metaData.utils.hdrWriter import nativeValue, finiteValue
+
+mimeTables = { 'image/ms-uvw'   : 'ms_uvw',
+               'image/ms-image' : 'ms_image',
+               'image/fits'     : 'fits_image',
+               'image/fits-uvw' : 'fits_uvw',
+               }
+
+# The meta keys of the telescope, observation date and target columns of
+# each table.
+
+summaryKeys = { 'image/ms-uvw'   : ('TELESCOPE_NAME', 'DATE-OBS', 'FIELD:NAME'),
+                'image/ms-image' : ('TELESCOPE', 'DATE-OBS', 'TARGET'),
+                'image/fits'     : ('TELESCOP', 'DATE-OBS', 'OBJECT'),
+                'image/fits-uvw' : ('TELESCOP', 'DATE-OBS', 'OBJECT'),
+                }
+
+indexedColumns = ['telescope', 'date_obs', 'target', 'frequency']
+
+def schema():
+    """Returns the <list> of SQL statements creating the catalogue tables and
+    indexes, where missing.
+    """
+    statements = []
+    for table in sorted(set(mimeTables.values())):
+        statements.append("CREATE TABLE IF NOT EXISTS %s ("
+                          "path TEXT PRIMARY KEY, telescope TEXT, "
+                          "date_obs TEXT, target TEXT, frequency REAL, "
+                          "version TEXT, added REAL)" % table)
+        for column in indexedColumns:
+            statements.append("CREATE INDEX IF NOT EXISTS %s_%s ON %s (%s)"
+                              % (table, column, table, column))
+    statements.append("CREATE TABLE IF NOT EXISTS keywords ("
+                      "path TEXT, seq INTEGER, key TEXT, value, "
+                      "comment TEXT, PRIMARY KEY (path, seq))")
+    statements.append("CREATE INDEX IF NOT EXISTS keywords_key "
+                      "ON keywords (key)")
+    return statements
+
+
+class Catalogue(object):
+    """Class wraps the sqlite catalogue database of the passed file name,
+    made if need be. Datasets added are held and written batchSize at a
+    time, in one transaction, and on flush() and close().
+    """
+
+    def __init__(self, fileName, batchSize=1000):
+        """Caller passes the catalogue file name <string>, and the number of
+        datasets <int> to write per transaction.
+        """
+        self.name      = fileName
+        self.batchSize = batchSize
+        self.pending   = []
+        self.db = sqlite3.connect(fileName, timeout=60)
+        self.db.text_factory = str
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        for statement in schema():
+            self.db.execute(statement)
+        self.db.commit()
+
+
+    def add(self, path, mimeType, meta, values=None):
+        """Add the passed dataset name <string>, its MIME type <string>, meta
+        <list> and optional native values <dict>, eg. MSHandlers.values, to
+        the catalogue, writing the pending batch if it is full. Raises a
+        KeyError on an unknown MIME type.
+        """
+        if mimeType not in mimeTables:
+            raise KeyError, "Unknown MIME type: "+str(mimeType)
+        self.pending.append((abspath(path), mimeType, meta, values or {}))
+        if len(self.pending) >= self.batchSize: self.flush()
+        return
+
+
+    def flush(self):
+        """Write all pending datasets in one transaction, the last added of
+        any dataset added more than once.
+        """
+        if not self.pending: return
+        latest   = dict([(dataset[0], dataset) for dataset in self.pending])
+        paths    = []
+        rows     = dict([(table, []) for table in mimeTables.values()])
+        keywords = []
+        now      = time.time()
+        for dataset in self.pending:
+            if latest[dataset[0]] is not dataset: continue
+            path, mimeType, meta, values = dataset
+            paths.append((path,))
+            rows[mimeTables[mimeType]].append(
+                (path,) + summary(mimeType, meta, values) + (version, now))
+            for seq, card in enumerate(meta):
+                key   = card[0]
+                value = values.get(key, card[1])
+                if len(card) > 2: comment = card[2]
+                else:             comment = None
+                keywords.append((path, seq, key, sqlValue(value), comment))
+        db = self.db
+        try:
+            for table in sorted(rows):
+                db.executemany("DELETE FROM %s WHERE path=?" % table, paths)
+                db.executemany("INSERT INTO %s VALUES (?,?,?,?,?,?,?)"
+                               % table, rows[table])
+            db.executemany("DELETE FROM keywords WHERE path=?", paths)
+            db.executemany("INSERT INTO keywords VALUES (?,?,?,?,?)",
+                           keywords)
+            db.commit()
+        except:
+            db.rollback()
+            raise
+        self.pending = []
+        return
+
+
+    def close(self):
+        self.flush()
+        self.db.close()
+        return
+
+
+def summary(mimeType, meta, values):
+    """Caller passes a MIME type <string>, meta <list> and native values
+    <dict> of a dataset.
+
+    Returns a <tuple>, (telescope, date-obs, target, frequency), of the
+    dataset's first values of the summaryKeys of its type, and its
+    reference frequency, Hz <float>, or None for those not found.
+    """
+    first = {}
+    for card in meta:
+        if card[0] not in first: first[card[0]] = card[1]
+    telescope, dateObs, target = [first.get(key)
+                                  for key in summaryKeys[mimeType]]
+    return (sqlValue(telescope), sqlValue(dateObs), sqlValue(target),
+            frequency(mimeType, meta, values))
+
+def frequency(mimeType, meta, values):
+    """Returns the reference frequency, Hz <float>, of the passed dataset,
+    i.e. the first REF_FREQUENCY of a Measurement Set, the spectral
+    reference value of a Casa Image and the reference value of the FREQ
+    axis, or else RESTFREQ, of a FITS file; or None if there is none.
+    """
+    hz = None
+    if mimeType == 'image/ms-uvw':
+        hz = values.get('REF_FREQUENCY')
+    elif mimeType == 'image/ms-image':
+        for card in meta:
+            key, value = card[0], card[1]
+            if key.startswith('COORDINATE') and key.endswith('-TYPE') and \
+               value == 'spectral':
+                hz = values.get('REFERENCE%s-VALUE' % key[10:-5])
+                break
+    else:
+        cards = dict([(card[0], card[1]) for card in reversed(meta)])
+        for card in meta:
+            key, value = card[0], card[1]
+            if key.startswith('CTYPE') and str(value).startswith('FREQ'):
+                hz = cards.get('CRVAL' + key[5:])
+                break
+        if hz is None: hz = cards.get('RESTFREQ', cards.get('RESTFRQ'))
+    hz = nativeValue(hz)
+    while isinstance(hz, list):
+        if not hz: return None
+        hz = hz[0]
+    try:    return float(hz)
+    except (TypeError, ValueError): return None
+
+def sqlValue(value):
+    """Returns the passed meta value as stored: numbers, <string>s and None
+    as they are, other values, eg. arrays, as JSON, with any non-finite
+    numbers as null.
+    """
+    value = nativeValue(value)
+    if value is None or isinstance(value, (int, long, float, basestring)):
+        return value
+    return json.dumps(finiteValue(value), separators=(',', ':'),
+                      allow_nan=False)
@@ -0,0 +1,385 @@
+#!/usr/bin/env python
+#
+#                                                 CyberSKA CASA Metadata Project
+#
+#                                                     metaData.utils.fitsScan.py
+#                                                  metaData maintainers, 2026-10
+# ------------------------------------------------------------------------------
+
+"""Header only FITS reader.
+
+pyfits.open() builds an HDU object for every extension of a file, and walking
+the headers of a multi-extension file this way loads each HDU in turn. The
+functions here read the 2880 byte header blocks of each HDU up to its END card,
+compute the size of its data unit from BITPIX, NAXISn, PCOUNT and GCOUNT, and
+seek past it. Data units are never read, so the cost of a scan is proportional
+to the header bytes of a file, not its size.
+
+Headers are returned as lists of (key, value, comment) cards, with values and
+comments as given by pyfits 3.1 Card.value and Card.comment, i.e.
+
+    -- logical values are <bool>, integers <int>, reals <float>, complex
+       values <complex>,
+    -- string values have quotes unescaped and trailing blanks removed, and
+       long strings are joined across their CONTINUE cards,
+    -- COMMENT, HISTORY, blank and other cards without a value indicator have
+       the card text following column 8 as value,
+    -- HIERARCH keywords are given without the HIERARCH prefix.
+
+Undefined values, which pyfits gives as a pyfits.card.Undefined instance, are
+given as an empty string. Unparsable values, on which pyfits raises, are given
+as the stripped value field.
+
+Files compressed with gzip, bzip2 or compress(1), i.e. .fits.gz, .fits.bz2
+and .fits.Z, are recognised by their magic bytes and decompressed as a stream,
+only as far as the last header needed. For compressed files the scan stops
+after the primary header if it has no EXTEND = T, and after NEXTEND extensions
+if NEXTEND is given, so that the data units of a compressed single HDU file
+are never decompressed.
+
+eg.,
+
+    headers = readHeaders(fitsFileName)
+    for cards in headers:
+        for key, value, comment in cards:
+            ...
+"""
+
+# $Id$
+# ------------------------------------------------------------------------------
+__version__      = '$Revision$'[11:-3]
+__version_date__ = '$Date$'[7:-3]
+__author__       = "metaData maintainers"
+# ------------------------------------------------------------------------------
+
+import re
+import bz2
+import gzip
+import subprocess
+
+from sys import maxint
+
+from metaData.utils import stageTimer
+
+blockSize = 2880
+cardSize  = 80
+
+commentaryKeys = ['COMMENT', 'HISTORY', '']
+
+gzipMagic     = '\x1f\x8b'
+bzip2Magic    = 'BZh'
+compressMagic = '\x1f\x9d'
+
+stringValue  = re.compile(r"^\s*'((?:[^']|'')*)'\s*(?:/(.*))?$")
+intValue     = re.compile(r"^[+-]?\d+$")
+floatValue   = re.compile(r"^[+-]?(?:\d+\.?\d*|\.\d+)(?:[EeDd][+-]?\d+)?$")
+complexValue = re.compile(r"^\(\s*([^,\s]+)\s*,\s*([^)\s]+)\s*\)$")
+
+
+class FitsScanError(IOError):
+    """Raise this if a file is not FITS, or its primary header is truncated."""
+    pass
+
+
+def readHeaders(fileName, maxHdus=None):
+    """Caller passes a FITS file name <string>, and optionally the maximum
+    number of HDUs <int> to be read, eg. 1 for the primary header only.
+
+    Return: <list> of HDU headers, each a <list> of (key, value, comment)
+    <tuple>s.
+    """
+    method = compression(fileName)
+    fob    = openStream(fileName, method)
+    try:
+        headers = scanHeaders(fob, maxHdus, stream=method is not None)
+    finally:
+        fob.close()
+    return headers
+
+
+def compression(fileName):
+    """Return the compression method <string> of the named file, 'gzip',
+    'bzip2' or 'compress', as given by its magic bytes, or None.
+    """
+    fob   = open(fileName, 'rb')
+    magic = fob.read(3)
+    fob.close()
+    if magic[:2] == gzipMagic:     return 'gzip'
+    if magic[:3] == bzip2Magic:    return 'bzip2'
+    if magic[:2] == compressMagic: return 'compress'
+    return None
+
+
+def openStream(fileName, method=None):
+    """Return a file object reading the decompressed content of the named
+    file, as compressed by the passed method <string> (see compression()).
+    Python has no LZW decoder; compress(1) files are read from a gzip -dc
+    pipe.
+    """
+    if method == 'gzip':     return gzip.GzipFile(fileName, 'rb')
+    if method == 'bzip2':    return bz2.BZ2File(fileName, 'rb')
+    if method == 'compress': return PipeStream(['gzip', '-dc', fileName])
+    return open(fileName, 'rb')
+
+
+class PipeStream(object):
+    """Class wraps the stdout of a decompressing child process as a read
+    only file object. Closing the stream before the end of output stops
+    the child.
+    """
+
+    def __init__(self, command):
+        self.proc = subprocess.Popen(command, stdout=subprocess.PIPE,
+                                     stderr=open('/dev/null', 'w'))
+
+    def read(self, size=-1):
+        return self.proc.stdout.read(size)
+
+    def close(self):
+        self.proc.stdout.close()
+        if self.proc.poll() is None:
+            self.proc.terminate()
+        self.proc.wait()
+        return
+
+
+def scanHeaders(fob, maxHdus=None, stream=False):
+    """Caller passes an open file object and optionally the maximum number of
+    HDUs <int> to be read. The file object need only support read(); data
+    units are skipped with seek() where possible, by reading otherwise.
+    For a stream, i.e. decompressed input, the scan also stops where
+    EXTEND and NEXTEND say no further extensions follow.
+
+    A truncated or non-FITS primary header raises FitsScanError. As pyfits
+    does, anything following the last complete extension is ignored.
+
+    Return: <list> of HDU headers, as readHeaders().
+    """
+    headers = []
+    nhdus   = maxHdus
+    while nhdus is None or len(headers) < nhdus:
+        try:
+            images = readHeaderCards(fob)
+        except FitsScanError:
+            if not headers: raise
+            break
+        if images is None: break
+        if not headers and images[0][:8] != 'SIMPLE  ':
+            raise FitsScanError, "Not a FITS file, no SIMPLE card."
+        if headers and images[0][:8] != 'XTENSION': break
+        cards = parseCards(images)
+        headers.append(cards)
+        if stream and len(headers) == 1:
+            nhdus = min(nhdus or maxint, lastHdu(cards))
+        if nhdus is not None and len(headers) >= nhdus: break
+        skipBytes(fob, paddedSize(dataSize(cards)), stream)
+    if not headers:
+        raise FitsScanError, "Empty FITS file."
+    return headers
+
+
+def findImage(fileName):
+    """Return the header cards <list> and data offset in bytes <int> of the
+    first image HDU of the named uncompressed FITS file, i.e. a primary HDU,
+    other than random groups, or an IMAGE extension, with NAXIS > 0. Return
+    None if there is none, or the file is compressed.
+    """
+    if compression(fileName): return None
+    fob = open(fileName, 'rb')
+    try:
+        while True:
+            try:
+                images = readHeaderCards(fob)
+            except FitsScanError:
+                return None
+            if images is None: return None
+            cards = parseCards(images)
+            if cards[0][0] == 'SIMPLE':
+                isImage = not cardValue(cards, 'GROUPS', False)
+            else: isImage = cardValue(cards, 'XTENSION') == 'IMAGE'
+            if isImage and cardValue(cards, 'NAXIS', 0):
+                return cards, fob.tell()
+            skipBytes(fob, paddedSize(dataSize(cards)))
+    finally:
+        fob.close()
+
+
+def lastHdu(cards):
+    """Return the number of HDUs <int> a file holds by its primary header
+    cards <list>: 1 without EXTEND = T, 1 + NEXTEND where NEXTEND is given,
+    otherwise an open count.
+    """
+    if cardValue(cards, 'EXTEND') is not True: return 1
+    nextend = cardValue(cards, 'NEXTEND')
+    if isinstance(nextend, int) and nextend >= 0: return 1 + nextend
+    return maxint
+
+
+def readHeaderCards(fob):
+    """Read one header from the current position of the passed file object.
+    A header whose first block, whole or not, starts with neither a SIMPLE
+    nor an XTENSION card raises FitsScanError, without reading further.
+
+    Return: <list> of 80 character card image <string>s, up to but excluding
+    the END card, or None at end of file.
+    """
+    images = []
+    while True:
+        block = fob.read(blockSize)
+        stageTimer.countBytes(block)
+        if not block and not images: return None
+        if not images and block[:8] not in ('SIMPLE  ', 'XTENSION'):
+            raise FitsScanError, "Not a FITS file, no SIMPLE card."
+        if len(block) < blockSize:
+            raise FitsScanError, "Header truncated, END card not found."
+        for i in range(0, blockSize, cardSize):
+            image = block[i:i+cardSize]
+            if image[:8] == 'END     ': return images
+            images.append(image)
+
+
+def skipBytes(fob, nbytes, stream=False):
+    """Move the passed file object forward nbytes <int>. A stream is read
+    through in large chunks, as GzipFile.seek() reads 1024 bytes at a time.
+    """
+    if not nbytes: return
+    try:
+        if stream: raise IOError
+        fob.seek(nbytes, 1)
+    except (AttributeError, IOError, ValueError):
+        while nbytes > 0:
+            chunk = fob.read(min(nbytes, 1024*1024))
+            stageTimer.countBytes(chunk)
+            if not chunk: break
+            nbytes -= len(chunk)
+    return
+
+
+def paddedSize(nbytes):
+    """Return the passed size <int> rounded up to a whole number of blocks."""
+    return ((nbytes + blockSize - 1) // blockSize) * blockSize
+
+
+def dataSize(cards):
+    """Caller passes the cards <list> of one HDU header.
+
+    Return: <int>, the size in bytes of its data unit, before padding.
+    Random groups, i.e. a primary header with GROUPS = T and NAXIS1 = 0, do
+    not count the NAXIS1 axis.
+    """
+    naxis = cardValue(cards, 'NAXIS', 0)
+    if not naxis: return 0
+    axes = [cardValue(cards, 'NAXIS%d' % i, 0) for i in range(1, naxis+1)]
+    if cards[0][0] == 'SIMPLE':
+        if cardValue(cards, 'GROUPS', False) and axes[0] == 0: axes = axes[1:]
+        else: return abs(cardValue(cards, 'BITPIX', 8)) // 8 * product(axes)
+    bitpix = abs(cardValue(cards, 'BITPIX', 8))
+    pcount = cardValue(cards, 'PCOUNT', 0)
+    gcount = cardValue(cards, 'GCOUNT', 1)
+    return bitpix // 8 * gcount * (pcount + product(axes))
+
+
+def product(axes):
+    size = 1
+    for axis in axes: size *= axis
+    return size
+
+
+def cardValue(cards, key, default=None):
+    """Return the value of the first card of the passed key <string>, or the
+    passed default if there is no such card.
+    """
+    for cardKey, value, comment in cards:
+        if cardKey == key: return value
+    return default
+
+
+def isVisibility(cards):
+    """Return True if the passed primary header cards <list> are those of
+    UVFITS visibilities, i.e. the first three random parameters are
+    UU, VV and WW.
+    """
+    ptypes = [cardValue(cards, key) for key in ['PTYPE1','PTYPE2','PTYPE3']]
+    for ptype in ptypes:
+        if not isinstance(ptype, str): return False
+    return 'UU' in ptypes[0] and 'VV' in ptypes[1] and 'WW' in ptypes[2]
+
+
+def parseCards(images):
+    """Caller passes a <list> of card image <string>s.
+
+    Return: <list> of (key, value, comment) <tuple>s, with CONTINUE cards
+    merged into the long string they continue.
+    """
+    cards     = []
+    continued = None
+    for image in images:
+        key = image[:8].strip().upper()
+        if continued is not None and key == 'CONTINUE':
+            match = stringValue.match(image[8:])
+            if match:
+                continued = mergeContinue(cards, continued, match)
+                continue
+        continued = None
+        if key == 'HIERARCH' and '=' in image:
+            eq    = image.index('=')
+            key   = image[8:eq].strip()
+            field = image[eq+1:]
+        elif image[8:10] == '= ' and key not in commentaryKeys:
+            field = image[10:]
+        else:
+            cards.append((key, image[8:].rstrip(), ''))
+            continue
+        match = stringValue.match(field)
+        if match:
+            value   = match.group(1).replace("''", "'")
+            comment = (match.group(2) or '').strip()
+            if value.endswith('&'): continued = (value[:-1], [comment])
+            cards.append((key, value.rstrip(), comment))
+            continue
+        if '/' in field:
+            field, comment = field.split('/', 1)
+        else: comment = ''
+        cards.append((key, parseValue(field.strip()), comment.strip()))
+    return cards
+
+
+def mergeContinue(cards, continued, match):
+    """Append the string of a CONTINUE card match to the last card, and
+    return the continuation state, or None if the long string ends here.
+    """
+    value, comments = continued
+    piece   = match.group(1).replace("''", "'")
+    comment = (match.group(2) or '').strip()
+    if comment: comments.append(comment)
+    key = cards[-1][0]
+    if piece.endswith('&'):
+        value += piece[:-1]
+        cards[-1] = (key, value.rstrip(), ' '.join([c for c in comments if c]))
+        return (value, comments)
+    value += piece
+    cards[-1] = (key, value.rstrip(), ' '.join([c for c in comments if c]))
+    return None
+
+
+def parseValue(field):
+    """Return the value of the passed non string value field <string>."""
+    if not field: return ''
+    if field == 'T': return True
+    if field == 'F': return False
+    number = parseNumber(field)
+    if number is not None: return number
+    match = complexValue.match(field)
+    if match:
+        real = parseNumber(match.group(1))
+        imag = parseNumber(match.group(2))
+        if real is not None and imag is not None: return complex(real, imag)
+    return field
+
+
+def parseNumber(field):
+    """Return the <int> or <float> of a numeric field, or None."""
+    if intValue.match(field): return int(field)
+    if floatValue.match(field):
+        return float(field.replace('D','E').replace('d','e'))
+    return None
@@ -15,6 +15,7 @@ __author__       = "K.R. Anderson, <k.r.anderson@ubc.ca>"
 # ------------------------------------------------------------------------------
 
 import math
+import numpy
 
 """General utility functions for Measurement Set and Casa Image metadata
 scraping.
@@ -65,4 +66,122 @@ def convertHz(hz, kBase=1000):
             strn = ensign+"%3.4f" % hz
         else: strn = ensign+"%d" % round(hz)
     return strn, suffix
-    
+
+
+def hzFormatTable(hrUnits=['Hz','kHz','MHz','GHz']):
+    """Returns the <list> of hzStrings() formats, indexed by
+
+    (unit index*3 + kind)*2 + negative
+
+    where kind is 0 for a frequency below 999.9 Hz, which convertHz()
+    returns unsigned and unformatted, 1 for a scaled fraction, '%3.4f', and
+    2 for a scaled, rounded whole number, '%d'.
+    """
+    table = []
+    for unit in hrUnits:
+        for fmt in ['%s', '%3.4f', '%d']:
+            for ensign in ['', '-']:
+                if unit == 'Hz': fmt, ensign = '%s', ''
+                table.append(ensign+fmt+" "+unit)
+    return table
+
+hzFormats = hzFormatTable()
+
+def hzStrings(hz, kBase=1000):
+    """Caller passes a frequency, or an iterable of frequencies, eg. an
+    <ndarray> of a SPECTRAL_WINDOW column, of type <float>.
+
+    Returns a <list> of the "%s %s" % convertHz() <string> of each
+    frequency, eg. '8.4351 GHz', with the same units, rounding and
+    formatting. Frequencies are scaled by kBase for the whole array at
+    once, up to three times, and each then formatted by a look up of its
+    format, so that there is one Python level operation per frequency.
+    Frequencies convertHz() cannot convert are passed to it, to fail as
+    before.
+
+    Parameters: <float> or <ndarray> -- frequencies, Hz
+    Return:     <list>  of <string>
+    """
+    hz    = numpy.asarray(hz, dtype=numpy.float64).ravel()
+    # NaN compares False throughout, as in convertHz().
+    with numpy.errstate(invalid='ignore'):
+        mag   = abs(hz)
+        index = numpy.zeros(hz.shape, dtype=int)
+        for i in range(3):
+            big = mag >= 999.9
+            if not big.any(): break
+            mag    = numpy.where(big, mag / kBase, mag)
+            index += big
+        if (mag >= 999.9).any():
+            return ["%s %s" % convertHz(freq, kBase) for freq in hz.tolist()]
+        whole = numpy.floor(mag)
+        frac  = (mag < 9.95) & (mag != whole)
+        kind  = numpy.where(index == 0, 0, numpy.where(frac, 1, 2))
+        value = numpy.where(mag - whole < 0.5, whole, whole + 1)
+        value = numpy.where(kind == 2, value, mag)
+        code  = (index*3 + kind)*2 + (hz < 0)
+    return [hzFormats[c] % v for c, v in zip(code.tolist(), value.tolist())]
+
+
+def channelRanges(first, last, nchan):
+    """Caller passes the first and last channel frequencies, Hz, and the
+    channel counts of a number of spectral windows, each an iterable with
+    one value per window, as MSHandlers reads the SPECTRAL_WINDOW channel
+    columns.
+
+    Returns the <string> of the windows' channel ranges, 'first [..] last
+    (N chan), ' for a window of many channels, 'first, ' for a window of
+    one and 'Undefined (0 chan), ' for a window of none.
+
+    i.e.
+
+    >>> channelRanges([1.4e9, 1.6e9], [1.5e9, 1.6e9], [64, 1])
+    '1.4000 GHz [..] 1.5000 GHz (64 chan), 1.6000 GHz, '
+    """
+    nchan  = numpy.asarray(nchan)
+    begins = hzStrings(first)
+    ends   = hzStrings(numpy.where(nchan > 1, last, first))
+    ranges = ''
+    for i in range(len(nchan)):
+        lenf = int(nchan[i])
+        fend = ', '
+        if lenf > 1:
+            fend = " [..] " + ends[i]
+            fend += " ("+str(lenf)+" chan), "
+        elif lenf < 1:
+            ranges += "Undefined (0 chan), "
+            continue
+        ranges += begins[i] + fend
+    return ranges
+
+
+def channelRuns(freqs, rtol=1e-6):
+    """Caller passes the channel frequencies of one spectral window, an
+    <ndarray> or <list>, and a relative tolerance <float> on equal steps.
+
+    Returns a <list> of (start, step, count) runs of uniformly spaced
+    channels, found from the channel steps with numpy, rather than channel
+    by channel. A run whose step differs from its neighbours' starts a new
+    run at the channel after the change; a lone channel has step 0.0.
+
+    i.e.
+
+    >>> channelRuns([1.0, 2.0, 3.0, 5.0, 7.0])
+    [(1.0, 1.0, 3), (5.0, 2.0, 2)]
+    """
+    freqs = numpy.asarray(freqs, dtype=numpy.float64).ravel()
+    if not freqs.size: return []
+    steps  = numpy.diff(freqs)
+    scale  = numpy.maximum(abs(steps[1:]), abs(steps[:-1]))
+    breaks = numpy.flatnonzero(abs(numpy.diff(steps)) > rtol*scale) + 2
+    starts = [0]
+    for b in breaks:
+        if b > starts[-1] + 1: starts.append(int(b))
+    ends = starts[1:] + [freqs.size]
+    runs = []
+    for start, end in zip(starts, ends):
+        count = end - start
+        if count > 1: step = (freqs[end-1] - freqs[start]) / (count - 1)
+        else:         step = 0.0
+        runs.append((float(freqs[start]), float(step), count))
+    return runs
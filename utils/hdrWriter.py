@@ -0,0 +1,341 @@
+#!/usr/bin/env python
+#
+#                                                 CyberSKA CASA Metadata Project
+#
+#                                                    metaData.utils.hdrWriter.py
+#                                                  metaData maintainers, 2026-10
+# ------------------------------------------------------------------------------
+
+"""Header file serialisation for all handlers.
+
+A handler 'meta' list, as built by MSHandlers.buildFlatMeta(),
+CasaImageHandlers.extract() or FitsHandlers.parseFits(), is formatted whole
+into an in-memory buffer by formatMSHdr(), formatImageHdr() or
+formatFitsHdr(), with the tab and column layout of each header type, and
+returned as a <string>.
+
+writeHdr() writes such a <string> to any file-like object, or, given a file
+name, to a temporary file in the same directory, with a single write, which
+is then renamed over the named file. Readers of a header file therefore see
+either the previous header or the whole new one, and the header costs one
+write rather than one flush per keyword.
+
+formatOutput() formats a dataset either as a header, or as a structured
+record, see buildRecord(), in JSON, JSON Lines or, where the msgpack package
+is installed, msgpack.
+"""
+
+# $Id$
+# ------------------------------------------------------------------------------
+__version__      = '$Revision$'[11:-3]
+__version_date__ = '$Date$'[7:-3]
+__author__       = "metaData maintainers"
+# ------------------------------------------------------------------------------
+
+import os
+import sys
+import json
+import math
+import tempfile
+
+from cStringIO   import StringIO
+from collections import OrderedDict
+from os.path     import abspath, basename, dirname
+from types       import BooleanType as boolean
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+########################### Measurement Sets ############################
+
+def formatMSHdr(meta):
+    """Caller passes a meta <list> of (key, value) tuples, as built by
+    MSHandlers.buildFlatMeta().
+
+    Returns the pretty printed header, <string>.
+    """
+    frequency_truncs = ['CHAN_FREQ','CHAN_WIDTH','EFFECTIVE_BW','RESOLUTION']
+    fob = StringIO()
+
+    for key,val in meta:
+        sval = str(val)
+        if "_DIR" in key:
+            writeSetValues(key,sval,fob)
+            continue
+        elif ":POSITION" in key:
+            writeSetValues(key,sval,fob)
+            continue
+        elif key == "WINDOW_NAME":
+            writeWinNames(key,sval,fob)
+            continue
+        # elif key in frequency_truncs and len(sval) > 55:
+        #     writeTruncValues(key,sval,fob)
+        #     continue
+        elif len(sval) > 55:
+            writeLongValue(key,sval,fob)
+            continue
+        writeNominalValue(key,sval,fob)
+    fob.write("\n")
+    return fob.getvalue()
+
+
+def writeWinNames(key,val,fob):
+    """Write the channel names for SPECTRAL_WINDOW:NAME key. These will
+    very often be null strings, which should then not be written as blank lines.
+    """
+    vals = val.split(',')
+    if not vals[0].strip():
+        if   len(key) >= 16: fob.write("\n"+key+"\tNone")
+        elif len(key) <= 7:  fob.write("\n"+key+"\t\t\tNone")
+        else: fob.write("\n"+key+"\t\tNone")
+    else: writeNominalValue(key,vals[0],fob)
+    if len(vals) > 1:
+        for nextval in vals[1:]:
+            if not nextval.strip(): continue
+            else: fob.write("\n\t\t"+nextval)
+    return
+
+def writeSetValues(key,val,fob):
+    """Write a set of direction values, one pair per line."""
+    vals = val.split(',')
+    writeNominalValue(key,vals[0],fob)
+    if len(vals) > 1:
+        fob.write("\n\t\t\t")
+        fob.write("\n\t\t\t".join([val for val in vals[1:]]))
+    return
+
+def writeTruncValues(key,val,fob):
+    """Write the first value of a long string set of channel frequency
+    information for those values in the frequency_truncs list.
+    Key length checks are not needed, as the lengths of these keys
+    are known to be > 7 & < 16.
+    """
+    fvals = val.split(',')
+    fob.write("\n"+key+"\t\t"+fvals[0]+" ... "+fvals[-1])
+    return
+
+def writeLongValue(key,val,fob):
+    """Write lines for a val considered to be 'long.'
+    Method splits the val string, write the pieces
+    properly to the passed file object.
+    """
+    line    = ''
+    values  = val.split(',')
+    lineset = []
+
+    for item in values:
+        if not item.strip(): continue
+        if len(line) <= 55:
+            line += item+", "
+            continue
+        else:
+            lineset.append(line)
+            line = item+", "
+    lineset.append(line)
+
+    # lineset list will have a set of lines.
+    # First one gets the key.
+
+    writeNominalValue(key,lineset[0],fob)
+
+    if len(lineset) > 1:
+        fob.write("\n\t\t\t")
+        fob.write("\n\t\t\t".join([line for line in lineset[1:]]))
+    return
+
+def writeNominalValue(key,val,fob):
+    """Write a header line where the passed val is
+    written to one line. The passed value, 'val' must
+    be of type <string>.
+    """
+    if len(key) >= 16:
+        fob.write("\n"+key+"\t"+val)
+    elif len(key) <= 7:
+        fob.write("\n"+key+"\t\t\t"+val)
+    else:
+        fob.write("\n"+key+"\t\t"+val)
+    return
+
+############################## Casa Images ##############################
+
+def formatImageHdr(meta):
+    """Caller passes a meta <list> of (key, value) tuples, as built by
+    CasaImageHandlers.extract().
+
+    Returns the header, <string>.
+    """
+    fob = StringIO()
+    for key,val in meta:
+        if len(key) >= 16:
+            fob.write(key+"\t"+str(val)+"\n")
+        elif len(key) < 8:
+            fob.write(key+"  \t\t"+str(val)+"\n")
+        else: fob.write(key+"\t\t"+str(val)+"\n")
+    return fob.getvalue()
+
+################################# FITS ##################################
+
+def formatFitsHdr(meta):
+    """Caller passes a meta <list> of FITS header cards, (key, value,
+    comment) tuples, as built by FitsHandlers.buildMeta().
+
+    Returns the header, <string>.
+    """
+    format1  = "%-8s= %21s\n"
+    format2  = "%-8s= %21s /%s\n"
+    formatc  = "%-8s %21s\n"
+    fob = StringIO()
+    for key, value, comment in meta:
+        if key == 'COMMENT':
+            fob.write(formatc %(key,str(value)))
+            continue
+        if value and type(value) == boolean:
+            value = "T"
+        if not comment.strip():
+            hline   = format1 %(key,str(value))
+        else: hline = format2 %(key,str(value),comment)
+        fob.write(hline)
+    return fob.getvalue()
+
+############################### dispatch ################################
+
+formatters = { 'image/ms-uvw'   : formatMSHdr,
+               'image/ms-image' : formatImageHdr,
+               'image/fits'     : formatFitsHdr,
+               'image/fits-uvw' : formatFitsHdr,
+               }
+
+def formatHdr(mimeType, meta):
+    """Caller passes a MIME type <string> and the handler meta <list> of a
+    dataset of that type.
+
+    Returns the header, <string>. Raises a KeyError on an unknown type.
+    """
+    return formatters[mimeType](meta)
+
+########################## structured records ###########################
+
+outputFormats = ['hdr', 'json', 'jsonl', 'msgpack']
+extensions    = { 'hdr'     : '.hdr',
+                  'json'    : '.json',
+                  'jsonl'   : '.jsonl',
+                  'msgpack' : '.msgpack',
+                  }
+
+def nativeValue(value):
+    """Caller passes a meta value of any type.
+
+    Returns the value with <ndarray>s as (nested) <list>s, numpy scalars as
+    Python scalars, <tuple>s as <list>s and <complex> as [real, imag], which
+    JSON and msgpack can encode. numpy values can only be passed once numpy
+    has been imported, by whatever made them, so it is not imported here.
+    """
+    numpy = sys.modules.get('numpy')
+    if numpy and isinstance(value, numpy.ndarray): value = value.tolist()
+    elif numpy and isinstance(value, numpy.generic): value = value.item()
+    if isinstance(value, complex):
+        return [value.real, value.imag]
+    if isinstance(value, (list, tuple)):
+        return [nativeValue(v) for v in value]
+    if isinstance(value, dict):
+        return OrderedDict([(k, nativeValue(v)) for k, v in value.items()])
+    return value
+
+def finiteValue(value):
+    """Caller passes a value as returned by nativeValue().
+
+    Returns the value with non-finite <float>s, NaN and +/-Infinity, as
+    None, eg. the NaN channel ends of a spectral window of no channels.
+    Strict JSON has no NaN or Infinity, which json.dumps() would otherwise
+    write bare, and most JSON readers reject; None is written as null.
+    """
+    if isinstance(value, float):
+        if math.isnan(value) or math.isinf(value): return None
+        return value
+    if isinstance(value, list):
+        return [finiteValue(v) for v in value]
+    if isinstance(value, dict):
+        return OrderedDict([(k, finiteValue(v)) for k, v in value.items()])
+    return value
+
+def buildRecord(fileName, mimeType, meta, values=None):
+    """Caller passes a dataset name <string>, its MIME type <string>, its
+    handler meta <list> and, optionally, a <dict> of native values by key,
+    eg. MSHandlers.values.
+
+    Returns an <OrderedDict>,
+
+    {'file': fileName, 'mimeType': mimeType, 'keys': [[key, value], ...]}
+
+    with the meta keys in order, and FITS cards as [key, value, comment].
+    A key's value is its native value where one is passed, eg. the numbers
+    of a CHAN_FREQ column rather than the formatted <string>, and otherwise
+    its meta value, in which numbers are kept as numbers.
+    """
+    values = values or {}
+    keys   = []
+    for card in meta:
+        key = card[0]
+        if key in values: value = values[key]
+        else:             value = card[1]
+        keys.append([key, nativeValue(value)] + list(card[2:]))
+    return OrderedDict([('file', fileName), ('mimeType', mimeType),
+                        ('keys', keys)])
+
+def formatOutput(outputFormat, fileName, mimeType, meta, values=None):
+    """Caller passes an output format <string>, one of outputFormats, and as
+    buildRecord(), a dataset name, MIME type, meta <list> and native values.
+
+    Returns the dataset's header, <string>, for 'hdr', and otherwise its
+    record as indented JSON, as a single line of JSON ('jsonl'), or as
+    msgpack bytes. Raises an ImportError for msgpack if it is not installed.
+    Non-finite numbers are written to JSON as null, see finiteValue().
+    """
+    if outputFormat == 'hdr':
+        return formatHdr(mimeType, meta)
+    record = buildRecord(fileName, mimeType, meta, values)
+    if outputFormat == 'json':
+        return json.dumps(finiteValue(record), indent=1,
+                          separators=(',', ': '), allow_nan=False) + "\n"
+    elif outputFormat == 'jsonl':
+        return json.dumps(finiteValue(record), separators=(',', ':'),
+                          allow_nan=False) + "\n"
+    elif outputFormat == 'msgpack':
+        if msgpack is None:
+            raise ImportError, "msgpack output requires the msgpack package"
+        return msgpack.packb(record)
+    raise ValueError, "Unknown output format: "+str(outputFormat)
+
+
+def writeHdr(header, target):
+    """Caller passes a header <string>, as returned by formatHdr(), and a
+    target, either a file name <string> or a file-like object.
+
+    A file-like object is written to as is. A named file is written by a
+    single write to a temporary file in the same directory, renamed over
+    the named file on success, and removed on failure. The written file
+    has the permissions open() would give it.
+
+    Returns the target, i.e. the file name written.
+    """
+    if hasattr(target, 'write'):
+        target.write(header)
+        return target
+
+    fd, tmpName = tempfile.mkstemp(prefix="."+basename(target)+".",
+                                   dir=dirname(abspath(target)))
+    try:
+        fob = os.fdopen(fd, 'wb')
+        try:     fob.write(header)
+        finally: fob.close()
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(tmpName, 0666 & ~umask)
+        os.rename(tmpName, target)
+    except:
+        try: os.remove(tmpName)
+        except OSError: pass
+        raise
+    return target
@@ -0,0 +1,632 @@
+#!/usr/bin/env python
+#
+#                                                 CyberSKA CASA Metadata Project
+#
+#                                                   metaData.utils.imageStats.py
+#                                                  metaData maintainers, 2026-10
+# ------------------------------------------------------------------------------
+
+"""Bounded memory image statistics.
+
+pyrap's image.statistics() reads the whole image to compute the statistics
+written as the IMAGE-* keys of a Casa Image header. On large cubes that is the
+slowest step of an extraction, and can exhaust memory. Here, the image is read
+in chunks of whole casacore tiles, as large as a memory budget allows, and
+
+    -- sum, sum of squares, count, min, max and their positions are
+       accumulated in a single pass,
+    -- the median is found by histogram refinement: each further pass counts
+       the pixels falling in finer bins of the range known to hold the median,
+       until that range holds few enough pixels to be collected and selected
+       from in memory. Typically two or three passes in all.
+
+In the approximate mode, for quick look ingest, the moments and extrema are
+still exact, from a single pass, but the median and quartiles are estimated
+from a random sample of the pixels drawn in the same pass. The sample size
+is set by a rank error bound eps: by the Dvoretzky-Kiefer-Wolfowitz
+inequality, n = ln(2/alpha)/(2 eps^2) independent samples bound the error in
+the rank of any estimated quantile by eps, i.e. a fraction of the pixel
+count, with confidence 1 - alpha (95%). The cost of the pass is that of
+reading the image once, whatever its size.
+
+The samples must be independent for the bound to hold; every k-th pixel
+would not do, as a fixed stride beats against the row and plane strides of
+the image. Each chunk of c pixels is instead sampled c*n/N times, a Poisson
+count, at uniformly random offsets, with replacement, by a generator seeded
+from the chunk's position. Poisson counts per chunk make the whole sample
+one of independent, uniformly drawn pixels, and the same sample is drawn
+whether the chunks are read in one process or many.
+
+Results are as image.statistics(), a <dict> of numpy arrays, keyed
+
+    'npts', 'sum', 'sumsq', 'mean', 'sigma', 'rms', 'min', 'max',
+    'minpos', 'maxpos', 'median'
+
+with positions in casacore axis order, sigma with the n-1 denominator, and
+the median the pixel value of rank (n-1)/2, i.e. the lower of the middle two
+for an even count. Masked pixels are excluded.
+
+Pixel sources need provide a 'shape' <tuple>, in numpy axis order, a 'tile'
+<tuple> and a read(blc, trc) method returning the float64 data of a box,
+trc inclusive, and a boolean array of valid pixels, or None if all are valid.
+See ImageSource, and FitsImageSource for FITS images.
+
+Each pass may be spread over a pool of worker processes (see PassRunner),
+the image partitioned by plane, i.e. along the spectral and Stokes axes of a
+cube. Every worker opens the image itself, from the spec() of the source, and
+returns partial results that merge exactly: accumulators, histogram counts,
+samples and collected pixels.
+
+eg.,
+
+    stats = imageStatistics(ImageSource(casaImage), budget)
+    stats = imageStatistics(ImageSource(casaImage), budget, 'approx', 0.001)
+
+The approximate mode adds 'q1' and 'q3', the quartiles, 'rankError', the
+bound given by the size of the sample drawn, which is about the configured
+bound, or 0.0 where the image is small enough for every pixel to be taken,
+and 'sampleFraction', the number of pixels sampled over the pixel count.
+"""
+
+# $Id$
+# ------------------------------------------------------------------------------
+__version__      = '$Revision$'[11:-3]
+__version_date__ = '$Date$'[7:-3]
+__author__       = "metaData maintainers"
+# ------------------------------------------------------------------------------
+
+import itertools
+import multiprocessing
+
+import numpy
+
+from metaData.utils.fitsScan import cardValue
+from metaData.utils.runUtils import stringify
+from metaData.utils          import stageTimer
+from metaData.incl.imageInclusion import statInclusions
+
+# Bytes held per pixel while a chunk is processed: the data as read, its
+# float64 copy, the mask and the comparison temporaries.
+bytesPerPixel = 32
+
+# Bins per median refinement pass.
+medianBins = 65536
+
+# Confidence of the approximate mode rank error bound is 1 - alpha.
+alpha = 0.05
+
+# Seed of the approximate mode sample generators, with the chunk position.
+sampleSeed = 2011
+
+
+class StatsAccumulator(object):
+    """Class accumulates moments and extrema over chunks of an image.
+    Accumulators of disjoint parts of an image merge exactly.
+    """
+
+    def __init__(self):
+        self.npts   = 0
+        self.sum    = 0.0
+        self.sumsq  = 0.0
+        self.min    = None
+        self.max    = None
+        self.minpos = None
+        self.maxpos = None
+
+
+    def add(self, data, valid, blc):
+        """Accumulate the passed float64 data <ndarray> of a box whose bottom
+        left corner is blc <tuple>. valid <ndarray> is a boolean array of the
+        pixels to be included, or None for all.
+        """
+        if valid is None:
+            values = data.ravel()
+            index  = numpy.arange(0)
+        else:
+            index  = numpy.flatnonzero(valid)
+            values = data.ravel()[index]
+        if not values.size: return
+        self.npts  += values.size
+        self.sum   += values.sum()
+        self.sumsq += numpy.dot(values, values)
+        imin = values.argmin()
+        imax = values.argmax()
+        if index.size:
+            imin = index[imin]
+            imax = index[imax]
+        vmin = data.flat[imin]
+        vmax = data.flat[imax]
+        if self.min is None or vmin < self.min:
+            self.min    = vmin
+            self.minpos = position(imin, data.shape, blc)
+        if self.max is None or vmax > self.max:
+            self.max    = vmax
+            self.maxpos = position(imax, data.shape, blc)
+        return
+
+
+    def merge(self, other):
+        """Merge the passed accumulator, of a disjoint part of the image, into
+        this one.
+        """
+        if not other.npts: return
+        self.npts  += other.npts
+        self.sum   += other.sum
+        self.sumsq += other.sumsq
+        if self.min is None or other.min < self.min:
+            self.min, self.minpos = other.min, other.minpos
+        if self.max is None or other.max > self.max:
+            self.max, self.maxpos = other.max, other.maxpos
+        return
+
+
+    def results(self):
+        """Return the statistics <dict> of the accumulated pixels, as
+        image.statistics(), less the median.
+        """
+        n = self.npts
+        if not n:
+            empty = numpy.array([], dtype=numpy.float64)
+            stats = dict([(key, empty) for key in
+                          ['npts','sum','sumsq','mean','sigma','rms','min','max']])
+            stats['minpos'] = numpy.array([], dtype=numpy.int32)
+            stats['maxpos'] = numpy.array([], dtype=numpy.int32)
+            return stats
+        mean = self.sum / n
+        if n > 1: variance = max(0.0, (self.sumsq - self.sum*mean) / (n - 1))
+        else:     variance = 0.0
+        stats = {'npts'  : array(n),
+                 'sum'   : array(self.sum),
+                 'sumsq' : array(self.sumsq),
+                 'mean'  : array(mean),
+                 'sigma' : array(numpy.sqrt(variance)),
+                 'rms'   : array(numpy.sqrt(self.sumsq / n)),
+                 'min'   : array(self.min),
+                 'max'   : array(self.max),
+                 # casacore axis order is the reverse of numpy's.
+                 'minpos': numpy.array(self.minpos[::-1], dtype=numpy.int32),
+                 'maxpos': numpy.array(self.maxpos[::-1], dtype=numpy.int32),
+                 }
+        return stats
+
+
+class ImageSource(object):
+    """Class presents a pyrap image, or subclass, as a pixel source, read
+    in boxes of whole tiles.
+    """
+
+    def __init__(self, image):
+        self.image = image
+        self.shape = tuple(image.shape())
+        self.tile  = imageTileShape(image.name(), self.shape)
+
+    def spec(self):
+        """Return a <tuple> from which openSource() reopens this source."""
+        return ('casa', self.image.name())
+
+    def read(self, blc, trc):
+        raw   = self.image.getdata(list(blc), list(trc))
+        mask  = self.image.getmask(list(blc), list(trc))
+        stageTimer.countBytes((raw, mask))
+        data  = raw.astype(numpy.float64)
+        if mask.any(): valid = ~mask
+        else:          valid = None
+        return data, valid
+
+
+class FitsImageSource(object):
+    """Class presents the first image HDU of an uncompressed FITS file as a
+    pixel source, read through a memory map. Pixels are scaled by BSCALE and
+    BZERO; BLANK integer pixels and non-finite real pixels are excluded.
+    Whole planes are taken as tiles, being contiguous on disk.
+    """
+
+    fitsTypes = {8: '>u1', 16: '>i2', 32: '>i4', 64: '>i8',
+                 -32: '>f4', -64: '>f8'}
+
+    def __init__(self, cards, offset, fileName):
+        """Caller passes the image HDU cards <list> and data offset <int>, as
+        given by fitsScan.findImage(), and the file name <string>.
+        """
+        naxis  = cardValue(cards, 'NAXIS')
+        bitpix = cardValue(cards, 'BITPIX')
+        self.shape  = tuple([cardValue(cards, 'NAXIS%d' % i)
+                             for i in range(naxis, 0, -1)])
+        self.tile   = planeTile(self.shape)
+        self.bscale = cardValue(cards, 'BSCALE', 1.0)
+        self.bzero  = cardValue(cards, 'BZERO', 0.0)
+        self.blank  = None
+        if bitpix > 0: self.blank = cardValue(cards, 'BLANK')
+        self.data   = numpy.memmap(fileName, dtype=self.fitsTypes[bitpix],
+                                   mode='r', offset=offset, shape=self.shape)
+        self.args   = (cards, offset, fileName)
+
+    def spec(self):
+        """Return a <tuple> from which openSource() reopens this source."""
+        return ('fits',) + self.args
+
+    def read(self, blc, trc):
+        box  = tuple([slice(b, t+1) for b, t in zip(blc, trc)])
+        raw  = self.data[box]
+        stageTimer.countBytes(raw)
+        data = raw.astype(numpy.float64)
+        if self.blank is not None: valid = raw != self.blank
+        else:                      valid = numpy.isfinite(data)
+        if self.bscale != 1.0 or self.bzero != 0.0:
+            data *= self.bscale
+            data += self.bzero
+        if valid.all(): valid = None
+        return data, valid
+
+
+def imageTileShape(imageName, shape):
+    """Return the tile shape <tuple>, in numpy axis order, of the named paged
+    image, as held by its TiledShapeStMan. Where that cannot be read, eg.
+    for an image that is not a casacore table, whole planes are assumed.
+    """
+    try:
+        from pyrap.tables import table as pyraptable
+        imTable = pyraptable(imageName, ack=False)
+        stageTimer.count('tableOpens')
+        try:
+            tile = imTable.getdminfo('map')['SPEC']['DEFAULTTILESHAPE']
+        finally:
+            imTable.close()
+        tile = tuple([int(t) for t in tile][::-1])
+        if len(tile) == len(shape): return tile
+    except Exception:
+        pass
+    return planeTile(shape)
+
+
+def planeTile(shape):
+    """Return a tile <tuple> of one plane of the passed shape."""
+    return tuple([1]*(len(shape)-2) + list(shape[-2:]))
+
+
+def chunkShape(shape, tile, budget):
+    """Return the chunk shape <tuple> in which to read an image of the passed
+    shape and tile shape <tuple>s, numpy axis order, within the passed memory
+    budget in bytes <int>. Chunks are whole tiles, grown along the fastest
+    varying axes first; a single tile is read whatever the budget.
+    """
+    maxPixels = max(1, budget // bytesPerPixel)
+    chunk     = [min(t, s) for t, s in zip(tile, shape)]
+    for axis in reversed(range(len(shape))):
+        others = product(chunk) // chunk[axis]
+        fit    = max(1, maxPixels // others)
+        if fit >= shape[axis]:
+            chunk[axis] = shape[axis]
+            continue
+        chunk[axis] = max(1, fit // chunk[axis]) * chunk[axis]
+        break
+    return tuple(chunk)
+
+
+def chunkBoxes(shape, chunk):
+    """Return a <list> of (blc, trc) boxes, trc inclusive, covering the
+    passed shape in chunks of the passed chunk shape, in storage order.
+    """
+    starts = [range(0, s, c) for s, c in zip(shape, chunk)]
+    boxes  = []
+    for blc in itertools.product(*starts):
+        trc = tuple([min(b + c, s) - 1 for b, c, s in zip(blc, chunk, shape)])
+        boxes.append((tuple(blc), trc))
+    return boxes
+
+
+def imageStatistics(source, budget=256*1024*1024, mode='exact', rankError=0.001,
+                    workers=1):
+    """Caller passes a pixel source, a memory budget in bytes <int>, the
+    statistics mode <string>, 'exact' or 'approx', for the latter the rank
+    error bound <float>, and the number of worker processes <int> over
+    which to spread the passes, 0 for one per cpu.
+
+    Return: <dict> of statistics, as image.statistics().
+    """
+    boxes  = chunkBoxes(source.shape, chunkShape(source.shape, source.tile, budget))
+    runner = PassRunner(source, boxes, workers)
+    try:
+        if mode == 'approx':
+            return sampleStatistics(runner, rankError)
+        acc = StatsAccumulator()
+        for part in runner.run(accumulate):
+            acc.merge(part)
+        stats = acc.results()
+        if acc.npts:
+            median = exactFractile(runner, acc, 0.5, budget)
+            stats['median'] = array(median)
+        else:
+            stats['median'] = stats['mean']
+    finally:
+        runner.close()
+    return stats
+
+
+def statsMeta(stats):
+    """Return the <list> of (key, value <string>) header items of the passed
+    statistics <dict>: the IMAGE-* keys of statInclusions, followed in the
+    approximate mode by the quartiles, rank error bound and sample fraction.
+    """
+    meta = [("IMAGE-"+stat.upper(), stringify(stats[stat]))
+            for stat in statInclusions]
+    if 'rankError' in stats:
+        meta.append(("IMAGE-STATS",           "approx"))
+        meta.append(("IMAGE-Q1",              stringify(stats['q1'])))
+        meta.append(("IMAGE-Q3",              stringify(stats['q3'])))
+        meta.append(("IMAGE-RANK-ERROR",      stringify(stats['rankError'])))
+        meta.append(("IMAGE-SAMPLE-FRACTION", stringify(stats['sampleFraction'])))
+    return meta
+
+
+class PassRunner(object):
+    """Class runs the passes of a statistics computation over the boxes of a
+    pixel source: in process, or over a pool of worker processes, each of
+    which opens the source itself, read only. For the pool, boxes are
+    partitioned by plane, i.e. by their position on the axes beyond the
+    last two (spectral and Stokes axes of a cube), and partial results are
+    returned in box order, so that merging them gives the serial result.
+
+    A pool is not used for a single plane, or where the caller is itself a
+    pool worker (eg. extract --batch), as daemonic processes cannot fork.
+    """
+
+    def __init__(self, source, boxes, workers=1):
+        self.source = source
+        self.boxes  = boxes
+        self.groups = [boxes]
+        self.pool   = None
+        if workers == 1 or multiprocessing.current_process().daemon: return
+        groups = planeGroups(boxes)
+        nproc  = min(workers or multiprocessing.cpu_count(), len(groups))
+        if nproc < 2: return
+        self.groups = groups
+        self.pool   = multiprocessing.Pool(nproc, initializer=openWorkerSource,
+                                           initargs=(source.spec(),))
+
+    def run(self, func, args=(), groupArgs=None):
+        """Return the <list> of partial results of func(source, boxes, ...)
+        over each group of boxes, in order. groupArgs optionally gives a
+        <list> of leading arguments per group.
+        """
+        if groupArgs is None: groupArgs = [()]*len(self.groups)
+        tasks = [(func.__name__, group, tuple(gargs) + tuple(args))
+                 for group, gargs in zip(self.groups, groupArgs)]
+        if self.pool is None:
+            return [runTask(task, self.source) for task in tasks]
+        return self.pool.map(runTask, tasks)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+        return
+
+
+# The pixel source of a PassRunner pool worker process.
+workerSource = None
+
+def openWorkerSource(spec):
+    """Pool initializer: open the pixel source of the passed spec <tuple>."""
+    global workerSource
+    workerSource = openSource(spec)
+    return
+
+
+def openSource(spec):
+    """Return a pixel source opened from the passed spec <tuple>, as given by
+    the spec() method of a source.
+    """
+    if spec[0] == 'casa':
+        from pyrap.images import image as pyrapimage
+        return ImageSource(pyrapimage(spec[1]))
+    if spec[0] == 'fits':
+        return FitsImageSource(*spec[1:])
+    raise ValueError, "Unknown pixel source: " + str(spec[0])
+
+
+def runTask(task, source=None):
+    """Run a pass task, (function name, boxes, arguments), on the passed
+    source, or on the worker's own source.
+    """
+    name, boxes, args = task
+    if source is None: source = workerSource
+    return globals()[name](source, boxes, *args)
+
+
+def planeGroups(boxes):
+    """Return the passed boxes <list>, in storage order, as a <list> of
+    groups of boxes sharing their position on the axes beyond the last two.
+    """
+    groups = []
+    for key, group in itertools.groupby(boxes, lambda box: box[0][:-2]):
+        groups.append(list(group))
+    return groups
+
+
+def accumulate(source, boxes):
+    """Return a StatsAccumulator of the passed boxes <list> of a source."""
+    acc = StatsAccumulator()
+    for blc, trc in boxes:
+        data, valid = source.read(blc, trc)
+        acc.add(data, valid, blc)
+    return acc
+
+
+def sampleSize(rankError):
+    """Return the sample size <int> bounding quantile rank errors by the
+    passed fraction <float>, at confidence 1 - alpha (DKW).
+    """
+    return int(numpy.ceil(numpy.log(2.0/alpha) / (2.0 * rankError**2)))
+
+
+def rankBound(size):
+    """Return the quantile rank error bound <float> of a sample of the
+    passed size <int>, at confidence 1 - alpha (DKW); the inverse of
+    sampleSize().
+    """
+    return float(numpy.sqrt(numpy.log(2.0/alpha) / (2.0 * size)))
+
+
+def sampleStatistics(runner, rankError):
+    """Return the statistics <dict> of the approximate mode: exact moments
+    and extrema, median and quartiles from a random sample of the pixels,
+    drawn in the same pass, of about sampleSize(rankError) pixels.
+    """
+    rate    = float(sampleSize(rankError)) / product(runner.source.shape)
+    acc     = StatsAccumulator()
+    samples = []
+    for part, sample in runner.run(sampleBoxes, (rate,)):
+        acc.merge(part)
+        samples.append(sample)
+    stats  = acc.results()
+    sample = numpy.concatenate(samples)
+    if sample.size:
+        for key, fraction in [('q1', 0.25), ('median', 0.5), ('q3', 0.75)]:
+            stats[key] = array(fractile(sample, fraction))
+    else:
+        for key in ['q1', 'median', 'q3']: stats[key] = stats['mean']
+    if rate >= 1.0:     bound = 0.0
+    elif sample.size:   bound = rankBound(sample.size)
+    else:               bound = rankError
+    stats['rankError']      = array(bound)
+    stats['sampleFraction'] = array(float(sample.size) / max(1, acc.npts))
+    return stats
+
+
+def sampleBoxes(source, boxes, rate):
+    """Return a StatsAccumulator of the passed boxes, and the <ndarray> of
+    the valid pixels of a random sample of them, each box drawn a Poisson
+    count of rate <float> times its size, at uniformly random offsets, by a
+    generator seeded from its blc. With a rate of 1 or more, every valid
+    pixel is returned.
+    """
+    acc     = StatsAccumulator()
+    samples = [numpy.zeros(0)]
+    for blc, trc in boxes:
+        data, valid = source.read(blc, trc)
+        acc.add(data, valid, blc)
+        flat = data.ravel()
+        if rate >= 1.0:
+            picks = numpy.arange(flat.size)
+        else:
+            rng   = numpy.random.RandomState([sampleSeed] + list(blc))
+            picks = rng.randint(0, flat.size, rng.poisson(rate * flat.size))
+        if valid is not None: picks = picks[valid.ravel()[picks]]
+        samples.append(flat[picks])
+    return acc, numpy.concatenate(samples)
+
+
+def fractile(values, fraction):
+    """Return the value of rank int(fraction*(n-1)) of the passed values
+    <ndarray>, which are partially sorted in place.
+    """
+    rank = int(fraction * (values.size - 1))
+    values.partition(rank)
+    return values[rank]
+
+
+def exactFractile(runner, acc, fraction, budget):
+    """Return the pixel value <float> of rank int(fraction*(n-1)) over the
+    runner's boxes, whose moments and extrema are in the passed accumulator.
+
+    Each pass counts pixels in medianBins bins over [lo, hi), the range known
+    to hold the wanted rank, then narrows the range to the bin holding it.
+    Once the range holds no more pixels than the budget allows, they are
+    collected and the rank selected. A range whose pixels all have the one
+    value, eg. the zeros of a padded or masked image, is that value, however
+    many pixels it holds.
+    """
+    rank      = int(fraction * (acc.npts - 1))
+    lo        = float(acc.min)
+    hi        = numpy.nextafter(float(acc.max), numpy.inf)
+    inRange   = acc.npts
+    maxValues = max(1, budget // bytesPerPixel)
+    if acc.min == acc.max: return lo
+    while inRange > maxValues:
+        edges = numpy.linspace(lo, hi, medianBins + 1)
+        edges[-1] = hi
+        below  = 0
+        counts = 0
+        vmin   = None
+        vmax   = None
+        for partBelow, partCounts, partMin, partMax in \
+                runner.run(countRange, (lo, hi, edges)):
+            below  += partBelow
+            counts  = counts + partCounts
+            if partMin is None: continue
+            if vmin is None or partMin < vmin: vmin = partMin
+            if vmax is None or partMax > vmax: vmax = partMax
+        if vmin == vmax: return vmin
+        cumulative = numpy.cumsum(counts) + below
+        b  = int(numpy.searchsorted(cumulative, rank, side='right'))
+        lo, hi  = edges[b], edges[b+1]
+        inRange = int(counts[b])
+        if numpy.nextafter(lo, numpy.inf) >= hi: return lo
+    below  = 0
+    chunks = []
+    for partBelow, values in runner.run(collectRange, (lo, hi)):
+        below += partBelow
+        chunks.append(values)
+    values = numpy.concatenate(chunks)
+    values.partition(rank - below)
+    return values[rank - below]
+
+
+def countRange(source, boxes, lo, hi, edges):
+    """Return the count <int> of pixels below lo, the histogram <ndarray>
+    of pixels in [lo, hi) over the passed edges, and the least and greatest
+    <float> of those pixels, or Nones if there are none.
+    """
+    below  = 0
+    counts = numpy.zeros(len(edges) - 1, dtype=numpy.int64)
+    vmin   = None
+    vmax   = None
+    for blc, trc in boxes:
+        data, valid = source.read(blc, trc)
+        if valid is not None: data = data[valid]
+        below += int(numpy.count_nonzero(data < lo))
+        sel    = data[(data >= lo) & (data < hi)]
+        if not sel.size: continue
+        bins   = numpy.searchsorted(edges, sel, side='right') - 1
+        counts += numpy.bincount(bins, minlength=len(counts))[:len(counts)]
+        smin, smax = float(sel.min()), float(sel.max())
+        if vmin is None or smin < vmin: vmin = smin
+        if vmax is None or smax > vmax: vmax = smax
+    return below, counts, vmin, vmax
+
+
+def collectRange(source, boxes, lo, hi):
+    """Return the count <int> of pixels below lo, and a float64 <ndarray>
+    of the pixels in [lo, hi).
+    """
+    below  = 0
+    chunks = [numpy.zeros(0)]
+    for blc, trc in boxes:
+        data, valid = source.read(blc, trc)
+        if valid is not None: data = data[valid]
+        below += int(numpy.count_nonzero(data < lo))
+        chunks.append(data[(data >= lo) & (data < hi)])
+    return below, numpy.concatenate(chunks)
+
+
+def position(flatIndex, shape, blc):
+    """Return the image position <tuple>, numpy order, of a flat index into
+    a box of the passed shape and blc.
+    """
+    index = numpy.unravel_index(flatIndex, shape)
+    return tuple([int(i + b) for i, b in zip(index, blc)])
+
+
+def product(shape):
+    size = 1
+    for n in shape: size *= n
+    return size
+
+
+def array(value):
+    """Return the passed scalar as a one element float64 <ndarray>, as the
+    values of image.statistics().
+    """
+    return numpy.array([value], dtype=numpy.float64)
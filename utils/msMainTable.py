@@ -0,0 +1,747 @@
+#!/usr/bin/env python
+#
+#                                                 CyberSKA CASA Metadata Project
+#
+#                                                  metaData.utils.msMainTable.py
+#                                                  metaData maintainers, 2026-10
+# ------------------------------------------------------------------------------
+
+"""Bounded memory reductions over the main table of a Measurement Set.
+
+MSHandlers reads the subtables of a Measurement Set only, so that the scan
+structure, integration times and time on source, which CASA listobs reports,
+are otherwise unknown. Here, the main table columns are read in fixed size
+row chunks, getcol(column, startrow, nrow), and each chunk is reduced with
+numpy and merged into an accumulator, so that memory use is set by the chunk
+size, not by the number of rows, which may be 10^8 or more.
+
+The scan summary reads TIME, INTERVAL, EXPOSURE, SCAN_NUMBER, FIELD_ID,
+DATA_DESC_ID and FLAG_ROW, 37 bytes a row, and reduces them per (scan,
+field) to
+
+    -- the time range, from the earliest integration start to the latest
+       integration end (TIME -/+ INTERVAL/2), MJD seconds,
+    -- the row count,
+    -- the mean INTERVAL and EXPOSURE, seconds,
+    -- the DATA_DESC_IDs observed,
+    -- the EXPOSURE of each integration, by TIME, of rows not flagged by
+       FLAG_ROW, the longest where its rows differ.
+
+A field's time on source is the sum of the exposures of its integrations,
+each counted once however many baselines and windows it has rows for, so
+that gaps within and between its scans, and integrations flagged whole,
+are not counted. The integrations are held one entry per TIME, not per row.
+
+The flag statistics read FLAG, FLAG_ROW, DATA_DESC_ID, ANTENNA1 and
+ANTENNA2, with a row flagged by FLAG_ROW counted as wholly flagged, and
+reduce them to the flagged and total visibility counts per data description
+and correlation, and per antenna. FLAG, of nchan x ncorr booleans a row, is
+read in chunks of as many rows as a memory budget allows. Rows of data
+descriptions of differing shapes are read in runs of equal DATA_DESC_ID.
+
+The baseline statistics read UVW, ANTENNA1, ANTENNA2 and FLAG_ROW, and find
+the minimum and maximum projected baseline length, sqrt(u^2 + v^2), of the
+cross correlation rows not flagged by FLAG_ROW, and its percentiles, from a
+histogram of uvBins bins logarithmically spaced over [uvLow, uvHigh] metres,
+accumulated in the same pass, so to a relative precision of uvPrecision.
+With the frequency range of the spectral windows, these give the best
+angular resolution, lambda_min / B_max, and the largest recoverable scale,
+0.983 lambda_max / B_5, B_5 the 5th percentile baseline, as in the ALMA
+Technical Handbook.
+
+eg.,
+
+    runner = RowRunner(msTable, msName, workers)
+    try:
+        summary = scanSummary(runner, chunkRows)
+        meta, values = scanMeta(summary)
+        counts = flagCounts(runner, flagRows(budget, cellSize))
+        meta, values = flagMeta(counts, ddSpws, ddCorrs, antennaNames)
+        stats = baselineStats(runner, chunkRows)
+        meta, values = baselineMeta(stats, minHz, maxHz)
+    finally:
+        runner.close()
+
+Accumulators of disjoint row ranges merge exactly, so that the chunks may be
+spread over a pool of worker processes (see RowRunner), each of which opens
+the table itself, read only.
+"""
+
+# $Id$
+# ------------------------------------------------------------------------------
+__version__      = '$Revision$'[11:-3]
+__version_date__ = '$Date$'[7:-3]
+__author__       = "metaData maintainers"
+# ------------------------------------------------------------------------------
+
+import multiprocessing
+
+import numpy
+
+from collections import OrderedDict
+
+from metaData.utils.runUtils import delist, isoDateTimes
+from metaData.utils          import stageTimer
+
+scanColumns = ['TIME', 'INTERVAL', 'EXPOSURE',
+               'SCAN_NUMBER', 'FIELD_ID', 'DATA_DESC_ID', 'FLAG_ROW']
+
+flagColumns = ['FLAG_ROW', 'DATA_DESC_ID', 'ANTENNA1', 'ANTENNA2']
+
+uvwColumns  = ['UVW', 'ANTENNA1', 'ANTENNA2', 'FLAG_ROW']
+
+# Baseline length histogram: bins, range in metres and the relative
+# precision of the percentiles taken from it, half a bin.
+uvBins      = 65536
+uvLow       = 1.0e-2
+uvHigh      = 1.0e8
+uvLogStep   = numpy.log(uvHigh / uvLow) / uvBins
+uvPrecision = numpy.expm1(uvLogStep) / 2
+
+# Percentiles of the baseline length reported, and the speed of light, m/s.
+uvPercentiles = [5, 50, 95]
+lightSpeed    = 299792458.0
+
+# Bytes held per FLAG cell while a chunk is reduced: the booleans as read
+# and the per channel summing temporaries.
+bytesPerFlag = 2
+
+# Run options switching on a main table stage. Tarred Measurement Sets must
+# then be extracted in full, as the main table data files are otherwise
+# written as empty placeholders (see tarUtils).
+stageOptions = ['msScan', 'msFlags', 'msUvw']
+
+def readsMainTable(options):
+    """Return True if the passed run options <dict> switch on any main
+    table stage.
+    """
+    for option in stageOptions:
+        if options.get(option): return True
+    return False
+
+
+def rowChunks(nrows, chunkRows):
+    """Return the <list> of (startrow, nrow) chunks covering the passed
+    number of rows <int>, chunkRows <int> at a time.
+    """
+    chunkRows = max(1, int(chunkRows))
+    return [(start, min(chunkRows, nrows - start))
+            for start in range(0, nrows, chunkRows)]
+
+
+class ScanSummary(object):
+    """Class accumulates the per (scan, field) time ranges, row counts,
+    mean integration and exposure times, data description ids and unflagged
+    integrations of row chunks of a Measurement Set main table.
+    """
+
+    def __init__(self):
+        self.nrows  = 0
+        self.groups = {}      # (scan, field) -> [start, end, rows,
+                              #          interval sum, exposure sum, ddids,
+                              #          {time: exposure}]
+
+
+    def add(self, time, interval, exposure, scan, field, ddid, flagRow):
+        """Accumulate the passed <ndarray>s of one row chunk of the
+        scanColumns, in that order. Rows are grouped by (scan, field) with
+        one sort and numpy reduceat()s over the chunk, and the unflagged
+        rows of each group by TIME with another.
+        """
+        n = len(time)
+        if not n: return
+        self.nrows += n
+        order  = numpy.lexsort((field, scan))
+        scan   = scan[order]
+        field  = field[order]
+        change = (scan[1:] != scan[:-1]) | (field[1:] != field[:-1])
+        starts = numpy.concatenate(([0], numpy.flatnonzero(change) + 1))
+        rows   = numpy.diff(numpy.append(starts, n))
+        time     = time[order]
+        interval = interval[order]
+        exposure = exposure[order]
+        half     = interval / 2.0
+        first    = numpy.minimum.reduceat(time - half, starts)
+        last     = numpy.maximum.reduceat(time + half, starts)
+        isum     = numpy.add.reduceat(interval, starts)
+        esum     = numpy.add.reduceat(exposure, starts)
+        ddid     = ddid[order].astype(numpy.int64)
+        group    = numpy.repeat(numpy.arange(len(starts)), rows)
+        span     = int(ddid.max()) + 1
+        pairs    = numpy.unique(group * span + ddid)
+        ddids    = [set() for g in starts]
+        for g, d in zip((pairs // span).tolist(), (pairs % span).tolist()):
+            ddids[g].add(d)
+        exposures = integrations(group, time, exposure, ~flagRow[order],
+                                 len(starts))
+        for i, key in enumerate(zip(scan[starts].tolist(),
+                                    field[starts].tolist())):
+            self.__addGroup(key, [float(first[i]), float(last[i]),
+                                  int(rows[i]), float(isum[i]),
+                                  float(esum[i]), ddids[i], exposures[i]])
+        return
+
+
+    def merge(self, other):
+        """Merge the passed summary, of a disjoint row range, into this one."""
+        self.nrows += other.nrows
+        for key, group in other.groups.items():
+            self.__addGroup(key, list(group[:5]) + [set(group[5]),
+                                                    dict(group[6])])
+        return
+
+
+    def scans(self):
+        """Return the <list> of ((scan, field), group) items in time order."""
+        return sorted(self.groups.items(),
+                      key=lambda item: (item[1][0], item[0]))
+
+
+    def fields(self):
+        """Return a <list> of (field, first, last, rows, on source seconds)
+        <tuple>s in field order, the last the sum of the exposures of the
+        field's unflagged integrations.
+        """
+        fields    = {}
+        exposures = {}
+        for (scan, field), group in self.groups.items():
+            start, end, rows = group[:3]
+            if field not in fields:
+                fields[field]    = [start, end, 0]
+                exposures[field] = {}
+            total = fields[field]
+            total[0] = min(total[0], start)
+            total[1] = max(total[1], end)
+            total[2] += rows
+            mergeExposures(exposures[field], group[6])
+        return [tuple([field] + fields[field] +
+                      [sum([e for t, e in sorted(exposures[field].items())])])
+                for field in sorted(fields)]
+
+    #################################### prive #################################
+
+    def __addGroup(self, key, group):
+        if key not in self.groups:
+            self.groups[key] = group
+            return
+        held = self.groups[key]
+        held[0]  = min(held[0], group[0])
+        held[1]  = max(held[1], group[1])
+        held[2] += group[2]
+        held[3] += group[3]
+        held[4] += group[4]
+        held[5] |= group[5]
+        mergeExposures(held[6], group[6])
+        return
+
+
+def integrations(group, time, exposure, keep, ngroups):
+    """Caller passes the group index, TIME and EXPOSURE <ndarray>s of the
+    rows of a chunk, a boolean <ndarray> of the rows to keep, and the number
+    of groups <int>.
+
+    Returns a <list>, per group, of a <dict> of the longest EXPOSURE of the
+    kept rows of each TIME, by TIME.
+    """
+    exposures = [{} for g in range(ngroups)]
+    group     = group[keep]
+    if not len(group): return exposures
+    time      = time[keep]
+    exposure  = exposure[keep]
+    order     = numpy.lexsort((time, group))
+    group     = group[order]
+    time      = time[order]
+    change    = (group[1:] != group[:-1]) | (time[1:] != time[:-1])
+    starts    = numpy.concatenate(([0], numpy.flatnonzero(change) + 1))
+    longest   = numpy.maximum.reduceat(exposure[order], starts)
+    for g, t, e in zip(group[starts].tolist(), time[starts].tolist(),
+                       longest.tolist()):
+        exposures[g][t] = e
+    return exposures
+
+
+def mergeExposures(held, exposures):
+    """Merge the passed <dict> of exposures by TIME into the held one,
+    keeping the longest exposure of a TIME found in both.
+    """
+    for t, e in exposures.items():
+        if e > held.get(t, -1.0): held[t] = e
+    return
+
+
+class RowRunner(object):
+    """Class runs reductions over the row chunks of a main table: in
+    process, on the passed open table tool, or over a pool of worker
+    processes, each of which opens the named table itself, read only. For
+    the pool, chunks are grouped into contiguous row ranges, several per
+    process, and partial results are returned in row order.
+
+    The pool is made on the first reduction of more than one chunk, and
+    then serves every reduction until close(). A pool is not used where the
+    caller is itself a pool worker (eg. extract --batch), as daemonic
+    processes cannot fork.
+    """
+
+    # Row ranges per worker process, for balance.
+    groupsPerProcess = 4
+
+    def __init__(self, tableTool, tableName, workers=1):
+        """Caller passes the open main table tool, its table name <string>,
+        and the number of worker processes <int>, 0 for one per cpu.
+        """
+        self.tableTool = tableTool
+        self.tableName = tableName
+        self.nrows     = tableTool.nrows()
+        self.nproc     = 1
+        self.pool      = None
+        if workers == 1 or multiprocessing.current_process().daemon: return
+        self.nproc = workers or multiprocessing.cpu_count()
+
+    def run(self, func, chunkRows, args=()):
+        """Return the <list> of partial results of func(tableTool, chunks,
+        *args) over the table's rows, chunkRows <int> rows a chunk.
+        """
+        chunks = rowChunks(self.nrows, chunkRows)
+        if self.nproc < 2 or len(chunks) < 2:
+            return [func(self.tableTool, chunks, *args)]
+        ngroups = min(len(chunks), self.nproc * self.groupsPerProcess)
+        bounds  = [len(chunks) * i // ngroups for i in range(ngroups + 1)]
+        tasks   = [(func.__name__, chunks[a:b], tuple(args))
+                   for a, b in zip(bounds[:-1], bounds[1:])]
+        if self.pool is None:
+            self.pool = multiprocessing.Pool(min(self.nproc, ngroups),
+                                             initializer=openWorkerTable,
+                                             initargs=(self.tableName,))
+        return self.pool.map(runTask, tasks, 1)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+        return
+
+
+# The main table of a RowRunner pool worker process.
+workerTable = None
+
+def openWorkerTable(tableName):
+    """Pool initializer: open the named table, read only."""
+    global workerTable
+    from pyrap.tables import table as pyraptable
+    workerTable = pyraptable(tableName, ack=False)
+    return
+
+
+def runTask(task):
+    """Run a reduction task, (function name, chunks, arguments), on the
+    worker's own table.
+    """
+    name, chunks, args = task
+    return globals()[name](workerTable, chunks, *args)
+
+
+def readChunk(tableTool, columns, start, nrow):
+    """Return the <list> of <ndarray>s of the passed columns over nrow rows
+    from start of the passed table tool.
+    """
+    chunk = [tableTool.getcol(column, start, nrow) for column in columns]
+    stageTimer.countBytes(chunk)
+    return chunk
+
+
+def scanSummary(runner, chunkRows=1000000):
+    """Caller passes a RowRunner over the main table of a Measurement Set
+    and the number of rows <int> to read at a time.
+
+    Return: ScanSummary of all rows.
+    """
+    summary = ScanSummary()
+    for part in runner.run(scanChunks, chunkRows):
+        summary.merge(part)
+    return summary
+
+
+def scanChunks(tableTool, chunks):
+    """Return a ScanSummary of the passed <list> of (startrow, nrow) chunks
+    of a main table tool.
+    """
+    summary = ScanSummary()
+    for start, nrow in chunks:
+        summary.add(*readChunk(tableTool, scanColumns, start, nrow))
+    return summary
+
+
+def scanMeta(summary):
+    """Return a 2-tuple, (meta <list> of (key, value <string>), values
+    <dict> of native values by key), of the passed ScanSummary: the row and
+    scan counts, then per scan, in time order, and per field, in field
+    order, as the MAIN:SCAN_* and MAIN:FIELD_* keys.
+    """
+    scans  = summary.scans()
+    fields = summary.fields()
+    values = OrderedDict()
+    values["MAIN:NROWS"]             = summary.nrows
+    values["MAIN:NSCANS"]            = len(set([key[0] for key, g in scans]))
+    values["MAIN:SCAN_NUMBER"]       = [key[0] for key, g in scans]
+    values["MAIN:SCAN_FIELD_ID"]     = [key[1] for key, g in scans]
+    values["MAIN:SCAN_START"]        = [g[0] for key, g in scans]
+    values["MAIN:SCAN_END"]          = [g[1] for key, g in scans]
+    values["MAIN:SCAN_NROWS"]        = [g[2] for key, g in scans]
+    values["MAIN:SCAN_INTERVAL"]     = [g[3] / g[2] for key, g in scans]
+    values["MAIN:SCAN_EXPOSURE"]     = [g[4] / g[2] for key, g in scans]
+    values["MAIN:SCAN_DATA_DESC_ID"] = [sorted(g[5]) for key, g in scans]
+    values["MAIN:FIELD_ID"]          = [f[0] for f in fields]
+    values["MAIN:FIELD_START"]       = [f[1] for f in fields]
+    values["MAIN:FIELD_END"]         = [f[2] for f in fields]
+    values["MAIN:FIELD_NROWS"]       = [f[3] for f in fields]
+    values["MAIN:FIELD_TIME"]        = [f[4] for f in fields]
+
+    meta = []
+    for key, value in values.items():
+        if key.endswith("_START") or key.endswith("_END"):
+            value = delist(isoDateTimes(value))
+        elif key.endswith("_INTERVAL") or key.endswith("_EXPOSURE") or \
+             key.endswith("_TIME"):
+            value = delist(["%.3f" % v for v in value])
+        elif key == "MAIN:SCAN_DATA_DESC_ID":
+            value = delist([" ".join([str(d) for d in ids]) for ids in value])
+        elif isinstance(value, list):
+            value = delist(value)
+        meta.append((key, value))
+    return meta, values
+
+
+
+class FlagCounts(object):
+    """Class accumulates flagged and total visibility counts of row chunks
+    of a Measurement Set main table, per data description and correlation,
+    and per antenna, a baseline's visibilities counting to both of its
+    antennas.
+    """
+
+    def __init__(self):
+        self.nrows       = 0
+        self.rowsFlagged = 0
+        self.ddids       = {}    # ddid -> [flagged per correlation <ndarray>,
+                                 #          visibilities per correlation]
+        self.antFlagged  = numpy.zeros(0, dtype=numpy.int64)
+        self.antTotal    = numpy.zeros(0, dtype=numpy.int64)
+
+
+    def add(self, flag, flagRow, ddid, ant1, ant2):
+        """Accumulate the passed FLAG <ndarray>, of shape (nrow, nchan,
+        ncorr), and the FLAG_ROW, DATA_DESC_ID, ANTENNA1 and ANTENNA2
+        <ndarray>s of the same rows.
+        """
+        n = len(flagRow)
+        if not n: return
+        nchan, ncorr = flag.shape[1:]
+        self.nrows       += n
+        self.rowsFlagged += int(numpy.count_nonzero(flagRow))
+        counts = flag.sum(axis=1, dtype=numpy.int64)
+        counts[flagRow] = nchan
+        for d in numpy.unique(ddid).tolist():
+            if len(ddid) and (ddid == d).all(): part = counts
+            else:                               part = counts[ddid == d]
+            flagged = part.sum(axis=0)
+            if d in self.ddids:
+                self.ddids[d][0] += flagged
+                self.ddids[d][1] += len(part) * nchan
+            else:
+                self.ddids[d] = [flagged, len(part) * nchan]
+        rowFlagged = counts.sum(axis=1)
+        nant = max(int(ant1.max()), int(ant2.max())) + 1
+        flaggedAnt = (numpy.bincount(ant1, rowFlagged, nant) +
+                      numpy.bincount(ant2, rowFlagged, nant))
+        totalAnt   = (numpy.bincount(ant1, None, nant) +
+                      numpy.bincount(ant2, None, nant)) * (nchan * ncorr)
+        self.__addAntennas(flaggedAnt.astype(numpy.int64),
+                           totalAnt.astype(numpy.int64))
+        return
+
+
+    def merge(self, other):
+        """Merge the passed counts, of a disjoint row range, into these."""
+        self.nrows       += other.nrows
+        self.rowsFlagged += other.rowsFlagged
+        for d, (flagged, total) in other.ddids.items():
+            if d in self.ddids:
+                self.ddids[d][0] = self.ddids[d][0] + flagged
+                self.ddids[d][1] += total
+            else:
+                self.ddids[d] = [flagged.copy(), total]
+        self.__addAntennas(other.antFlagged, other.antTotal)
+        return
+
+    #################################### prive #################################
+
+    def __addAntennas(self, flagged, total):
+        size = max(len(self.antTotal), len(total))
+        for name in ['antFlagged', 'antTotal']:
+            held = getattr(self, name)
+            if len(held) < size:
+                held = numpy.concatenate((held, numpy.zeros(size - len(held),
+                                                            dtype=numpy.int64)))
+                setattr(self, name, held)
+        self.antFlagged[:len(flagged)] += flagged
+        self.antTotal[:len(total)]     += total
+        return
+
+
+def flagRows(budget, cellSize, chunkRows=1000000):
+    """Return the number of rows <int>, at most chunkRows, of FLAG to read
+    at a time within the passed memory budget in bytes <int>, for rows of
+    at most cellSize <int> channels x correlations.
+    """
+    return max(1, min(chunkRows, budget // (bytesPerFlag * max(1, cellSize))))
+
+
+def flagCounts(runner, chunkRows, cellShapes=None):
+    """Caller passes a RowRunner over the main table of a Measurement Set,
+    the number of rows <int> of FLAG to read at a time and, optionally, the
+    <list> of (nchan, ncorr) FLAG cell shapes by DATA_DESC_ID.
+
+    Return: FlagCounts of all rows.
+    """
+    codes = None
+    if cellShapes:
+        shapes = sorted(set(cellShapes))
+        codes  = numpy.array([shapes.index(shape) for shape in cellShapes])
+    counts = FlagCounts()
+    for part in runner.run(flagChunks, chunkRows, (codes,)):
+        counts.merge(part)
+    return counts
+
+
+def flagChunks(tableTool, chunks, codes=None):
+    """Return the FlagCounts of the passed <list> of (startrow, nrow)
+    chunks of a main table tool, see readRuns() for codes.
+    """
+    counts = FlagCounts()
+    for start, nrow in chunks:
+        flagRow, ddid, ant1, ant2 = readChunk(tableTool, flagColumns,
+                                              start, nrow)
+        for first, last in readRuns(ddid, codes):
+            flag = tableTool.getcol('FLAG', start + first, last - first)
+            stageTimer.countBytes(flag)
+            counts.add(flag, flagRow[first:last], ddid[first:last],
+                       ant1[first:last], ant2[first:last])
+    return counts
+
+
+def readRuns(ddid, codes=None):
+    """Return the <list> of (first, last) row ranges, last exclusive, of
+    the passed DATA_DESC_ID <ndarray> of a chunk, in which an array column
+    is to be read: the whole chunk where its cells are all of one shape,
+    and otherwise runs of rows of one shape. codes <ndarray> optionally
+    gives a shape code per DATA_DESC_ID; without it, or for ids beyond it,
+    runs of equal DATA_DESC_ID are taken.
+    """
+    n = len(ddid)
+    if not n: return []
+    key = ddid
+    if codes is not None and 0 <= ddid.min() and ddid.max() < len(codes):
+        key = codes[ddid]
+    change = numpy.flatnonzero(key[1:] != key[:-1]) + 1
+    bounds = [0] + change.tolist() + [n]
+    return zip(bounds[:-1], bounds[1:])
+
+
+def flagMeta(counts, ddSpws=None, ddCorrs=None, antennaNames=None):
+    """Caller passes FlagCounts and, optionally, the <list>s by
+    DATA_DESC_ID of spectral window ids and of correlation type names, and
+    the <list> of antenna names, by which the counts are labelled; data
+    description, correlation and antenna ids are given where these are not
+    known.
+
+    Returns a 2-tuple, (meta <list> of (key, value <string>), values <dict>
+    of native values by key): the visibility count, flagged fraction and
+    FLAG_ROW fraction of all rows, then the counts and flagged fractions by
+    spectral window, by correlation type and by antenna, as the MAIN:*
+    keys. Only antennas with rows are listed.
+    """
+    spws   = OrderedDict()
+    corrs  = OrderedDict()
+    for d in sorted(counts.ddids):
+        flagged, perCorr = counts.ddids[d]
+        spw = label(ddSpws, d)
+        held = spws.setdefault(spw, [0, 0])
+        held[0] += int(flagged.sum())
+        held[1] += perCorr * len(flagged)
+        if ddCorrs is not None and d < len(ddCorrs) and \
+           len(ddCorrs[d]) == len(flagged):
+            names = ddCorrs[d]
+        else: names = [str(c) for c in range(len(flagged))]
+        for name, f in zip(names, flagged.tolist()):
+            held = corrs.setdefault(name, [0, 0])
+            held[0] += f
+            held[1] += perCorr
+    flagged = sum([f for f, t in spws.values()])
+    total   = sum([t for f, t in spws.values()])
+    ants    = numpy.flatnonzero(counts.antTotal).tolist()
+
+    values = OrderedDict()
+    values["MAIN:VISIBILITIES"]           = total
+    values["MAIN:FLAGGED_FRACTION"]       = fraction(flagged, total)
+    values["MAIN:FLAG_ROW_FRACTION"]      = fraction(counts.rowsFlagged,
+                                                     counts.nrows)
+    values["MAIN:SPW_ID"]                 = spws.keys()
+    values["MAIN:SPW_VISIBILITIES"]       = [t for f, t in spws.values()]
+    values["MAIN:SPW_FLAGGED_FRACTION"]   = [fraction(f, t)
+                                             for f, t in spws.values()]
+    values["MAIN:CORR_TYPE"]              = corrs.keys()
+    values["MAIN:CORR_FLAGGED_FRACTION"]  = [fraction(f, t)
+                                             for f, t in corrs.values()]
+    values["MAIN:ANTENNA_NAME"]           = [label(antennaNames, a)
+                                             for a in ants]
+    values["MAIN:ANTENNA_FLAGGED_FRACTION"] = [
+        fraction(counts.antFlagged[a], counts.antTotal[a]) for a in ants]
+
+    meta = []
+    for key, value in values.items():
+        if key.endswith("FRACTION"):
+            if isinstance(value, list):
+                value = delist(["%.4f" % v for v in value])
+            else: value = "%.4f" % value
+        elif isinstance(value, list):
+            value = delist(value)
+        meta.append((key, value))
+    return meta, values
+
+
+def label(labels, index):
+    """Return labels[index], or the index where there is no such label."""
+    if labels is not None and 0 <= index < len(labels): return labels[index]
+    return index
+
+
+def fraction(part, whole):
+    """Return part/whole <float>, 0.0 for a whole of 0."""
+    if not whole: return 0.0
+    return float(part) / whole
+
+
+class BaselineStats(object):
+    """Class accumulates the count, minimum, maximum and a logarithmic
+    histogram of the projected baseline lengths, metres, of row chunks of a
+    Measurement Set main table.
+    """
+
+    def __init__(self):
+        self.count  = 0
+        self.min    = None
+        self.max    = None
+        self.counts = numpy.zeros(uvBins, dtype=numpy.int64)
+
+
+    def add(self, uvw, ant1, ant2, flagRow):
+        """Accumulate the passed UVW <ndarray>, of shape (nrow, 3), and the
+        ANTENNA1, ANTENNA2 and FLAG_ROW <ndarray>s of the same rows. Auto
+        correlations, rows flagged by FLAG_ROW and non-finite UVWs are left
+        out.
+        """
+        if not len(uvw): return
+        length = numpy.hypot(uvw[:,0], uvw[:,1])
+        keep   = (ant1 != ant2) & ~flagRow & numpy.isfinite(length)
+        if not keep.all(): length = length[keep]
+        if not length.size: return
+        self.count += length.size
+        low  = float(length.min())
+        high = float(length.max())
+        if self.min is None or low  < self.min: self.min = low
+        if self.max is None or high > self.max: self.max = high
+        with numpy.errstate(divide='ignore'):
+            bins = numpy.log(length / uvLow) / uvLogStep
+        bins = numpy.clip(bins, 0, uvBins - 1).astype(numpy.intp)
+        self.counts += numpy.bincount(bins, minlength=uvBins)
+        return
+
+
+    def merge(self, other):
+        """Merge the passed statistics, of a disjoint row range, into these."""
+        if not other.count: return
+        self.count  += other.count
+        self.counts += other.counts
+        if self.min is None or other.min < self.min: self.min = other.min
+        if self.max is None or other.max > self.max: self.max = other.max
+        return
+
+
+    def percentile(self, percent):
+        """Return the baseline length <float>, metres, of the passed
+        percentile <float>, i.e. of rank int(percent/100*(count-1)), to a
+        relative precision of uvPrecision, or None for no baselines.
+        """
+        if not self.count: return None
+        rank = int(percent / 100.0 * (self.count - 1))
+        b    = int(numpy.searchsorted(numpy.cumsum(self.counts), rank,
+                                      side='right'))
+        mid  = uvLow * numpy.exp((b + 0.5) * uvLogStep)
+        return float(min(max(mid, self.min), self.max))
+
+
+def baselineStats(runner, chunkRows):
+    """Caller passes a RowRunner over the main table of a Measurement Set
+    and the number of rows <int> to read at a time.
+
+    Return: BaselineStats of all rows.
+    """
+    stats = BaselineStats()
+    for part in runner.run(baselineChunks, chunkRows):
+        stats.merge(part)
+    return stats
+
+
+def baselineChunks(tableTool, chunks):
+    """Return the BaselineStats of the passed <list> of (startrow, nrow)
+    chunks of a main table tool.
+    """
+    stats = BaselineStats()
+    for start, nrow in chunks:
+        stats.add(*readChunk(tableTool, uvwColumns, start, nrow))
+    return stats
+
+
+def baselineMeta(stats, minHz=None, maxHz=None):
+    """Caller passes BaselineStats and, optionally, the lowest and highest
+    channel frequencies, Hz <float>, of the spectral windows.
+
+    Returns a 2-tuple, (meta <list> of (key, value <string>), values <dict>
+    of native values by key): the minimum, uvPercentiles and maximum
+    projected baseline lengths, metres, then, where the frequencies are
+    given, the maximum baseline in wavelengths and the best angular
+    resolution and largest recoverable scale, arcseconds, as the MAIN:*
+    keys. Values that cannot be found are None, 'Undefined' in the meta.
+    """
+    values = OrderedDict()
+    values["MAIN:BASELINES"]   = stats.count
+    values["MAIN:UVDIST_MIN"]  = stats.min
+    for percent in uvPercentiles:
+        values["MAIN:UVDIST_P%02d" % percent] = stats.percentile(percent)
+    values["MAIN:UVDIST_MAX"]  = stats.max
+    wavelengths = resolution = largestScale = None
+    shortest    = stats.percentile(uvPercentiles[0])
+    if stats.max and maxHz:
+        wavelengths = stats.max * maxHz / lightSpeed
+        resolution  = arcsec(lightSpeed / maxHz / stats.max)
+    if shortest and minHz:
+        largestScale = arcsec(0.983 * lightSpeed / minHz / shortest)
+    values["MAIN:UVDIST_MAX_WAVELENGTHS"] = wavelengths
+    values["MAIN:RESOLUTION"]             = resolution
+    values["MAIN:LARGEST_SCALE"]          = largestScale
+
+    meta = []
+    for key, value in values.items():
+        if value is None:              value = "Undefined"
+        elif key == "MAIN:BASELINES":  pass
+        elif key.startswith("MAIN:UVDIST_MAX_W"): value = "%.1f" % value
+        elif key.startswith("MAIN:UVDIST"):       value = "%.3f m" % value
+        else:                                     value = "%.4f arcsec" % value
+        meta.append((key, value))
+    return meta, values
+
+
+def arcsec(radians):
+    """Return the passed angle in radians <float> in arcseconds."""
+    return float(numpy.degrees(radians) * 3600.0)
@@ -0,0 +1,240 @@
+#!/usr/bin/env python
+#
+#                                                 CyberSKA CASA Metadata Project
+#
+#                                                  metaData.utils.resultCache.py
+#                                                  metaData maintainers, 2026-10
+# ------------------------------------------------------------------------------
+
+"""Persistent, on-disk cache of extraction results.
+
+The cache holds the MIME type and the 'meta' list of a dataset, as built by
+MSHandlers.buildFlatMeta(), CasaImageHandlers.extract() or
+FitsHandlers.parseFits(), with any native values, eg. MSHandlers.values, in
+an sqlite database under a cache directory.
+
+Entries are keyed on the dataset identity and the metaData version. Dataset
+identity is, by default, the real path, size, mtime and inode of the dataset,
+or of every file in it for a CASA Tables directory. Optionally, identity is a
+SHA1 hash of the dataset content, which survives copies and touches but costs
+a full read of the dataset.
+
+Entries of other metaData versions are never served, and can be removed with
+invalidate(). Least recently used entries are evicted when the cache grows
+beyond its size limit.
+
+The database is shared by the workers of a batch, each of which should hold
+one ResultCache open for all its datasets. It is kept in write-ahead log
+mode, so lookups do not wait on, or block, writers. A hit is not written at
+once: the access times of hits are held, and written with the next put(),
+every touchBatch hits or touchInterval seconds, and on close(), if the
+database is free; being only for eviction order, they are otherwise lost.
+
+eg.,
+
+    cache = ResultCache(cacheDir)
+    hit   = cache.get(inFileName)
+    if hit: mimeType, meta, values = hit
+    else:
+        ...
+        cache.put(inFileName, mimeType, meta, values)
+    cache.close()
+"""
+
+# $Id$
+# ------------------------------------------------------------------------------
+__version__      = '$Revision$'[11:-3]
+__version_date__ = '$Date$'[7:-3]
+__author__       = "metaData maintainers"
+# ------------------------------------------------------------------------------
+
+import os
+import time
+import sqlite3
+import hashlib
+import cPickle
+
+from os.path import join, isdir, realpath
+
+from metaData.metaDataVersion import version
+
+cacheFileName = "metaData-cache.sqlite"
+
+# Hits, and seconds, for which access times may be held before writing.
+touchBatch    = 256
+touchInterval = 60.0
+
+schema = """CREATE TABLE IF NOT EXISTS results (
+                key      TEXT PRIMARY KEY,
+                path     TEXT,
+                version  TEXT,
+                mimetype TEXT,
+                meta     BLOB,
+                nbytes   INTEGER,
+                accessed REAL)"""
+
+
+class ResultCache(object):
+    """Class wraps the sqlite cache database found in, or to be made in, the
+    passed cache directory.
+    """
+
+    def __init__(self, cacheDir, maxBytes=256*1024*1024, contentHash=False,
+                 variant=''):
+        """Caller passes the cache directory name <string>, the cache size
+        limit in bytes <int> (0 for no limit), whether datasets are to be
+        identified by content hash <bool>, and a variant <string> naming any
+        run options that change results, eg. the image statistics mode,
+        which is keyed along with the version.
+        """
+        if not isdir(cacheDir): os.makedirs(cacheDir)
+        self.maxBytes    = maxBytes
+        self.contentHash = contentHash
+        self.variant     = variant
+        self.touched     = {}                # key: access time, unwritten
+        self.touchedAt   = time.time()
+        self.db = sqlite3.connect(join(cacheDir, cacheFileName), timeout=60)
+        self.db.text_factory = str
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(schema)
+        self.db.execute("CREATE INDEX IF NOT EXISTS accessed_idx "
+                        "ON results (accessed)")
+        self.db.commit()
+
+
+    def datasetKey(self, path):
+        """Return the cache key <string> of the passed dataset name."""
+        digest = hashlib.sha1(version + "\0" + self.variant)
+        if self.contentHash:
+            for fileName in datasetFiles(path):
+                digest.update(fileName[len(path):])
+                fob = open(fileName,'rb')
+                block = fob.read(1024*1024)
+                while block:
+                    digest.update(block)
+                    block = fob.read(1024*1024)
+                fob.close()
+        else:
+            digest.update(realpath(path))
+            for fileName in datasetFiles(path):
+                st = os.stat(fileName)
+                digest.update("%s %d %r %d" % (fileName, st.st_size,
+                                               st.st_mtime, st.st_ino))
+        return digest.hexdigest()
+
+
+    def get(self, path):
+        """Return the cached (mimeType, meta, values) <tuple> for the passed
+        dataset name, or None if not cached. The cache is advisory: a
+        database error, eg. a lock timeout, is a miss. The access time of a
+        hit is held, see touch().
+        """
+        key = self.datasetKey(path)
+        try:
+            row = self.db.execute("SELECT mimetype, meta FROM results "
+                                  "WHERE key=?", (key,)).fetchone()
+        except sqlite3.Error: return None
+        if row is None: return None
+        self.touched[key] = time.time()
+        if len(self.touched) >= touchBatch or \
+           time.time() - self.touchedAt >= touchInterval:
+            self.touch()
+        result = cPickle.loads(str(row[1]))
+        if isinstance(result, list): return row[0], result, {}
+        return (row[0],) + result
+
+
+    def put(self, path, mimeType, meta, values=None):
+        """Cache the passed mimeType <string>, meta <list> and optional
+        native values <dict> for the passed dataset name, then evict as
+        needed. A database error is not raised; the result is simply not
+        cached.
+        """
+        blob = cPickle.dumps((meta, values or {}), 2)
+        key  = self.datasetKey(path)
+        self.touched.pop(key, None)
+        try:
+            self.db.execute("INSERT OR REPLACE INTO results "
+                            "VALUES (?,?,?,?,?,?,?)",
+                            (key, realpath(path), version, mimeType,
+                             sqlite3.Binary(blob), len(blob), time.time()))
+            self.touch()
+            self.evict()
+        except sqlite3.Error: self.db.rollback()
+        return
+
+
+    def touch(self):
+        """Write the access times of the hits held, with any uncommitted
+        put(), in one transaction. Best effort: on a database error, eg. a
+        lock timeout, the times are dropped.
+        """
+        try:
+            self.db.executemany("UPDATE results SET accessed=? WHERE key=?",
+                                [(accessed, key) for key, accessed in
+                                 self.touched.items()])
+            self.db.commit()
+        except sqlite3.Error: self.db.rollback()
+        self.touched   = {}
+        self.touchedAt = time.time()
+        return
+
+
+    def evict(self):
+        """Remove least recently used entries until the cache is within its
+        size limit.
+        """
+        if not self.maxBytes: return
+        total = self.db.execute("SELECT SUM(nbytes) FROM results").fetchone()[0]
+        if not total or total <= self.maxBytes: return
+        rows = self.db.execute("SELECT key, nbytes FROM results "
+                               "ORDER BY accessed").fetchall()
+        stale = []
+        for key, nbytes in rows:
+            if total <= self.maxBytes: break
+            stale.append((key,))
+            total -= nbytes
+        self.db.executemany("DELETE FROM results WHERE key=?", stale)
+        self.db.commit()
+        return
+
+
+    def invalidate(self, oldVersion=None):
+        """Remove cached entries. If a version <string> is passed, entries of
+        that metaData version are removed; 'all' removes every entry. By
+        default, entries of any version other than this one are removed.
+
+        Return: <int>, the number of entries removed.
+        """
+        if oldVersion is None:
+            cursor = self.db.execute("DELETE FROM results WHERE version!=?",
+                                     (version,))
+        elif oldVersion == 'all':
+            cursor = self.db.execute("DELETE FROM results")
+        else:
+            cursor = self.db.execute("DELETE FROM results WHERE version=?",
+                                     (oldVersion,))
+        self.db.commit()
+        return cursor.rowcount
+
+
+    def close(self):
+        if self.touched: self.touch()
+        self.db.close()
+        return
+
+
+def datasetFiles(path):
+    """Return a sorted <list> of the file names making up the passed dataset,
+    i.e. the dataset itself, or all files beneath a dataset directory. The
+    table.lock files of CASA Tables are left out, as every table open, even
+    read only, rewrites them.
+    """
+    if not isdir(path): return [path]
+    fileNames = []
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        fileNames.extend([join(root,fname) for fname in sorted(files)
+                          if fname != 'table.lock'])
+    return fileNames
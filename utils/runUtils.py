@@ -16,62 +16,318 @@ __author__       = "K.R. Anderson, <k.r.anderson@ubc.ca>"
 
 import sys, types
 import getopt
+import signal
 import time
 
-from   os.path import basename, normpath
-from   numpy   import ndarray
+from   os      import walk
+from   os.path import basename, normpath, isdir, exists, join, realpath
 from   math    import degrees
 
 from metaData.incl.imageInclusion import velocityType
+from metaData.utils import hdrWriter
 from metaData.convert.polarizationConversions import casaStokesTypes
 # ------------------------------------------------------------------------------
 
 def usage(mod):
 
     useBurp = '\n\tUsage: '+ mod + ' [--help] [--verbose] '\
-              '<FITSfile or ms_dir>\n\n\twhere <FITSfile or ms_dir> is the name '\
-	      'of a FITS file,\n\ta Casa Image or Visibility Measurement Set, \n\t'\
-              'either as a tar archive or gzip tar archive.\n\n'
+              '<FITSfile or ms_dir>\n'\
+              '\t       '+ mod + ' --batch [--workers=N] [--verbose] '\
+              '<dataset or dir> [...]\n\n\twhere <FITSfile or ms_dir> is the name '\
+              'of a FITS file,\n\ta Casa Image or Visibility Measurement Set, \n\t'\
+              'either as a tar archive or gzip tar archive.\n\n'\
+              '\tIn --batch mode, any number of datasets may be passed. Passed\n\t'\
+              'directories which are not themselves Casa Tables are searched\n\t'\
+              'for datasets. Datasets are extracted over a pool of N worker\n\t'\
+              'processes (default: number of cpus).\n\n'\
+              '\tTar archives of Casa Tables are extracted selectively, i.e.\n\t'\
+              'only the tables needed for metadata; --full-extract extracts\n\t'\
+              'the entire archive. Extraction is into a private scratch\n\t'\
+              'directory under --scratch=DIR (default, TMPDIR), or under\n\t'\
+              '/dev/shm when the extracted payload is within --shm-cap=MB.\n\n'\
+              '\tWith --cache=DIR, results are cached in DIR, and unchanged\n\t'\
+              'datasets are served from the cache. --cache-size=MB bounds the\n\t'\
+              'cache (default 256), --cache-hash identifies datasets by content\n\t'\
+              'rather than by path, size, mtime and inode, and\n\t'\
+              '--cache-invalidate=VERSION removes the results of a metaData\n\t'\
+              'version (or \'old\' for all but this version, or \'all\').\n\n'\
+              '\tCasa Image statistics are computed in tile aligned chunks,\n\t'\
+              'within --stats-memory=MB (default 256). --stats=approx\n\t'\
+              'estimates the median and quartiles from a sample, to within\n\t'\
+              'a rank error of --stats-error=EPS (default 0.001), in one pass.\n\t'\
+              '--stats=casa computes them with image.statistics() over the\n\t'\
+              'whole image instead. --fits-stats adds image statistics to\n\t'\
+              'the headers of uncompressed FITS images. With\n\t'\
+              '--stats-workers=N, statistics passes are spread over N\n\t'\
+              'processes by image plane (0 for one per cpu; not in --batch).\n\n'\
+              '\t--format=hdr|json|jsonl|msgpack writes a header (default) or a\n\t'\
+              'structured record of each dataset, with native values, to a\n\t'\
+              'file named after the dataset with that extension, or, with\n\t'\
+              '--output=FILE, of all datasets to FILE (\'-\' for stdout).\n\t'\
+              '--catalogue=FILE adds datasets to an sqlite catalogue, FILE,\n\t'\
+              'in place of header files.\n\n'\
+              '\t--ms-scan summarises the main table of a Measurement Set by\n\t'\
+              'scan and field: time ranges, row counts, integration times and\n\t'\
+              'time on source, reading --ms-chunk-rows=N rows at a time\n\t'\
+              '(default 1000000). --ms-flags adds the flagged fractions of\n\t'\
+              'the visibilities by spectral window, correlation and antenna,\n\t'\
+              'reading FLAG within --ms-memory=MB a chunk (default 256).\n\t'\
+              '--ms-uvw adds baseline length percentiles from UVW, with the\n\t'\
+              'resolution and largest recoverable scale they give.\n\t'\
+              '--ms-workers=N spreads main table row ranges over N processes\n\t'\
+              '(0 for one per cpu; not in --batch). Tar archives are then\n\t'\
+              'extracted in full. --chan-runs adds the runs of uniformly\n\t'\
+              'spaced channels of each spectral window, reading every\n\t'\
+              'channel frequency.\n\n'\
+              '\t--serve=SOCKET runs a server over --workers=N processes,\n\t'\
+              'which keeps pyrap loaded and extracts the datasets sent to the\n\t'\
+              'Unix socket SOCKET, with the options it was started with.\n\t'\
+              'Jobs of a connection none of which completes in\n\t'\
+              '--job-timeout=S seconds (default 3600, 0 for none) fail.\n\t'\
+              '--connect=SOCKET sends the passed datasets to that server.\n\n'\
+              '\t--timing=FILE appends a JSON line per dataset to FILE (\'-\' for\n\t'\
+              'stderr) of the wall and cpu time of each extraction stage, the\n\t'\
+              'bytes read and the tables opened. METADATA_TIMING=FILE in the\n\t'\
+              'environment does the same.\n\n'
     return useBurp
 
 
+# Default run options, as returned by handleCLargs() and understood by
+# extract.run() and extract.runBatch().
+
+statsModes = ['exact', 'approx', 'casa']
+
+defaultOptions = { 'batch'   : False,
+                   'workers' : 0,              # 0 => one per cpu
+                   'extract' : 'selective',    # tar extraction, or 'full'
+                   'scratch' : None,           # None => TMPDIR
+                   'shm'     : '/dev/shm',
+                   'shmCap'  : 0,              # bytes, 0 => no RAM scratch
+                   'cache'   : None,           # result cache dir, None => off
+                   'cacheSize'       : 256*1024*1024,     # bytes
+                   'cacheHash'       : False,  # identify datasets by content
+                   'cacheInvalidate' : None,   # version, 'old' or 'all'
+                   'stats'   : 'exact',        # image statistics, 'approx', 'casa'
+                   'statsMemory'     : 256*1024*1024,     # bytes
+                   'statsError'      : 0.001,  # approx quantile rank error
+                   'fitsStats'       : False,  # image statistics for FITS
+                   'statsWorkers'    : 1,      # per plane processes, 0 => cpus
+                   'format'  : 'hdr',          # or 'json', 'jsonl', 'msgpack'
+                   'output'  : None,           # one file for all, '-' stdout
+                   'catalogue'       : None,   # sqlite catalogue file
+                   'msScan'  : False,          # MS main table scan summary
+                   'msChunkRows'     : 1000000,# MS main table rows per read
+                   'msFlags' : False,          # MS main table flag statistics
+                   'msMemory'        : 256*1024*1024,     # bytes, per chunk
+                   'msWorkers'       : 1,      # row range processes, 0 => cpus
+                   'msUvw'   : False,          # MS main table baseline lengths
+                   'chanRuns'        : False,  # MS CHAN_FREQ_RUNS key
+                   'serve'   : None,           # server Unix socket name
+                   'connect' : None,           # server to send jobs to
+                   'jobTimeout'      : 3600.0, # server job seconds, 0 => none
+                   'timing'  : None,           # stage timing file, '-' stderr
+                   }
+
+
 def handleCLargs(args):
+    """Parse the command line. Returns a 3-tuple,
+
+    (<list> of normalised dataset names, <bool> verbosity, <dict> options)
+
+    where options is a copy of defaultOptions updated from the command line.
+    Only ONE dataset may be passed unless --batch is switched on.
+    """
     mod = basename(sys.argv[0])
-    long_options = ['help', 'verbose']
+    long_options = ['help', 'verbose', 'batch', 'workers=', 'full-extract',
+                    'scratch=', 'shm-cap=', 'cache=', 'cache-size=',
+                    'cache-hash', 'cache-invalidate=', 'stats=',
+                    'stats-memory=', 'stats-error=', 'fits-stats',
+                    'stats-workers=', 'format=', 'output=', 'catalogue=',
+                    'ms-scan', 'ms-chunk-rows=', 'ms-flags', 'ms-memory=',
+                    'ms-workers=', 'ms-uvw', 'serve=', 'connect=',
+                    'timing=', 'chan-runs', 'job-timeout=']
     try:
-	opts, arg = getopt.getopt(sys.argv[1:],'',long_options)
+        opts, arg = getopt.getopt(sys.argv[1:],'',long_options)
     except getopt.GetoptError:
-	sys.exit(usage(mod))
+        sys.exit(usage(mod))
+
+    verbose = False
+    options = dict(defaultOptions)
+
+    for o, a in opts:
+        if o == "--verbose":
+            verbose = True
+        elif o == "--batch":
+            options['batch'] = True
+        elif o == "--full-extract":
+            options['extract'] = 'full'
+        elif o == "--scratch":
+            options['scratch'] = a
+        elif o == "--shm-cap":
+            try: options['shmCap'] = int(float(a)*1024*1024)
+            except ValueError: sys.exit(usage(mod))
+        elif o == "--workers":
+            try: options['workers'] = int(a)
+            except ValueError: sys.exit(usage(mod))
+            if options['workers'] < 0:
+                sys.exit(usage(mod))
+        elif o == "--cache":
+            options['cache'] = a
+        elif o == "--cache-size":
+            try: options['cacheSize'] = int(float(a)*1024*1024)
+            except ValueError: sys.exit(usage(mod))
+        elif o == "--cache-hash":
+            options['cacheHash'] = True
+        elif o == "--cache-invalidate":
+            options['cacheInvalidate'] = a
+        elif o == "--stats":
+            if a not in statsModes: sys.exit(usage(mod))
+            options['stats'] = a
+        elif o == "--stats-memory":
+            try: options['statsMemory'] = int(float(a)*1024*1024)
+            except ValueError: sys.exit(usage(mod))
+        elif o == "--stats-error":
+            try: options['statsError'] = float(a)
+            except ValueError: sys.exit(usage(mod))
+            if not 0 < options['statsError'] < 1:
+                sys.exit(usage(mod))
+        elif o == "--fits-stats":
+            options['fitsStats'] = True
+        elif o == "--stats-workers":
+            try: options['statsWorkers'] = int(a)
+            except ValueError: sys.exit(usage(mod))
+            if options['statsWorkers'] < 0:
+                sys.exit(usage(mod))
+        elif o == "--format":
+            if a not in hdrWriter.outputFormats: sys.exit(usage(mod))
+            if a == 'msgpack' and hdrWriter.msgpack is None:
+                sys.exit("--format=msgpack requires the msgpack package.")
+            options['format'] = a
+        elif o == "--output":
+            options['output'] = a
+        elif o == "--catalogue":
+            options['catalogue'] = a
+        elif o == "--ms-scan":
+            options['msScan'] = True
+        elif o == "--ms-chunk-rows":
+            try: options['msChunkRows'] = int(a)
+            except ValueError: sys.exit(usage(mod))
+            if options['msChunkRows'] < 1:
+                sys.exit(usage(mod))
+        elif o == "--ms-flags":
+            options['msFlags'] = True
+        elif o == "--ms-memory":
+            try: options['msMemory'] = int(float(a)*1024*1024)
+            except ValueError: sys.exit(usage(mod))
+        elif o == "--serve":
+            options['serve'] = a
+        elif o == "--connect":
+            options['connect'] = a
+        elif o == "--job-timeout":
+            try: options['jobTimeout'] = float(a)
+            except ValueError: sys.exit(usage(mod))
+            if options['jobTimeout'] < 0:
+                sys.exit(usage(mod))
+        elif o == "--ms-uvw":
+            options['msUvw'] = True
+        elif o == "--timing":
+            options['timing'] = a
+        elif o == "--chan-runs":
+            options['chanRuns'] = True
+        elif o == "--ms-workers":
+            try: options['msWorkers'] = int(a)
+            except ValueError: sys.exit(usage(mod))
+            if options['msWorkers'] < 0:
+                sys.exit(usage(mod))
+        else:
+            sys.exit(usage(mod))
+
+    if options['cacheInvalidate'] and not options['cache']:
+        sys.exit(usage(mod))
+    if options['catalogue'] and options['output']:
+        sys.exit(usage(mod))
+    if options['connect'] and (options['serve'] or options['catalogue']):
+        sys.exit(usage(mod))
+
+    # Nothing to extract is only allowed when invalidating the cache, or
+    # serving.
+    if not arg and not (options['cacheInvalidate'] or options['serve']):
+        sys.exit(usage(mod))
+    if arg and options['serve']:
+        sys.exit(usage(mod))
+
+    # Only ONE observation (argument) can be specified in single mode.
+    if len(arg) > 1 and not options['batch']:
+        sys.exit(usage(mod))
+
+    msFiles = [normpath(a) for a in arg]
+    return msFiles, verbose, options
+
+
+def isTableDir(path):
+    """Caller passes a path name <string>. Returns True if the path is a
+    CASA Table directory, i.e. a Measurement Set or Casa Image, as marked by
+    the presence of the table.dat descriptor.
+    """
+    return isdir(path) and exists(join(path,'table.dat'))
 
-    if not arg:
-	sys.exit(usage(mod))
 
-    # Only ONE observation (argument) can be specified
-    if len(arg) != 1:
-       	sys.exit(usage(mod))
+# Suffixes of the files sqlite keeps beside a database.
+sqliteSuffixes = ['-wal', '-shm', '-journal']
 
-    msFile      = normpath(arg[0])
-    verbose     = False
-    cl_switches = []
+def findDatasets(paths, skip=()):
+    """Caller passes a <list> of dataset and/or directory names, and
+    optionally a <list> of file and directory names written by the run, eg.
+    as given by writtenPaths(), not to be taken as datasets.
 
-    # cl_switches is left as a hook for handling possible future options,
-    # options that do not exist at the moment. -kra, 10.08.2011.
+    Returns a <list> of dataset names. A passed name that is a file or a
+    CASA Table directory is taken as-is. Any other directory is walked, and
+    every CASA Table directory and every plain file found beneath it is
+    returned as a candidate dataset. Hidden files, previously written
+    output files ('.hdr', '.json', '.jsonl', '.msgpack'), and the skipped
+    names, with their sqlite journal files, are skipped. Directories found
+    to be CASA Tables, or skipped, are not descended into. Duplicates are
+    dropped, first occurrence kept.
+    """
+    outputs  = tuple(hdrWriter.extensions.values())
+    skipped  = set()
+    for name in skip:
+        skipped.update([realpath(name + s) for s in [''] + sqliteSuffixes])
+    datasets = []
+    for path in paths:
+        if not isdir(path) or isTableDir(path):
+            datasets.append(path)
+            continue
+        for root, dirs, files in walk(path):
+            tables = [d for d in dirs if isTableDir(join(root,d))]
+            datasets.extend([join(root,d) for d in sorted(tables)])
+            dirs[:] = sorted([d for d in dirs
+                              if d not in tables and not d.startswith('.')
+                              and realpath(join(root,d)) not in skipped])
+            for fname in sorted(files):
+                if fname.startswith('.') or fname.endswith(outputs): continue
+                if skipped and realpath(join(root,fname)) in skipped: continue
+                datasets.append(join(root,fname))
+    seen = set()
+    return [d for d in datasets if not (d in seen or seen.add(d))]
+
+
+def writtenPaths(options):
+    """Return the <list> of file and directory names the passed run options
+    have written to, other than per dataset outputs: the result cache
+    directory, the catalogue and the --output file.
+    """
+    paths = [options['cache'], options['catalogue']]
+    if options['output'] != '-': paths.append(options['output'])
+    return [path for path in paths if path]
 
-    if opts:
-	for o, a in opts:
-	    if a:
-		cl_switches.append(o+"="+a)
-	    else:
-		cl_switches.append(o)
 
-            if o in ("--verbose"):
-                verbose = True
-                continue
-	    if o in ("--help",):
-		sys.exit(usage(mod))
-	    else:
-		sys.exit(usage(mod))
-    return msFile, verbose
+def exitOnTerm():
+    """Have SIGTERM raise SystemExit, so that finally clauses, which remove
+    scratch directories, are run when a process is killed.
+    """
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(1))
+    return
 
 
 def redirectStdOut(logger=None):
@@ -203,6 +459,72 @@ def decdeg2hmsString(ddegrees):
     return hmsString
 
 
+def dmsStrings(ddegrees):
+    """Caller passes an iterable of decimal degrees of type <float>.
+
+    Returns a <list> of the <string>s decdeg2dmsString() returns for each
+    element, with the same rounding and the same milli-arcsecond kludge.
+    Degrees, minutes and seconds are found for the whole array at once, and
+    formatted in a single pass, '%s' of a <float> being its str().
+    Non-finite values are passed to decdeg2dmsString() itself.
+
+    Parameters: <ndarray> -- decimal degrees
+    Return:     <list>    -- 'd[dd].mm.ss.sss...' <string>s
+    """
+    import numpy
+    ddegrees = numpy.asarray(ddegrees, dtype=numpy.float64).ravel()
+    if not numpy.isfinite(ddegrees).all():
+        return [decdeg2dmsString(dd) for dd in ddegrees.tolist()]
+    mnt,sec  = numpy.divmod(numpy.abs(ddegrees)*3600, 60)
+    deg,mnt  = numpy.divmod(mnt, 60)
+    sec      = numpy.where(sec < 0.001, 0.0, sec)
+    ensign   = numpy.where(ddegrees < 0, "-", "+").tolist()
+    return ["%s%d.%d.%s" % dms for dms in
+            zip(ensign, deg.tolist(), mnt.tolist(), sec.tolist())]
+
+def hmsStrings(ddegrees):
+    """Caller passes an iterable of decimal degrees of type <float>.
+
+    Returns a <list> of the <string>s decdeg2hmsString() returns for each
+    element. See dmsStrings().
+
+    Parameters: <ndarray> -- decimal degrees
+    Return:     <list>    -- 'HH:mm:ss.ssss...' <string>s
+    """
+    import numpy
+    ddegrees = numpy.asarray(ddegrees, dtype=numpy.float64).ravel()
+    if not numpy.isfinite(ddegrees).all():
+        return [decdeg2hmsString(dd) for dd in ddegrees.tolist()]
+    hours,hrem = numpy.divmod(numpy.abs(ddegrees), 15)
+    fracmnt    = hrem/15*60
+    mnt        = numpy.trunc(fracmnt)
+    secs       = (fracmnt - mnt)*60
+    secs       = numpy.where(secs < 0.001, 0.0, secs)
+    ensign     = numpy.where(ddegrees < 0, "-", "").tolist()
+    zero       = numpy.where(hours < 10, "0", "").tolist()
+    return ["%s%s%d:%d:%s" % hms for hms in
+            zip(ensign, zero, hours.tolist(), mnt.tolist(), secs.tolist())]
+
+def raDecStrings(directions):
+    """Caller passes an (N,2) array-like of RA, Dec pairs in radians,
+
+    eg., [dpair[0] for dpair in metaDict['FIELD:REFERENCE_DIR']]
+
+    Returns a 2-tuple of <list>s, the RA <string>s in HMS, as
+    decdeg2hmsString(), and the Dec <string>s in DMS, as decdeg2dmsString(),
+    of all pairs.
+
+    Parameters: <ndarray> -- (N,2) radians
+    Return:     <tuple>   -- (<list>,<list>)
+    """
+    import numpy
+    radecs = numpy.degrees(numpy.asarray(directions, dtype=numpy.float64))
+    radecs = radecs.reshape(-1, 2)
+    if not len(radecs):
+        return [], []
+    return hmsStrings(radecs[:,0]), dmsStrings(radecs[:,1])
+
+
 def delist(sentList):
     """Caller passes an iterable, comprising elements of any type,
     Returns a concantentated csv string of all iterated elements.
@@ -221,8 +543,10 @@ def stringify(thing):
     <ndarray>
 
     Return a string build from  a passed data type. Iterables
-    are concatentated via the delist() function.
+    are concatentated via the delist() function. numpy is not imported
+    here: an <ndarray> can only be passed once something else has.
     """
+    numpy = sys.modules.get('numpy')
     if isinstance(thing,str):
         stringThing = thing
     elif isinstance(thing,int):
@@ -231,7 +555,7 @@ def stringify(thing):
         stringThing = str(thing)
     elif isinstance(thing,list):
         stringThing = delist(thing)
-    elif isinstance(thing,ndarray):
+    elif numpy and isinstance(thing,numpy.ndarray):
         stringThing = delist(thing)
     else:
         raise TypeError, "Unknown type passed"
@@ -275,6 +599,45 @@ def isoDateTime(mjdSecs):
     return isoTime
 
 
+# MJD seconds of the Unix epoch, 1970-01-01T00:00:00, i.e. 40587*86400, and
+# the Unix time range within which time.strftime() gives a four digit year
+# from 1900 on.
+epochDelta  = 3506716800.
+minIsoSecs  = -2208988800.             # 1900-01-01T00:00:00
+maxIsoSecs  = 253402300800.            # 10000-01-01T00:00:00
+
+def isoDateTimes(mjdSecs, invalid="No Times"):
+    """Caller passes an iterable of MJD in seconds, eg. an <ndarray> of
+    a TIME column, and optionally the <string> to be returned for times that
+    cannot be converted.
+
+    Returns a <list> of ISO 8601 Date-Time strings, as isoDateTime() would
+    return for each element, converted as a whole with numpy datetime64
+    arithmetic rather than element by element. As with time.gmtime(),
+    fractional seconds are truncated toward zero. Times before 1900, eg.
+    zero times, and non-finite times, on which time.strftime() raises a
+    ValueError, are masked and given the invalid string. The rare time
+    beyond the year 9999 falls back to time.strftime().
+
+    return <list> of <string>
+    """
+    import numpy
+    mjdSecs  = numpy.asarray(mjdSecs, dtype=numpy.float64).ravel()
+    secs     = mjdSecs - epochDelta
+    finite   = numpy.isfinite(secs)
+    whole    = numpy.trunc(numpy.where(finite, secs, 0.0))
+    inRange  = finite & (whole >= minIsoSecs) & (whole < maxIsoSecs)
+    stamps   = numpy.datetime_as_string(
+                   whole[inRange].astype(numpy.int64).astype('datetime64[s]'))
+    isoTimes = [invalid] * len(secs)
+    for i, stamp in zip(numpy.flatnonzero(inRange), stamps.tolist()):
+        isoTimes[i] = stamp + "Z"
+    for i in numpy.flatnonzero(finite & (whole >= maxIsoSecs)):
+        isoTime = isoDateTime(mjdSecs[i])
+        if isoTime != "No Times": isoTimes[i] = isoTime
+    return isoTimes
+
+
 def raDecConvert(directionPair):
     """Caller passes a Casa Image buried array RA-Dec pair.
 
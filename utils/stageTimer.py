@@ -0,0 +1,280 @@
+#!/usr/bin/env python
+#
+#                                                 CyberSKA CASA Metadata Project
+#
+#                                                   metaData.utils.stageTimer.py
+#                                                  metaData maintainers, 2026-10
+# ------------------------------------------------------------------------------
+
+"""Per-stage timing of dataset extraction.
+
+With extract --timing=FILE, or METADATA_TIMING=FILE in the environment, one
+JSON line is appended to FILE, or written to stderr for '-', per dataset
+extracted,
+
+    {"file": <dataset>, "mimeType": <type>, "error": <string or null>,
+     "wall": <s>, "cpu": <s>, "rssStart": <kB>, "maxRssStart": <kB>,
+     "maxRss": <kB>,
+     "stages":   {<stage>: {"wall": <s>, "cpu": <s>, "calls": <n>}, ...},
+     "counters": {"bytesRead": <n>, "tableOpens": <n>, ...}}
+
+in which stages, in the order first entered, are
+
+    cache, tar-extract, scratch-remove       extract.py
+    import                                   handler and pyrap imports
+    typing                                   the MIME typers
+    open                                     handler table and image opens
+    fits-headers                             FitsHandlers, fitsScan
+    keywords, subtables, conversions         MSHandlers
+    ms-scan, ms-flags, ms-uvw                MSHandlers, msMainTable
+    coordinates, conversions                 CasaImageHandlers
+    imStats                                  Casa Image and FITS statistics
+    write                                    output formatting and writing
+
+Stage times are exclusive: a stage entered within another, eg. imStats
+within conversions, is not counted again in the outer stage, so the stages
+and 'other' add up to the dataset's wall and cpu times. CPU time is that of
+this process, user and system; the work of --stats-workers, --ms-workers
+processes is seen as wall time of the stage that waits on them, and their
+reads are not counted. bytesRead counts the bytes of FITS headers and data
+streamed, of table columns and image pixels read, and bytesExtracted those
+written out of tar archives.
+
+maxRss is the peak resident size of this process so far, its high-water
+mark, not the dataset's: in a batch or server worker, it may have been
+reached by an earlier dataset. rssStart and maxRssStart are the resident
+size and the peak as the dataset was begun, so that a dataset whose
+maxRss exceeds maxRssStart set the peak, having grown the process by at
+least maxRss - rssStart. rssStart is null where /proc cannot be read. For
+the peak of a dataset alone, extract it alone in a new process, as
+bench/runBench.py does.
+
+Instrumented code calls
+
+    with stageTimer.stage('subtables'):
+        ...
+    stageTimer.count('tableOpens')
+
+When timing is off, stage() returns one shared object whose enter and exit
+do nothing, and count() returns at once.
+"""
+
+# $Id$
+# ------------------------------------------------------------------------------
+__version__      = '$Revision$'[11:-3]
+__version_date__ = '$Date$'[7:-3]
+__author__       = "metaData maintainers"
+# ------------------------------------------------------------------------------
+
+import os
+import sys
+import json
+import time
+import resource
+
+from collections import OrderedDict
+
+# The Recorder of the dataset being extracted in this process, or None.
+active = None
+
+envName = 'METADATA_TIMING'
+
+def timingTarget(options=None):
+    """Return the timing output <string>, a file name or '-' for stderr,
+    from options['timing'], or else the environment, or None if timing is
+    off.
+    """
+    if options and options.get('timing'): return options['timing']
+    return os.environ.get(envName) or None
+
+def cpuTime():
+    """Return the user plus system CPU time of this process, s <float>."""
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+def maxRss():
+    """Return the peak resident size of this process so far, kB <int>."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def residentSize():
+    """Return the resident size of this process now, kB <int>, from
+    /proc/self/statm, or None where that cannot be read.
+    """
+    try:
+        fob = open('/proc/self/statm')
+        try:     pages = int(fob.read().split()[1])
+        finally: fob.close()
+    except (IOError, IndexError, ValueError):
+        return None
+    return pages * resource.getpagesize() // 1024
+
+
+class Recorder(object):
+    """Class accumulates the stage times and counters of one dataset."""
+
+    def __init__(self, fileName):
+        self.fileName = fileName
+        self.notes    = OrderedDict()
+        self.stages   = OrderedDict()
+        self.counters = OrderedDict([('bytesRead', 0), ('tableOpens', 0)])
+        self.nested   = [[0.0, 0.0]]        # wall, cpu of inner stages
+        self.rssStart = residentSize()
+        self.maxRssStart = maxRss()
+        self.wall     = time.time()
+        self.cpu      = cpuTime()
+
+    def add(self, name, wall, cpu):
+        """Charge the passed exclusive wall and cpu seconds to the named
+        stage.
+        """
+        if name not in self.stages:
+            self.stages[name] = {'wall': 0.0, 'cpu': 0.0, 'calls': 0}
+        entry = self.stages[name]
+        entry['wall']  += wall
+        entry['cpu']   += cpu
+        entry['calls'] += 1
+        return
+
+    def count(self, name, n):
+        self.counters[name] = self.counters.get(name, 0) + n
+        return
+
+    def record(self, error=None):
+        """Return the <OrderedDict> record of the dataset, as described
+        above.
+        """
+        wall   = time.time() - self.wall
+        cpu    = cpuTime() - self.cpu
+        stages = OrderedDict()
+        for name, entry in self.stages.items():
+            stages[name] = OrderedDict([('wall',  round(entry['wall'], 6)),
+                                        ('cpu',   round(entry['cpu'], 6)),
+                                        ('calls', entry['calls'])])
+        timed  = self.nested[0]             # all outermost stages
+        stages['other'] = OrderedDict([('wall',  round(wall - timed[0], 6)),
+                                       ('cpu',   round(cpu - timed[1], 6)),
+                                       ('calls', 1)])
+        record = OrderedDict([('file', self.fileName)])
+        record['mimeType'] = self.notes.pop('mimeType', None)
+        record['error']    = error
+        record['wall']     = round(wall, 6)
+        record['cpu']      = round(cpu, 6)
+        record['rssStart'] = self.rssStart
+        record['maxRssStart'] = self.maxRssStart
+        record['maxRss']   = maxRss()
+        record.update(self.notes)
+        record['stages']   = stages
+        record['counters'] = self.counters
+        return record
+
+
+class Stage(object):
+    """A timed stage of the active Recorder, as a context manager."""
+
+    __slots__ = ('recorder', 'name', 'wall', 'cpu')
+
+    def __init__(self, recorder, name):
+        self.recorder = recorder
+        self.name     = name
+
+    def __enter__(self):
+        self.recorder.nested.append([0.0, 0.0])
+        self.wall = time.time()
+        self.cpu  = cpuTime()
+        return self
+
+    def __exit__(self, *exc):
+        wall  = time.time() - self.wall
+        cpu   = cpuTime() - self.cpu
+        inner = self.recorder.nested.pop()
+        outer = self.recorder.nested[-1]
+        outer[0] += wall
+        outer[1] += cpu
+        self.recorder.add(self.name, wall - inner[0], cpu - inner[1])
+        return False
+
+
+class NullStage(object):
+    """A stage that does nothing, when timing is off."""
+
+    __slots__ = ()
+
+    def __enter__(self): return self
+
+    def __exit__(self, *exc): return False
+
+nullStage = NullStage()
+
+
+def stage(name):
+    """Return a context manager timing the named stage of the dataset being
+    extracted, or one doing nothing if timing is off.
+    """
+    if active is None: return nullStage
+    return Stage(active, name)
+
+def count(name, n=1):
+    """Add n <int> to the named counter of the dataset being extracted."""
+    if active is None: return
+    active.count(name, n)
+    return
+
+def countBytes(value):
+    """Add the size of the passed value read, an <ndarray>, <string>, or a
+    <list> or <tuple> of those, to the bytesRead counter.
+    """
+    if active is None: return
+    active.count('bytesRead', nbytes(value))
+    return
+
+def note(key, value):
+    """Set the passed key <string> of the dataset's record, eg. mimeType."""
+    if active is None: return
+    active.notes[key] = value
+    return
+
+def nbytes(value):
+    """Return the size in bytes <int> of a value read, see countBytes()."""
+    if hasattr(value, 'nbytes'): return int(value.nbytes)
+    if isinstance(value, basestring): return len(value)
+    if isinstance(value, (list, tuple)):
+        return sum([nbytes(v) for v in value])
+    return 0
+
+
+def begin(fileName, options=None):
+    """Start timing the extraction of the passed dataset name <string>, if
+    timing is switched on by the passed run options <dict> or the
+    environment. Return the timing output <string>, or None if timing is
+    off, to be passed to end().
+    """
+    global active
+    target = timingTarget(options)
+    if target: active = Recorder(fileName)
+    else:      active = None
+    return target
+
+def end(target, error=None):
+    """Stop timing the dataset begun, and write its record, with the passed
+    error <string>, if any, to the passed timing output.
+    """
+    global active
+    if active is None: return
+    recorder, active = active, None
+    writeRecord(recorder.record(error), target)
+    return
+
+def writeRecord(record, target):
+    """Write the passed record as one JSON line, in a single write, to
+    stderr for '-', or appended to the named file, which the processes of a
+    batch may share.
+    """
+    line = json.dumps(record, separators=(',', ':')) + "\n"
+    if target == '-':
+        sys.stderr.write(line)
+        sys.stderr.flush()
+        return
+    fob = open(target, 'a')
+    try:     fob.write(line)
+    finally: fob.close()
+    return
@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+#
+#                                                 CyberSKA CASA Metadata Project
+#
+#                                                     metaData.utils.tarUtils.py
+#                                                  metaData maintainers, 2026-10
+# ------------------------------------------------------------------------------
+
+"""Selective extraction of tarred CASA Tables datasets.
+
+A Measurement Set is almost entirely visibility data held in the main table's
+tiled storage manager files (table.f<n>_TSM<m>), while the metadata scraped
+by MSHandlers comes from the table.dat descriptor of the main table and a
+handful of small subtables (see tablesInclusion.orderedTableNamesAsKeys).
+Rather than extractall(), only those members are written out. Tiled data
+files of the main table are written as sparse placeholders of the archived
+size, a 'skeleton', so that casacore opens the main table as normal without
+a byte of visibility data touching the disk.
+
+A Casa Image keeps its coords and imageinfo as keywords in the main table.dat,
+but its pixels are needed for the image statistics, so only the logtable
+subtable is left behind.
+
+Any other table type is extracted in full.
+
+Extraction is into a private scratch directory made per run by
+makeScratchDir(), so that concurrent extractions of archives sharing a root
+name cannot collide. When the payload fits under a size cap, the scratch
+directory is placed on RAM-backed storage (/dev/shm). Callers must remove it
+with removeScratchDir() in a finally clause.
+
+Every member is checked to lie within that directory before any is
+written: an absolute or '../' name, or a link to one, raises
+TarMemberError.
+"""
+
+# $Id$
+# ------------------------------------------------------------------------------
+__version__      = '$Revision$'[11:-3]
+__version_date__ = '$Date$'[7:-3]
+__author__       = "metaData maintainers"
+# ------------------------------------------------------------------------------
+
+import re
+import shutil
+import tempfile
+
+from os.path import join, normpath, dirname, isdir, realpath
+from os      import makedirs, statvfs, sep
+
+from metaData.incl.tablesInclusion import orderedTableNamesAsKeys
+
+# Tiled storage manager data files: bulk data only. The manager's own
+# header lives in the plain table.f<n> file, which is always extracted.
+tiledDataFile = re.compile(r'^table\.f\d+_TSM\d+$')
+
+# Casa Image subtables not required for metadata.
+imageSkipTables = ['logtable']
+
+
+class TarMemberError(IOError):
+    """Raise this if a tar member would be written outside the directory it
+    is extracted into.
+    """
+    pass
+
+
+def rootName(tarObj):
+    """Caller passes an open TarFile object. Returns the <string> name of the
+    archived root path, i.e. the Measurement Set or Casa Image name.
+    """
+    return normpath(tarObj.getnames()[0]).split('/')[0]
+
+
+def tableInfoType(tarObj, root):
+    """Caller passes an open TarFile object and archive root name <string>.
+
+    Returns the table type, as recorded on the 'Type =' line of the root
+    table.info, eg. 'Measurement Set' or 'Image'. Returns an empty <string>
+    if table.info is not found in the archive.
+    """
+    for member in tarObj.getmembers():
+        if normpath(member.name) == join(root,'table.info'):
+            fob = tarObj.extractfile(member)
+            for line in fob.readlines():
+                if line.startswith('Type'):
+                    return line.split('=',1)[1].strip()
+            break
+    return ''
+
+
+def selectMembers(tarObj, root, full=False):
+    """Caller passes an open TarFile object, the archive root name, and
+    whether a full extraction is wanted.
+
+    Returns a 2-tuple of <list>s of TarInfo members,
+
+    (members to extract, members to write as sparse placeholders)
+    """
+    members = tarObj.getmembers()
+    if full: return members, []
+
+    tableType = tableInfoType(tarObj, root)
+    extract   = []
+    skeleton  = []
+    for member in members:
+        parts = normpath(member.name).split('/')[1:]
+        if not parts:                                   # the root itself
+            extract.append(member)
+        elif tableType == 'Measurement Set':
+            if len(parts) == 1:                         # main table files
+                if member.isfile() and tiledDataFile.match(parts[0]):
+                    skeleton.append(member)
+                else: extract.append(member)
+            elif parts[0] in orderedTableNamesAsKeys:
+                extract.append(member)
+        elif tableType == 'Image':
+            if parts[0] not in imageSkipTables:
+                extract.append(member)
+        else: extract.append(member)
+    return extract, skeleton
+
+
+def memberPath(path, member):
+    """Caller passes the extraction directory <string> and a TarInfo member.
+
+    Returns the file name <string> of the member under the directory. Raises
+    TarMemberError if the member's name, or the target of a link member,
+    resolves outside the directory, eg. an absolute or '../' name. Links
+    already extracted are followed.
+    """
+    root  = realpath(path)
+    names = [member.name]
+    if member.issym():
+        names.append(join(dirname(member.name), member.linkname))
+    elif member.islnk():
+        names.append(member.linkname)
+    for name in names:
+        full = realpath(join(root, name))
+        if full != root and not full.startswith(root + sep):
+            raise TarMemberError, "Tar member %s is outside %s" % (
+                member.name, path)
+    return join(root, normpath(member.name))
+
+
+def makePlaceholder(fileName, size):
+    """Write a sparse file of the passed size <int>, in bytes. No data blocks
+    are allocated on filesystems supporting sparse files.
+    """
+    if not isdir(dirname(fileName)): makedirs(dirname(fileName))
+    fob = open(fileName,'wb')
+    fob.truncate(size)
+    fob.close()
+    return
+
+
+def payloadSize(tarObj, full=False):
+    """Return the number of bytes <int> that extractMeta() will write for
+    the passed open TarFile object. Sparse placeholders are not counted.
+    """
+    extract, skeleton = selectMembers(tarObj, rootName(tarObj), full)
+    return sum([m.size for m in extract if m.isfile()])
+
+
+def makeScratchDir(payload, scratchRoot=None, shmRoot='/dev/shm', shmCap=0):
+    """Make a private scratch directory for a payload of the passed size in
+    bytes <int>. The directory is made under shmRoot if the payload is no
+    greater than shmCap bytes and fits in the free space there, otherwise
+    under scratchRoot (default, the system temporary directory, i.e. TMPDIR).
+    A shmCap of 0 disables RAM-backed scratch.
+
+    Parameters: payload <int>, scratchRoot <string>, shmRoot <string>,
+                shmCap  <int>
+    Return:     <string>, the scratch directory name.
+    """
+    if shmRoot and shmCap and payload <= shmCap:
+        try:
+            fs = statvfs(shmRoot)
+            if payload < fs.f_bavail * fs.f_frsize:
+                return tempfile.mkdtemp(prefix='metaData-', dir=shmRoot)
+        except OSError: pass
+    return tempfile.mkdtemp(prefix='metaData-', dir=scratchRoot)
+
+
+def removeScratchDir(path):
+    """Remove a scratch directory made by makeScratchDir(), and all in it."""
+    shutil.rmtree(path, ignore_errors=True)
+    return
+
+
+def extractMeta(tarObj, path='.', full=False):
+    """Extract those members of a tarred CASA Tables dataset that are needed
+    for metadata extraction into the passed directory <string>. If full is
+    True, the entire archive is extracted, as with extractall().
+
+    Raises TarMemberError, before anything is written, if any member lies
+    outside the directory; see memberPath().
+
+    Parameters: tarObj <TarFile>, path <string>, full <bool>
+    Return:     <tuple>, (<string> root name, <int> bytes written)
+    """
+    root = rootName(tarObj)
+    extract, skeleton = selectMembers(tarObj, root, full)
+    for member in extract + skeleton: memberPath(path, member)
+    tarObj.extractall(path, members=extract)
+    for member in skeleton:
+        makePlaceholder(memberPath(path, member), member.size)
+    return root, sum([m.size for m in extract if m.isfile()])